@@ -0,0 +1,16 @@
+from django.contrib import admin
+from analytics.models import RestaurantDailyRollup, RestaurantHourlyRollup
+
+
+@admin.register(RestaurantDailyRollup)
+class RestaurantDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'bucket', 'orders_total', 'revenue', 'paid_amount', 'items_count')
+    list_filter = ('restaurant', 'bucket')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(RestaurantHourlyRollup)
+class RestaurantHourlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'bucket', 'orders_total', 'revenue', 'paid_amount', 'items_count')
+    list_filter = ('restaurant',)
+    readonly_fields = ('updated_at',)
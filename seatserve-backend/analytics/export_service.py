@@ -0,0 +1,155 @@
+"""
+Streaming exports of orders, order items and payments
+Rows are read with values() projections through a chunked (server-side on
+PostgreSQL) cursor and encoded as they are produced, so memory use does not
+grow with the size of the export. Under ASGI, astream() hands the chunks to
+the server one at a time instead of letting Django buffer a sync iterator.
+"""
+import csv
+from datetime import datetime, time, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from payments.models import Payment
+
+
+# dataset -> (queryset factory, restaurant lookup, date lookup, ordering, columns)
+DATASETS = {
+    'orders': (
+        Order.objects.all, 'restaurant_id', 'created_at', ('created_at', 'id'),
+        ('id', 'table__name', 'status', 'payment_status', 'total_amount',
+         'estimated_time_minutes', 'customer_note', 'created_at', 'updated_at'),
+    ),
+    'items': (
+        OrderItem.objects.all, 'order__restaurant_id', 'order__created_at', ('order__created_at', 'order_id', 'id'),
+        ('id', 'order_id', 'order__created_at', 'menu_item_id', 'menu_item__name',
+         'quantity', 'price_at_time', 'created_at'),
+    ),
+    'payments': (
+        Payment.objects.all, 'restaurant_id', 'created_at', ('created_at', 'id'),
+        ('id', 'order_id', 'status', 'amount', 'currency', 'payment_method', 'gateway_reference',
+         'refund_amount', 'refund_reason', 'refunded_at', 'created_at', 'updated_at'),
+    ),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the value (lets csv.writer feed a generator)"""
+
+    def write(self, value):
+        return value
+
+
+# Leading characters that make spreadsheets read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _encode_value(value):
+    """CSV cell for a value; text a spreadsheet would run as a formula gets a leading apostrophe"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"  # Notes and names are guest or staff input
+    return value
+
+
+class ExportService:
+    """Build and encode restaurant exports"""
+
+    @staticmethod
+    def date_range(start, end):
+        """Aware [start, end + 1 day) bounds for inclusive local dates"""
+        tz = timezone.get_current_timezone()
+        return (
+            timezone.make_aware(datetime.combine(start, time.min), tz),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+        )
+
+    @staticmethod
+    def rows(restaurant_id, dataset, start, end, chunk_size=None):
+        """
+        Yield one dict per row of `dataset`, oldest first
+
+        Raises:
+            ValueError: If the dataset is unknown
+        """
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset '{dataset}'")
+        queryset, restaurant_lookup, date_lookup, ordering, columns = DATASETS[dataset]
+        lower, upper = ExportService.date_range(start, end)
+        return queryset().filter(**{
+            restaurant_lookup: restaurant_id,
+            f'{date_lookup}__gte': lower,
+            f'{date_lookup}__lt': upper,
+        }).order_by(*ordering).values(*columns).iterator(
+            chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE
+        )
+
+    @staticmethod
+    def columns(dataset):
+        return DATASETS[dataset][4]
+
+    @staticmethod
+    def encode(rows, columns, file_format, batch_size=500):
+        """
+        Encode rows as CSV (with header) or NDJSON
+
+        Yields strings of up to `batch_size` rows, so the response is not
+        flushed one tiny chunk per row.
+        """
+        if file_format == 'csv':
+            writer = csv.writer(_Echo())
+            yield writer.writerow(columns)
+
+            def encode_row(row):
+                return writer.writerow([_encode_value(row[column]) for column in columns])
+        elif file_format == 'ndjson':
+            encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+            def encode_row(row):
+                return encoder.encode(row) + '\n'
+        else:
+            raise ValueError(f"Unknown format '{file_format}'")
+
+        batch = []
+        for row in rows:
+            batch.append(encode_row(row))
+            if len(batch) >= batch_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+    @staticmethod
+    def stream(restaurant_id, dataset, start, end, file_format):
+        """Encoded chunks for a whole export"""
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown format '{file_format}'")
+        rows = ExportService.rows(restaurant_id, dataset, start, end)
+        return ExportService.encode(rows, ExportService.columns(dataset), file_format)
+
+    @staticmethod
+    async def astream(restaurant_id, dataset, start, end, file_format):
+        """
+        stream() for ASGI responses
+
+        Each chunk is produced in the request's thread-sensitive thread, so
+        the cursor stays on one connection and only one chunk is in memory.
+        """
+        chunks = ExportService.stream(restaurant_id, dataset, start, end, file_format)
+        next_chunk = sync_to_async(next)
+        try:
+            while (chunk := await next_chunk(chunks, None)) is not None:
+                yield chunk
+        finally:
+            await sync_to_async(chunks.close)()
@@ -0,0 +1,27 @@
+"""
+Rebuild restaurant analytics rollups from orders and payments
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollup_service import RollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly/daily analytics rollups (run while order traffic is quiet)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant', type=int, action='append', dest='restaurants',
+            help='Restaurant id to rebuild (repeatable; default: all)'
+        )
+        parser.add_argument('--since', help='Rebuild from this date (YYYY-MM-DD; default: all history)')
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+        except ValueError:
+            raise CommandError('--since must be YYYY-MM-DD')
+
+        hourly, daily = RollupService.rebuild(restaurant_ids=options['restaurants'], since=since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {hourly} hourly and {daily} daily rollups'))
@@ -0,0 +1,39 @@
+"""
+Export a restaurant's orders, order items or payments as CSV or NDJSON
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.export_service import DATASETS, FORMATS, ExportService
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Stream an orders/items/payments export to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, required=True, help='Restaurant id')
+        parser.add_argument('--dataset', choices=list(DATASETS), default='orders')
+        parser.add_argument('--format', choices=list(FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--start', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD; default: today)')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--start/--end must be YYYY-MM-DD')
+        if not Restaurant.objects.filter(pk=options['restaurant']).exists():
+            raise CommandError(f"Restaurant {options['restaurant']} not found")
+
+        chunks = ExportService.stream(options['restaurant'], options['dataset'], start, end, options['file_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
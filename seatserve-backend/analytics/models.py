@@ -0,0 +1,58 @@
+from django.db import models
+from restaurants.models import Restaurant
+
+
+class RestaurantRollup(models.Model):
+    """Pre-aggregated order and payment figures for one restaurant and time bucket"""
+
+    id = models.BigAutoField(primary_key=True)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+
+    # Orders by current status
+    orders_total = models.IntegerField(default=0)
+    orders_received = models.IntegerField(default=0)
+    orders_in_kitchen = models.IntegerField(default=0)
+    orders_ready = models.IntegerField(default=0)
+    orders_served = models.IntegerField(default=0)
+    orders_cancelled = models.IntegerField(default=0)
+
+    # Order amounts
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # excludes cancelled orders
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_count = models.IntegerField(default=0)
+
+    # Payments
+    payments_count = models.IntegerField(default=0)
+    payments_completed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments_refunded = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class RestaurantHourlyRollup(RestaurantRollup):
+    bucket = models.DateTimeField()  # start of the hour
+
+    class Meta:
+        db_table = 'analytics_hourly_rollup'
+        unique_together = ('restaurant', 'bucket')
+        ordering = ['bucket']
+
+    def __str__(self):
+        return f'{self.restaurant_id} @ {self.bucket:%Y-%m-%d %H:00}'
+
+
+class RestaurantDailyRollup(RestaurantRollup):
+    bucket = models.DateField()
+
+    class Meta:
+        db_table = 'analytics_daily_rollup'
+        unique_together = ('restaurant', 'bucket')
+        ordering = ['bucket']
+
+    def __str__(self):
+        return f'{self.restaurant_id} @ {self.bucket}'
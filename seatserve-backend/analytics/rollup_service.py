@@ -0,0 +1,288 @@
+"""
+Restaurant rollup service
+Keeps hourly and daily rollup rows in step with orders and payments by
+applying per-write deltas once their transaction commits, and rebuilds them
+from source data on demand
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from analytics.models import RestaurantDailyRollup, RestaurantHourlyRollup
+from orders.models import Order, OrderItem
+from payments.models import Payment
+
+
+ORDER_STATUS_FIELDS = {
+    'RECEIVED': 'orders_received',
+    'IN_KITCHEN': 'orders_in_kitchen',
+    'READY_TO_SERVE': 'orders_ready',
+    'SERVED': 'orders_served',
+    'CANCELLED': 'orders_cancelled',
+}
+
+COUNTER_FIELDS = (
+    'orders_total', *ORDER_STATUS_FIELDS.values(),
+    'revenue', 'paid_amount', 'pending_amount', 'items_count',
+    'payments_count', 'payments_completed', 'payments_pending', 'payments_refunded',
+)
+
+ZERO = Decimal('0')
+
+
+def order_contribution(status, payment_status, total_amount):
+    """Counters one order in this state adds to its buckets"""
+    total_amount = Decimal(str(total_amount or 0))
+    contribution = {'orders_total': 1}
+    if status in ORDER_STATUS_FIELDS:
+        contribution[ORDER_STATUS_FIELDS[status]] = 1
+    if status != 'CANCELLED':
+        contribution['revenue'] = total_amount
+    if payment_status == 'PAID':
+        contribution['paid_amount'] = total_amount
+    elif payment_status == 'PENDING':
+        contribution['pending_amount'] = total_amount
+    return contribution
+
+
+def payment_contribution(status, amount, refund_amount):
+    """Counters one payment in this state adds to its buckets"""
+    amount = Decimal(str(amount or 0))
+    contribution = {'payments_count': 1, 'payments_refunded': Decimal(str(refund_amount or 0))}
+    if status == 'COMPLETED':
+        contribution['payments_completed'] = amount
+    elif status == 'PENDING':
+        contribution['payments_pending'] = amount
+    return contribution
+
+
+def diff(new=None, old=None):
+    """Per-field change between two contributions (either may be None)"""
+    new, old = new or {}, old or {}
+    delta = {}
+    for field in set(new) | set(old):
+        change = new.get(field, 0) - old.get(field, 0)
+        if change:
+            delta[field] = change
+    return delta
+
+
+def hour_bucket(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(moment):
+    return timezone.localtime(moment).date()
+
+
+class PendingDeltas:
+    """
+    Deltas gathered at one savepoint level, applied once the transaction commits
+
+    Registered through transaction.on_commit(), so a rolled back savepoint or
+    transaction discards the batch together with the writes it counted.
+    """
+
+    def __init__(self):
+        self.hourly = defaultdict(lambda: defaultdict(int))
+
+    def add(self, restaurant_id, moment, delta):
+        counters = self.hourly[(restaurant_id, hour_bucket(moment))]
+        for field, change in delta.items():
+            counters[field] += change
+
+    def __call__(self):
+        daily = defaultdict(lambda: defaultdict(int))
+        for (restaurant_id, bucket), counters in self.hourly.items():
+            day = daily[(restaurant_id, bucket.date())]
+            for field, change in counters.items():
+                day[field] += change
+
+        # Sorted so concurrent flushes lock shared rows in the same order
+        for model, buckets in ((RestaurantHourlyRollup, self.hourly), (RestaurantDailyRollup, daily)):
+            for (restaurant_id, bucket), counters in sorted(buckets.items()):
+                delta = {field: change for field, change in counters.items() if change}
+                if delta:
+                    RollupService._apply(model, restaurant_id, bucket, delta)
+
+    @classmethod
+    def current(cls, connection):
+        """Batch registered at the current savepoint level, registering one if needed"""
+        savepoint_ids = set(connection.savepoint_ids)
+        for sids, func, *_ in connection.run_on_commit:
+            if isinstance(func, cls) and sids == savepoint_ids:
+                return func
+        batch = cls()
+        transaction.on_commit(batch, using=connection.alias)
+        return batch
+
+
+class RollupService:
+    """Incremental maintenance and rebuilds of restaurant rollups"""
+
+    @staticmethod
+    def _apply(model, restaurant_id, bucket, delta):
+        """Add `delta` to one rollup row, creating it on first write"""
+        updates = {field: F(field) + value for field, value in delta.items()}
+        rows = model.objects.filter(restaurant_id=restaurant_id, bucket=bucket)
+        if rows.update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(restaurant_id=restaurant_id, bucket=bucket, **delta)
+        except IntegrityError:
+            # A concurrent writer created the row first
+            rows.update(**updates)
+
+    @staticmethod
+    def apply_delta(restaurant_id, moment, delta):
+        """
+        Apply a counter delta to the hourly and daily buckets containing `moment`
+
+        Inside a transaction the delta is summed with the others written at the
+        same level and applied after commit, so the shared rollup rows are not
+        locked for the rest of the order/payment transaction.
+
+        Args:
+            restaurant_id: Restaurant the change belongs to
+            moment: Creation time of the order/payment (buckets never move)
+            delta: Mapping of counter field to signed change
+        """
+        if not delta:
+            return
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            PendingDeltas.current(connection).add(restaurant_id, moment, delta)
+            return
+        RollupService._apply(RestaurantHourlyRollup, restaurant_id, hour_bucket(moment), delta)
+        RollupService._apply(RestaurantDailyRollup, restaurant_id, day_bucket(moment), delta)
+
+    @staticmethod
+    def record_items(order, quantity):
+        """Count items added to an order (bulk_create sends no signals)"""
+        if quantity:
+            RollupService.apply_delta(order.restaurant_id, order.created_at, {'items_count': quantity})
+
+    @staticmethod
+    def rebuild(restaurant_ids=None, since=None):
+        """
+        Recompute rollups from orders and payments
+
+        Deletes and rewrites the rollup rows in scope. Run it while writes are
+        quiet, since live deltas applied during the rebuild can be lost.
+
+        Args:
+            restaurant_ids: Restaurants to rebuild (all when None)
+            since: Date to rebuild from (all history when None)
+
+        Returns:
+            tuple: (hourly rows written, daily rows written)
+        """
+        scope = Q()
+        if restaurant_ids is not None:
+            scope &= Q(restaurant_id__in=restaurant_ids)
+        start = None
+        if since is not None:
+            start = timezone.make_aware(datetime.combine(since, time.min))
+            scope &= Q(created_at__gte=start)
+
+        hourly = defaultdict(lambda: defaultdict(int))
+
+        def merge(rows, fields):
+            for row in rows:
+                counters = hourly[(row['restaurant_id'], hour_bucket(row['hour']))]
+                for field in fields:
+                    counters[field] += row[field] or 0
+
+        money = DecimalField(max_digits=14, decimal_places=2)
+
+        def amount(field, condition=None):
+            return Coalesce(Sum(field, filter=condition), Value(ZERO), output_field=money)
+
+        merge(
+            Order.objects.filter(scope).annotate(hour=TruncHour('created_at')).values(
+                'restaurant_id', 'hour'
+            ).annotate(
+                orders_total=Count('id'),
+                **{
+                    field: Count('id', filter=Q(status=status))
+                    for status, field in ORDER_STATUS_FIELDS.items()
+                },
+                revenue=amount('total_amount', ~Q(status='CANCELLED')),
+                paid_amount=amount('total_amount', Q(payment_status='PAID')),
+                pending_amount=amount('total_amount', Q(payment_status='PENDING')),
+            ).order_by(),
+            ('orders_total', *ORDER_STATUS_FIELDS.values(), 'revenue', 'paid_amount', 'pending_amount')
+        )
+
+        item_scope = Q()
+        if restaurant_ids is not None:
+            item_scope &= Q(order__restaurant_id__in=restaurant_ids)
+        if start is not None:
+            item_scope &= Q(order__created_at__gte=start)
+        merge(
+            OrderItem.objects.filter(item_scope).annotate(
+                hour=TruncHour('order__created_at')
+            ).values('hour', restaurant_id=F('order__restaurant_id')).annotate(
+                items_count=Sum('quantity')
+            ).order_by(),
+            ('items_count',)
+        )
+
+        merge(
+            Payment.objects.filter(scope).annotate(hour=TruncHour('created_at')).values(
+                'restaurant_id', 'hour'
+            ).annotate(
+                payments_count=Count('id'),
+                payments_completed=amount('amount', Q(status='COMPLETED')),
+                payments_pending=amount('amount', Q(status='PENDING')),
+                payments_refunded=amount('refund_amount'),
+            ).order_by(),
+            ('payments_count', 'payments_completed', 'payments_pending', 'payments_refunded')
+        )
+
+        daily = defaultdict(lambda: defaultdict(int))
+        for (restaurant_id, bucket), counters in hourly.items():
+            day = daily[(restaurant_id, bucket.date())]
+            for field, value in counters.items():
+                day[field] += value
+
+        with transaction.atomic():
+            for model, bucket_filter in (
+                (RestaurantHourlyRollup, {'bucket__gte': start} if start else {}),
+                (RestaurantDailyRollup, {'bucket__gte': since} if since else {}),
+            ):
+                stale = model.objects.filter(**bucket_filter)
+                if restaurant_ids is not None:
+                    stale = stale.filter(restaurant_id__in=restaurant_ids)
+                stale.delete()
+
+            RestaurantHourlyRollup.objects.bulk_create([
+                RestaurantHourlyRollup(restaurant_id=restaurant_id, bucket=bucket, **counters)
+                for (restaurant_id, bucket), counters in hourly.items()
+            ], batch_size=1000)
+            RestaurantDailyRollup.objects.bulk_create([
+                RestaurantDailyRollup(restaurant_id=restaurant_id, bucket=bucket, **counters)
+                for (restaurant_id, bucket), counters in daily.items()
+            ], batch_size=1000)
+
+        return len(hourly), len(daily)
+
+    @staticmethod
+    def daily(restaurant, start, end):
+        """Daily rollups for [start, end] (dates)"""
+        return RestaurantDailyRollup.objects.filter(
+            restaurant=restaurant, bucket__gte=start, bucket__lte=end
+        ).order_by('bucket')
+
+    @staticmethod
+    def hourly(restaurant, day):
+        """Hourly rollups for one local day"""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return RestaurantHourlyRollup.objects.filter(
+            restaurant=restaurant, bucket__gte=start, bucket__lt=start + timedelta(days=1)
+        ).order_by('bucket')
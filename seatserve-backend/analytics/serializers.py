@@ -0,0 +1,19 @@
+from rest_framework import serializers
+from analytics.models import RestaurantDailyRollup, RestaurantHourlyRollup
+from analytics.rollup_service import COUNTER_FIELDS
+
+
+class RestaurantDailyRollupSerializer(serializers.ModelSerializer):
+    date = serializers.DateField(source='bucket')
+
+    class Meta:
+        model = RestaurantDailyRollup
+        fields = ('date', *COUNTER_FIELDS)
+
+
+class RestaurantHourlyRollupSerializer(serializers.ModelSerializer):
+    hour = serializers.DateTimeField(source='bucket')
+
+    class Meta:
+        model = RestaurantHourlyRollup
+        fields = ('hour', *COUNTER_FIELDS)
@@ -0,0 +1,109 @@
+"""
+Rollup signal handlers
+Each order/payment write queues the change in its contribution to the
+rollup buckets, applied once the write's transaction commits
+"""
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from analytics.rollup_service import RollupService, diff, order_contribution, payment_contribution
+from orders.models import Order
+from orders.signals import order_placed
+from payments.models import Payment
+
+
+ORDER_STATE_FIELDS = ('status', 'payment_status', 'total_amount')
+PAYMENT_STATE_FIELDS = ('status', 'amount', 'refund_amount')
+
+
+def _loaded_state(instance, fields):
+    """Field values as loaded, or None if any is deferred (never triggers a query)"""
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return tuple(instance.__dict__[field] for field in fields)
+
+
+def _remember_state(instance, fields):
+    instance._rollup_state = _loaded_state(instance, fields)
+
+
+def _ensure_state(sender, instance, fields):
+    """Fetch the stored state for updates of instances loaded with deferred fields"""
+    if instance._state.adding or getattr(instance, '_rollup_state', None) is not None:
+        return
+    instance._rollup_state = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    _remember_state(instance, ORDER_STATE_FIELDS)
+
+
+@receiver(pre_save, sender=Order)
+def load_order_state(sender, instance, **kwargs):
+    _ensure_state(sender, instance, ORDER_STATE_FIELDS)
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollups(sender, instance, created, **kwargs):
+    old = None if created else instance._rollup_state
+    new = (instance.status, instance.payment_status, instance.total_amount)
+    RollupService.apply_delta(
+        instance.restaurant_id,
+        instance.created_at,
+        diff(order_contribution(*new), old and order_contribution(*old))
+    )
+    instance._rollup_state = new
+
+
+@receiver(pre_delete, sender=Order)
+def count_deleted_items(sender, instance, **kwargs):
+    """Items are cascade-deleted without signals, so count them up front"""
+    instance._rollup_items = instance.items.aggregate(total=Sum('quantity'))['total'] or 0
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_rollups(sender, instance, **kwargs):
+    state = getattr(instance, '_rollup_state', None) or tuple(
+        getattr(instance, field) for field in ORDER_STATE_FIELDS
+    )
+    delta = diff(old=order_contribution(*state))
+    if getattr(instance, '_rollup_items', 0):
+        delta['items_count'] = -instance._rollup_items
+    RollupService.apply_delta(instance.restaurant_id, instance.created_at, delta)
+
+
+@receiver(order_placed)
+def count_order_items(sender, order, items, **kwargs):
+    RollupService.record_items(order, sum(item.quantity for item in items))
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_state(sender, instance, **kwargs):
+    _remember_state(instance, PAYMENT_STATE_FIELDS)
+
+
+@receiver(pre_save, sender=Payment)
+def load_payment_state(sender, instance, **kwargs):
+    _ensure_state(sender, instance, PAYMENT_STATE_FIELDS)
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollups(sender, instance, created, **kwargs):
+    old = None if created else instance._rollup_state
+    new = (instance.status, instance.amount, instance.refund_amount)
+    RollupService.apply_delta(
+        instance.restaurant_id,
+        instance.created_at,
+        diff(payment_contribution(*new), old and payment_contribution(*old))
+    )
+    instance._rollup_state = new
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_rollups(sender, instance, **kwargs):
+    state = getattr(instance, '_rollup_state', None) or tuple(
+        getattr(instance, field) for field in PAYMENT_STATE_FIELDS
+    )
+    RollupService.apply_delta(instance.restaurant_id, instance.created_at, diff(old=payment_contribution(*state)))
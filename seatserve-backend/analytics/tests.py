@@ -0,0 +1,236 @@
+"""
+Tests for analytics app
+"""
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from analytics.models import RestaurantDailyRollup, RestaurantHourlyRollup
+from orders.models import Order
+from orders.order_service import OrderCreationService
+from orders.tests import create_restaurant_fixture
+from payments.models import Payment
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.restaurant = self.fixture['restaurant']
+        items = self.fixture['items']
+        self.items_data = [
+            {'menu_item_id': items['burger'].id, 'quantity': 2},
+            {'menu_item_id': items['cola'].id, 'quantity': 1},
+        ]
+
+    def place_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrderCreationService.create_order(self.restaurant, self.fixture['table'], self.items_data)
+
+    def daily(self):
+        return RestaurantDailyRollup.objects.get(restaurant=self.restaurant, bucket=timezone.localdate())
+
+    def test_new_orders_are_counted(self):
+        self.place_order()
+        self.place_order()
+
+        rollup = self.daily()
+        self.assertEqual(rollup.orders_total, 2)
+        self.assertEqual(rollup.orders_received, 2)
+        self.assertEqual(rollup.items_count, 6)
+        self.assertEqual(rollup.revenue, Decimal('55.00'))
+        self.assertEqual(rollup.paid_amount, Decimal('55.00'))
+        hourly = RestaurantHourlyRollup.objects.get(restaurant=self.restaurant)
+        self.assertEqual(hourly.orders_total, 2)
+
+    def test_status_changes_move_counters(self):
+        order = self.place_order()
+        order.status = 'CANCELLED'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+        rollup = self.daily()
+        self.assertEqual(rollup.orders_total, 1)
+        self.assertEqual(rollup.orders_received, 0)
+        self.assertEqual(rollup.orders_cancelled, 1)
+        self.assertEqual(rollup.revenue, Decimal('0.00'))
+
+    def test_update_of_deferred_instance(self):
+        order = self.place_order()
+        deferred = Order.objects.only('id', 'status').get(pk=order.pk)
+        deferred.status = 'SERVED'
+        with self.captureOnCommitCallbacks(execute=True):
+            deferred.save(update_fields=['status'])
+
+        rollup = self.daily()
+        self.assertEqual((rollup.orders_received, rollup.orders_served), (0, 1))
+
+    def test_delete_subtracts(self):
+        order = self.place_order()
+        self.place_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+
+        rollup = self.daily()
+        self.assertEqual(rollup.orders_total, 1)
+        self.assertEqual(rollup.items_count, 3)
+
+    def test_payments_are_counted(self):
+        order = self.place_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = Payment.objects.create(order=order, restaurant=self.restaurant, amount=order.total_amount)
+            payment.status = 'COMPLETED'
+            payment.save()
+
+        rollup = self.daily()
+        self.assertEqual(rollup.payments_count, 1)
+        self.assertEqual(rollup.payments_pending, Decimal('0.00'))
+        self.assertEqual(rollup.payments_completed, Decimal('27.50'))
+
+    def test_deltas_apply_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                OrderCreationService.create_order(self.restaurant, self.fixture['table'], self.items_data)
+                OrderCreationService.create_order(self.restaurant, self.fixture['table'], self.items_data)
+        self.assertFalse(RestaurantHourlyRollup.objects.exists())  # No rollup row locked mid-transaction
+
+        for callback in callbacks:
+            callback()
+        hourly = RestaurantHourlyRollup.objects.get(restaurant=self.restaurant)
+        self.assertEqual((hourly.orders_total, hourly.items_count), (2, 6))
+        self.assertEqual(self.daily().revenue, Decimal('55.00'))
+
+    def test_rolled_back_savepoint_is_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                OrderCreationService.create_order(self.restaurant, self.fixture['table'], self.items_data)
+                try:
+                    with transaction.atomic():
+                        OrderCreationService.create_order(self.restaurant, self.fixture['table'], self.items_data)
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+
+        rollup = self.daily()
+        self.assertEqual((rollup.orders_total, rollup.items_count), (1, 3))
+
+    def test_backfill_matches_incremental(self):
+        self.place_order()
+        order = self.place_order()
+        order.status = 'SERVED'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+            Payment.objects.create(order=order, restaurant=self.restaurant, amount=order.total_amount, status='COMPLETED')
+        expected = RestaurantDailyRollup.objects.values().get()
+
+        RestaurantDailyRollup.objects.all().delete()
+        RestaurantHourlyRollup.objects.all().delete()
+        call_command('backfill_rollups', stdout=StringIO())
+
+        rebuilt = RestaurantDailyRollup.objects.values().get()
+        for field in ('id', 'updated_at'):
+            expected.pop(field), rebuilt.pop(field)
+        self.assertEqual(rebuilt, expected)
+        self.assertEqual(RestaurantHourlyRollup.objects.count(), 1)
+
+    def test_daily_endpoint(self):
+        self.place_order()
+        client = APIClient()
+        client.force_authenticate(user=self.fixture['owner'])
+
+        with self.assertNumQueries(2):  # restaurant + rollups
+            response = client.get('/api/analytics/daily/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['orders_total'], 1)
+        self.assertEqual(len(response.data['days']), 1)
+
+        response = client.get('/api/analytics/hourly/')
+        self.assertEqual(len(response.data['hours']), 1)
+
+        response = client.get('/api/analytics/daily/', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.restaurant = self.fixture['restaurant']
+        items = self.fixture['items']
+        for _ in range(3):
+            OrderCreationService.create_order(self.restaurant, self.fixture['table'], [
+                {'menu_item_id': items['burger'].id, 'quantity': 2},
+                {'menu_item_id': items['cola'].id, 'quantity': 1},
+            ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+
+    def download(self, **params):
+        response = self.client.get('/api/analytics/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_orders_csv(self):
+        response, body = self.download()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.DictReader(body.splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['table__name'], 'T1')
+        self.assertEqual(Decimal(rows[0]['total_amount']), Decimal('27.50'))
+
+    def test_csv_neutralizes_formulas(self):
+        Order.objects.filter(restaurant=self.restaurant).update(customer_note='=HYPERLINK("http://evil","x")')
+        self.fixture['table'].name = '+cmd|calc'
+        self.fixture['table'].save()
+        _, body = self.download()
+        row = next(csv.DictReader(body.splitlines()))
+        self.assertEqual(row['customer_note'], '\'=HYPERLINK("http://evil","x")')
+        self.assertEqual(row['table__name'], "'+cmd|calc")
+
+        _, body = self.download(output='ndjson')  # JSON output is left as is
+        self.assertEqual(json.loads(body.splitlines()[0])['customer_note'], '=HYPERLINK("http://evil","x")')
+
+    def test_items_ndjson(self):
+        response, body = self.download(dataset='items', output='ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['menu_item__name'] for row in rows}, {'Burger', 'Cola'})
+
+    async def test_streams_asynchronously_under_asgi(self):
+        token = await sync_to_async(AccessToken.for_user)(self.fixture['owner'])
+        response = await self.async_client.get(
+            '/api/analytics/export/', {'output': 'ndjson'}, headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_date_range_filters(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        _, body = self.download(start=yesterday - timedelta(days=7), end=yesterday)
+        self.assertEqual(body.splitlines()[1:], [])
+        self.assertEqual(self.client.get('/api/analytics/export/', {'dataset': 'users'}).status_code, 400)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'export_data', restaurant=self.restaurant.pk, dataset='payments', file_format='ndjson',
+            start=str(timezone.localdate()), stdout=out
+        )
+        self.assertEqual(out.getvalue(), '')  # No payments yet
+
+        out = StringIO()
+        call_command('export_data', restaurant=self.restaurant.pk, start=str(timezone.localdate()), stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from analytics.export_service import DATASETS, FORMATS, ExportService
+from analytics.rollup_service import COUNTER_FIELDS, RollupService
+from analytics.serializers import RestaurantDailyRollupSerializer, RestaurantHourlyRollupSerializer
+from restaurants.permissions import IsRestaurantUser
+from restaurants.tenant import current_restaurant
+
+
+def _parse_date(value, default):
+    if not value:
+        return default
+    return date.fromisoformat(value)
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """Historical order/revenue figures read from pre-aggregated rollups"""
+    permission_classes = (IsAuthenticated, IsRestaurantUser)
+
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        """Daily rollups for ?start=&end= (ISO dates, default: last 30 days)"""
+        restaurant = current_restaurant(request)
+        if not restaurant:
+            return Response(
+                {'detail': 'Restaurant not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        today = timezone.localdate()
+        try:
+            end = _parse_date(request.query_params.get('end'), today)
+            start = _parse_date(request.query_params.get('start'), end - timedelta(days=29))
+        except ValueError:
+            return Response(
+                {'detail': 'Dates must be YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end or (end - start).days >= settings.ANALYTICS_MAX_DAYS:
+            return Response(
+                {'detail': f'Range must be ordered and span at most {settings.ANALYTICS_MAX_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = list(RollupService.daily(restaurant, start, end))
+        totals = {
+            field: sum(getattr(rollup, field) for rollup in rollups)
+            for field in COUNTER_FIELDS
+        }
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': totals,
+            'days': RestaurantDailyRollupSerializer(rollups, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def hourly(self, request):
+        """Hourly rollups for ?date= (ISO date, default: today)"""
+        restaurant = current_restaurant(request)
+        if not restaurant:
+            return Response(
+                {'detail': 'Restaurant not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            day = _parse_date(request.query_params.get('date'), timezone.localdate())
+        except ValueError:
+            return Response(
+                {'detail': 'Dates must be YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'date': day,
+            'hours': RestaurantHourlyRollupSerializer(
+                RollupService.hourly(restaurant, day), many=True
+            ).data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream raw rows as a file download
+
+        ?dataset=orders|items|payments&output=csv|ndjson&start=&end=
+        (ISO dates, default: last 30 days). Rows are streamed as they are read,
+        so any range can be exported.
+        """
+        restaurant = current_restaurant(request)
+        if not restaurant:
+            return Response(
+                {'detail': 'Restaurant not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        dataset = request.query_params.get('dataset', 'orders')
+        file_format = request.query_params.get('output', 'csv')
+        if dataset not in DATASETS or file_format not in FORMATS:
+            return Response(
+                {'detail': f"dataset must be one of {', '.join(DATASETS)}; output one of {', '.join(FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        today = timezone.localdate()
+        try:
+            end = _parse_date(request.query_params.get('end'), today)
+            start = _parse_date(request.query_params.get('start'), end - timedelta(days=29))
+        except ValueError:
+            return Response(
+                {'detail': 'Dates must be YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'detail': 'start must not be after end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Under ASGI a sync iterator would be read in full before the first byte is sent
+        stream = ExportService.astream if isinstance(request._request, ASGIRequest) else ExportService.stream
+        response = StreamingHttpResponse(
+            stream(restaurant.pk, dataset, start, end, file_format),
+            content_type=FORMATS[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-{start}-{end}.{file_format}"'
+        response['Cache-Control'] = 'no-store'
+        response['X-Accel-Buffering'] = 'no'  # Stream through the proxy instead of spooling
+        return response
@@ -0,0 +1,10 @@
+"""
+URLs for the concurrency benchmarks: the whole API, with the public guest
+routes also served by the async views under /api/public-async/
+"""
+from django.urls import include, path
+
+from config.urls import urlpatterns as config_urlpatterns
+from orders.public_urls import async_urlpatterns
+
+urlpatterns = [path('api/public-async/', include(async_urlpatterns))] + config_urlpatterns
@@ -0,0 +1,49 @@
+"""
+Concurrency benchmarks for the public guest reads
+The same menu requests, served by the DRF view from a thread pool and by the
+async view (orders.async_views) from one event loop, with a simulated round
+trip on every query and cache call. Order status has no async view: it
+benchmarked slower than the DRF view.
+"""
+import pytest
+from django.test import AsyncClient, Client, override_settings
+
+from benchmarks.latency import IOLatency, install_query_latency, remove_query_latency
+from restaurants.models import Restaurant, Table
+
+
+@pytest.fixture
+def io_latency(bench_session):
+    caches = {'default': {
+        'BACKEND': 'benchmarks.latency.LatencyLocMemCache',
+        'LOCATION': 'bench-concurrency',
+    }}
+    IOLatency.seconds = bench_session.load['io_latency_ms'] / 1000
+    install_query_latency()
+    try:
+        with override_settings(CACHES=caches, ROOT_URLCONF='benchmarks.async_urls'):
+            yield
+    finally:
+        remove_query_latency()
+        IOLatency.seconds = 0.0
+
+
+@pytest.fixture
+def restaurant(db, bench_restaurant_ids):
+    return Restaurant.objects.get(pk=bench_restaurant_ids[0])
+
+
+def measure(concurrency_benchmark, name, path, **options):
+    client, async_client = Client(), AsyncClient()
+    concurrency_benchmark(
+        name,
+        lambda: client.get(f'/api/public/{path}'),
+        lambda: async_client.get(f'/api/public-async/{path}'),
+        **options
+    )
+
+
+def test_public_menu_concurrency(concurrency_benchmark, io_latency, restaurant):
+    table = Table.objects.filter(restaurant=restaurant).order_by('id').first()
+    measure(concurrency_benchmark, 'public_menu', f'restaurant/{restaurant.public_id}/table/{table.token}/menu/')
+
@@ -0,0 +1,71 @@
+"""
+Hot endpoint benchmarks
+Guest ordering (menu, create order, order status) and the restaurant
+dashboard reads that staff poll throughout service.
+"""
+import pytest
+from rest_framework.test import APIClient
+
+from menu.models import MenuItem
+from orders.models import Order
+from restaurants.models import Restaurant, Table
+
+
+@pytest.fixture
+def restaurant(db, bench_restaurant_ids):
+    return Restaurant.objects.select_related('owner').get(pk=bench_restaurant_ids[0])
+
+
+@pytest.fixture
+def table(restaurant):
+    return Table.objects.filter(restaurant=restaurant).order_by('id').first()
+
+
+@pytest.fixture
+def guest():
+    return APIClient()
+
+
+@pytest.fixture
+def owner(restaurant):
+    client = APIClient()
+    client.force_authenticate(user=restaurant.owner)
+    return client
+
+
+def test_public_menu(benchmark, guest, restaurant, table):
+    url = f'/api/public/restaurant/{restaurant.public_id}/table/{table.token}/menu/'
+    benchmark('public_menu', lambda: guest.get(url))
+
+
+def test_create_order(benchmark, guest, restaurant, table):
+    items = list(MenuItem.objects.filter(restaurant=restaurant).order_by('id').values_list('id', flat=True)[:3])
+    url = f'/api/public/restaurant/{restaurant.public_id}/table/{table.token}/orders/'
+    payload = {'items': [{'menu_item_id': item_id, 'quantity': 1} for item_id in items]}
+    benchmark('create_order', lambda: guest.post(url, payload, format='json'), expected_status=201)
+
+
+def test_order_status(benchmark, guest, restaurant):
+    order = Order.objects.filter(restaurant=restaurant).latest('created_at')
+    url = f'/api/public/order/{order.public_token}/'
+    benchmark('order_status', lambda: guest.get(url))
+
+
+def test_orders_pending(benchmark, owner):
+    benchmark('orders_pending', lambda: owner.get('/api/orders/pending/'))
+
+
+def test_orders_today(benchmark, owner):
+    benchmark('orders_today', lambda: owner.get('/api/orders/today/'))
+
+
+def test_orders_stats(benchmark, owner):
+    benchmark('orders_stats', lambda: owner.get('/api/orders/stats/'))
+
+
+def test_payments_today(benchmark, owner):
+    benchmark('payments_today', lambda: owner.get('/api/payments/today/'))
+
+
+def test_table_list(benchmark, owner):
+    benchmark('table_list', lambda: owner.get('/api/restaurants/tables/'))
@@ -0,0 +1,40 @@
+"""
+Benchmark dataset
+Fixtures overriding pytest-django's live here rather than in the plugin so
+they take precedence over it.
+"""
+from datetime import datetime, time
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker, bench_session):
+    """Test database plus the synthetic dataset, built once per run"""
+    from django.core.management import call_command
+    from analytics.rollup_service import RollupService
+    from restaurants.load_data import LoadDataGenerator
+
+    dataset = bench_session.dataset
+    dataset['database'] = connection.vendor
+    with django_db_blocker.unblock():
+        call_command('seed_data', verbosity=0)
+        counts = LoadDataGenerator(
+            restaurants=dataset['restaurants'],
+            tables=dataset['tables'],
+            menu_items=dataset['menu_items'],
+            days=dataset['days'],
+            orders_per_day=dataset['orders_per_day'],
+            # A whole day of today's orders, so the today/pending endpoints
+            # see the same volume at any time of day
+            now=timezone.make_aware(datetime.combine(timezone.localdate(), time.max)),
+        ).run()
+        RollupService.rebuild(restaurant_ids=counts['restaurant_ids'])
+    bench_session.restaurant_ids = counts['restaurant_ids']
+
+
+@pytest.fixture(scope='session')
+def bench_restaurant_ids(django_db_setup, bench_session):
+    """Ids of the generated restaurants"""
+    return bench_session.restaurant_ids
@@ -0,0 +1,90 @@
+"""
+Simulated network latency for the concurrency benchmark
+In production every query and cache read is a round trip to Postgres or
+Redis; locally SQLite and LocMemCache answer almost instantly, which hides
+what async views gain by not holding a thread while waiting. These add a
+fixed delay per query and per cache call: blocking in sync code, awaited
+in the async cache API.
+"""
+import asyncio
+import time
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class IOLatency:
+    """Delay (seconds) added to every query and cache call"""
+
+    seconds = 0.0
+
+
+class LatencyLocMemCache(LocMemCache):
+    """LocMemCache answering after IOLatency.seconds"""
+
+    def _wait(self):
+        time.sleep(IOLatency.seconds)
+
+    async def _await(self):
+        await asyncio.sleep(IOLatency.seconds)
+
+    def get(self, key, default=None, version=None):
+        self._wait()
+        return super().get(key, default, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._wait()
+        super().set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._wait()
+        return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._wait()
+        return super().incr(key, delta, version)
+
+    def delete(self, key, version=None):
+        self._wait()
+        return super().delete(key, version)
+
+    async def aget(self, key, default=None, version=None):
+        await self._await()
+        return super().get(key, default, version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        await self._await()
+        super().set(key, value, timeout, version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        await self._await()
+        return super().add(key, value, timeout, version)
+
+    async def adelete(self, key, version=None):
+        await self._await()
+        return super().delete(key, version)
+
+
+def _delay_query(execute, sql, params, many, context):
+    time.sleep(IOLatency.seconds)
+    return execute(sql, params, many, context)
+
+
+def _add_query_delay(connection, **kwargs):
+    if _delay_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _delay_query)
+
+
+def install_query_latency():
+    """Delay queries on every connection, including those opened by other threads"""
+    connection_created.connect(_add_query_delay, dispatch_uid='benchmarks.latency')
+    for connection in connections.all(initialized_only=True):
+        _add_query_delay(connection)
+
+
+def remove_query_latency():
+    connection_created.disconnect(dispatch_uid='benchmarks.latency')
+    for connection in connections.all(initialized_only=True):
+        if _delay_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_delay_query)
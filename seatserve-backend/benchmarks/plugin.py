@@ -0,0 +1,337 @@
+"""
+pytest plugin for the endpoint benchmarks
+Loads a synthetic dataset once per session, times each endpoint over a
+number of requests and compares p50/p95 latency and query counts with the
+stored baseline (benchmarks/baseline.json). Concurrency runs measure the
+throughput of sync and async views under concurrent load.
+"""
+import asyncio
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pytest
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-restaurants', type=int, default=3)
+    group.addoption('--bench-tables', type=int, default=20, help='Tables per restaurant')
+    group.addoption('--bench-menu-items', type=int, default=40, help='Menu items per restaurant')
+    group.addoption('--bench-days', type=int, default=14, help='Days of order history')
+    group.addoption('--bench-orders-per-day', type=int, default=120, help='Mean orders per restaurant per day')
+    group.addoption('--bench-iterations', type=int, default=30, help='Timed requests per round')
+    group.addoption('--bench-rounds', type=int, default=3,
+                    help='Timing rounds per endpoint; the fastest round (by p50) is reported')
+    group.addoption('--bench-warmup', type=int, default=3, help='Untimed requests before timing')
+    group.addoption('--bench-threshold', type=float, default=0.25,
+                    help='Allowed latency regression over the baseline (0.25 = 25%%)')
+    group.addoption('--bench-min-delta-ms', type=float, default=1.0,
+                    help='Latency regressions smaller than this are treated as noise')
+    group.addoption('--bench-machine', default=os.environ.get('BENCH_MACHINE') or platform.node(),
+                    help='Label of this machine; latency is only compared with a baseline from the same one')
+    group.addoption('--bench-baseline', default=str(BASELINE_PATH))
+    group.addoption('--bench-update-baseline', action='store_true',
+                    help='Write this run as the new baseline instead of comparing')
+    group.addoption('--bench-output', default='', help='Also write the results to this JSON file')
+    group.addoption('--bench-requests', type=int, default=240, help='Requests per concurrency run')
+    group.addoption('--bench-sync-threads', type=int, default=4,
+                    help='Threads serving sync views in the concurrency runs (a gthread worker)')
+    group.addoption('--bench-concurrency', type=int, default=32,
+                    help='Requests in flight on the event loop in the async concurrency runs')
+    group.addoption('--bench-io-latency-ms', type=float, default=10.0,
+                    help='Simulated round trip per query and cache call in the concurrency runs')
+    group.addoption('--bench-min-speedup', type=float, default=1.25,
+                    help='Required async/sync throughput ratio in the concurrency runs')
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def time_round(call, iterations):
+    """Milliseconds taken by each of `iterations` calls"""
+    samples = []
+    gc.collect()
+    gc.disable()  # As timeit does: collections land on random requests otherwise
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+    return samples
+
+
+def run_threaded(send, threads, total):
+    """Requests per second with `threads` threads making `total` requests in all"""
+    counter = itertools.count()  # next() is atomic under the GIL
+
+    def worker():
+        try:
+            while next(counter) < total:
+                send()
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(worker) for _ in range(threads)]:
+            future.result()
+    return total / (time.perf_counter() - started)
+
+
+def run_concurrent(asend, concurrency, total):
+    """Requests per second with up to `concurrency` requests in flight on one event loop"""
+    async def one(semaphore):
+        async with semaphore:
+            # As Django's ASGIHandler does, give each request its own thread for sync code
+            async with ThreadSensitiveContext():
+                try:
+                    await asend()
+                finally:
+                    await sync_to_async(connections.close_all)()
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(one(semaphore) for _ in range(total)))
+        return total / (time.perf_counter() - started)
+
+    # A loop of its own, as under uvicorn: inside async_to_sync() all sync code
+    # would run in the calling thread instead of per request
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(asyncio.run, run()).result()
+
+
+class BenchmarkSession:
+    """Options, results and the baseline for one pytest run"""
+
+    def __init__(self, config):
+        option = config.getoption
+        self.dataset = {
+            'restaurants': option('bench_restaurants'),
+            'tables': option('bench_tables'),
+            'menu_items': option('bench_menu_items'),
+            'days': option('bench_days'),
+            'orders_per_day': option('bench_orders_per_day'),
+            'database': None,  # Filled in once Django is set up
+        }
+        self.iterations = max(1, option('bench_iterations'))
+        self.rounds = max(1, option('bench_rounds'))
+        self.machine = option('bench_machine')
+        self.warmup = max(0, option('bench_warmup'))
+        self.threshold = option('bench_threshold')
+        self.min_delta_ms = option('bench_min_delta_ms')
+        self.baseline_path = Path(option('bench_baseline'))
+        self.update_baseline = option('bench_update_baseline')
+        self.output = option('bench_output')
+        self.load = {
+            'requests': max(1, option('bench_requests')),
+            'sync_threads': max(1, option('bench_sync_threads')),
+            'concurrency': max(1, option('bench_concurrency')),
+            'io_latency_ms': option('bench_io_latency_ms'),
+        }
+        self.min_speedup = option('bench_min_speedup')
+        self.restaurant_ids = []
+        self.results = {}
+        self.throughput = {}
+        self.baseline = {}
+        if self.baseline_path.exists():
+            self.baseline = json.loads(self.baseline_path.read_text())
+
+    def compares_latency(self):
+        return self.baseline.get('machine') == self.machine and self.baseline.get('dataset') == self.dataset
+
+    def regressions(self, name, result):
+        """Reasons `result` is worse than the baseline entry for `name`"""
+        expected = self.baseline.get('endpoints', {}).get(name)
+        if not expected or self.update_baseline:
+            return []
+
+        problems = []
+        if result['queries'] > expected['queries']:
+            problems.append(f"{result['queries']} queries, baseline {expected['queries']}")
+        # Query counts hold anywhere; latency only against the same machine and dataset
+        if self.compares_latency():
+            for key in ('p50_ms', 'p95_ms'):
+                limit = expected[key] * (1 + self.threshold)
+                if result[key] > limit and result[key] - expected[key] > self.min_delta_ms:
+                    problems.append(f'{key} {result[key]:.2f}, baseline {expected[key]:.2f} (limit {limit:.2f})')
+        return problems
+
+    def throughput_regressions(self, name, result, min_speedup):
+        """Reasons the concurrency run `name` falls short"""
+        problems = []
+        if result['speedup'] < min_speedup:
+            problems.append(f"async/sync throughput {result['speedup']:.2f}x, required {min_speedup:.2f}x")
+        expected = self.baseline.get('throughput', {}).get(name)
+        if expected and not self.update_baseline and self.compares_latency() and self.baseline.get('load') == self.load:
+            limit = expected['async_rps'] * (1 - self.threshold)
+            if result['async_rps'] < limit:
+                problems.append(f"async {result['async_rps']:.1f} req/s, baseline {expected['async_rps']:.1f} "
+                                f"(limit {limit:.1f})")
+        return problems
+
+    def write(self, path):
+        data = {
+            'machine': self.machine, 'dataset': self.dataset,
+            'iterations': self.iterations, 'rounds': self.rounds, 'endpoints': self.results,
+        }
+        if self.throughput:
+            data.update(load=self.load, throughput=self.throughput)
+        elif 'throughput' in self.baseline:  # Keep the recorded runs when only latency was measured
+            data.update(load=self.baseline['load'], throughput=self.baseline['throughput'])
+        Path(path).write_text(json.dumps(data, indent=2, sort_keys=True) + '\n')
+
+
+def pytest_configure(config):
+    config.bench_session = BenchmarkSession(config)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    bench = session.config.bench_session
+    if not bench.results and not bench.throughput:
+        return
+    if bench.output:
+        bench.write(bench.output)
+    if bench.update_baseline:
+        bench.write(bench.baseline_path)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    bench = config.bench_session
+    if bench.throughput:
+        terminalreporter.section('concurrency benchmarks')
+        terminalreporter.write_line(
+            f"{bench.load['requests']} requests, {bench.load['io_latency_ms']} ms per query and cache call; "
+            f"sync: {bench.load['sync_threads']} threads, async: {bench.load['concurrency']} in flight"
+        )
+        terminalreporter.write_line(f"{'endpoint':<22}{'sync req/s':>12}{'async req/s':>13}{'speedup':>9}")
+        for name, result in sorted(bench.throughput.items()):
+            terminalreporter.write_line(
+                f"{name:<22}{result['sync_rps']:>12.1f}{result['async_rps']:>13.1f}{result['speedup']:>8.2f}x"
+            )
+    if not bench.results:
+        return
+    terminalreporter.section('endpoint benchmarks')
+    terminalreporter.write_line(
+        f"{bench.dataset['restaurants']} restaurants, {bench.dataset['days']} days, "
+        f"{bench.dataset['orders_per_day']} orders/day on {bench.dataset['database']} ({bench.machine}); "
+        f"best of {bench.rounds} rounds of {bench.iterations} requests per endpoint"
+    )
+    baseline = bench.baseline.get('endpoints', {})
+    terminalreporter.write_line(f"{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'base p95':>10}")
+    for name, result in sorted(bench.results.items()):
+        base = baseline.get(name, {}).get('p95_ms')
+        terminalreporter.write_line(
+            f"{name:<22}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['queries']:>9}"
+            f"{'-' if base is None else f'{base:.2f}':>10}"
+        )
+    if bench.baseline and not bench.update_baseline and not bench.compares_latency():
+        terminalreporter.write_line(
+            f"Latency not compared: the baseline was recorded on {bench.baseline.get('machine')} "
+            "or with another dataset; only query counts were checked"
+        )
+    if bench.update_baseline:
+        terminalreporter.write_line(f'Baseline written to {bench.baseline_path}')
+
+
+@pytest.fixture(scope='session')
+def bench_session(pytestconfig):
+    return pytestconfig.bench_session
+
+
+@pytest.fixture
+def benchmark(bench_session, db):
+    """
+    Time a request: benchmark(name, send, expected_status=200)
+
+    `send` makes one request and returns the response. It runs for the
+    warmup, once more to count queries and then for the timed rounds; the
+    fastest round stands for the endpoint, which keeps one-off stalls on a
+    busy machine out of the comparison. The test fails if the result
+    regresses from the baseline.
+    """
+    def run(name, send, expected_status=200):
+        def checked():
+            response = send()
+            assert response.status_code == expected_status, (
+                f'{name}: HTTP {response.status_code} {getattr(response, "data", response.content)!r}'
+            )
+
+        for _ in range(bench_session.warmup):
+            checked()
+        with CaptureQueriesContext(connection) as queries:
+            checked()
+        query_count = len(queries)  # Read now; later requests reset the query log
+
+        rounds = [time_round(checked, bench_session.iterations) for _ in range(bench_session.rounds)]
+        samples = min(rounds, key=lambda samples: percentile(samples, 50))
+        result = {
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'queries': query_count,
+        }
+        bench_session.results[name] = result
+        problems = bench_session.regressions(name, result)
+        if problems:
+            pytest.fail(f'{name} regressed: ' + '; '.join(problems), pytrace=False)
+        return result
+
+    return run
+
+
+@pytest.fixture
+def concurrency_benchmark(bench_session, db):
+    """
+    Compare throughput: concurrency_benchmark(name, send, asend, check_speedup=True)
+
+    `send` makes one request through the sync views and `asend` awaits one
+    through the async views. Sync requests are served by a fixed pool of
+    threads, as by a gthread worker; async ones by one event loop with many
+    requests in flight. With check_speedup the test fails if async falls
+    short of --bench-min-speedup times the sync throughput; either way it
+    fails if async throughput regresses from the baseline.
+    """
+    def run(name, send, asend, expected_status=200, check_speedup=True):
+        def checked():
+            response = send()
+            assert response.status_code == expected_status, f'{name}: HTTP {response.status_code}'
+
+        async def achecked():
+            response = await asend()
+            assert response.status_code == expected_status, f'{name} (async): HTTP {response.status_code}'
+
+        load = bench_session.load
+        for _ in range(bench_session.warmup):
+            checked()
+            async_to_sync(achecked)()
+        sync_rps = run_threaded(checked, load['sync_threads'], load['requests'])
+        async_rps = run_concurrent(achecked, load['concurrency'], load['requests'])
+        result = {
+            'sync_rps': round(sync_rps, 1),
+            'async_rps': round(async_rps, 1),
+            'speedup': round(async_rps / sync_rps, 2),
+        }
+        bench_session.throughput[name] = result
+        min_speedup = bench_session.min_speedup if check_speedup else 0
+        problems = bench_session.throughput_regressions(name, result, min_speedup)
+        if problems:
+            pytest.fail(f'{name} concurrency: ' + '; '.join(problems), pytrace=False)
+        return result
+
+    return run
@@ -0,0 +1,17 @@
+"""
+Settings for the endpoint benchmarks
+Development settings, optionally against another database (BENCH_DATABASE_URL,
+e.g. postgres://localhost/seatserve; the test database is created next to it),
+with throttling off so repeated requests are measured rather than rejected
+"""
+import dj_database_url
+from decouple import config
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import REST_FRAMEWORK
+
+BENCH_DATABASE_URL = config('BENCH_DATABASE_URL', default='')
+if BENCH_DATABASE_URL:
+    DATABASES = {'default': dj_database_url.parse(BENCH_DATABASE_URL)}
+
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
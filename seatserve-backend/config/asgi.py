@@ -0,0 +1,16 @@
+"""
+ASGI config for seatserve project.
+Serves the whole API; required for the async streaming endpoints. Set
+ASYNC_GUEST_VIEWS to serve the public menu and order creation with their
+async views.
+Run with uvicorn workers, e.g.
+gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
@@ -0,0 +1,186 @@
+"""
+Read-replica database routing
+Safe (GET/HEAD/OPTIONS) requests read from one of REPLICA_DATABASES, picked
+once per request; everything else uses the primary. A request that writes
+reads from the primary for the rest of the request, and its response sets
+a short-lived cookie so the same client keeps reading the primary while
+replicas catch up (REPLICA_PIN_SECONDS). Views can override the choice with
+@use_primary and @allow_replica. Without replicas configured, or outside a
+request (management commands, tests without the middleware), all reads go
+to the primary.
+"""
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pinned'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current_routing = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    """Read routing of one request"""
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+        self.replica = None
+
+    def read_alias(self):
+        if not self.use_replica or self.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            self.replica = random.choice(settings.REPLICA_DATABASES)
+        return self.replica
+
+
+class ReplicaRouter:
+    """Send reads to a replica when the current request allows it"""
+
+    def db_for_read(self, model, **hints):
+        state = _current_routing.get()
+        if state is None or not settings.REPLICA_DATABASES:
+            return DEFAULT_DB_ALIAS
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _current_routing.get()
+        if state is not None:
+            state.wrote = True  # Read-your-writes: stay on the primary from here on
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+@contextmanager
+def routing(use_replica):
+    """Route reads in the block as given (inside a request, keeps its writes pinned)"""
+    state = _current_routing.get()
+    token = None
+    if state is None:
+        state = RoutingState(use_replica)
+        token = _current_routing.set(state)
+    previous, state.use_replica = state.use_replica, use_replica
+    try:
+        yield state
+    finally:
+        state.use_replica = previous
+        if token is not None:
+            _current_routing.reset(token)
+
+
+def _routed(view, use_replica):
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with routing(use_replica):
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with routing(use_replica):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def use_primary(view):
+    """Read from the primary in this view or viewset action, whatever the method"""
+    return _routed(view, use_replica=False)
+
+
+def allow_replica(view):
+    """Let this view or viewset action read from a replica on any method (read-only POSTs)"""
+    return _routed(view, use_replica=True)
+
+
+def _stream_with(state, content):
+    """Iterate streaming content with the request's routing (it runs after the middleware returns)"""
+    iterator = iter(content)
+    while True:
+        token = _current_routing.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _current_routing.reset(token)
+        yield chunk
+
+
+async def _astream_with(state, content):
+    """_stream_with() for async streaming content (iterated by the ASGI handler)"""
+    iterator = aiter(content)
+    while True:
+        token = _current_routing.set(state)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _current_routing.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    """Choose read routing per request and pin clients that wrote to the primary"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def start(request):
+        use_replica = request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+        return RoutingState(use_replica)
+
+    @staticmethod
+    def finish(request, response, state):
+        if not settings.REPLICA_DATABASES:
+            return response
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=request.is_secure(),
+                httponly=True,
+                samesite='Lax'
+            )
+        elif state.use_replica and response.streaming:
+            stream = _astream_with if response.is_async else _stream_with
+            response.streaming_content = stream(state, response.streaming_content)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.finish(request, response, state)
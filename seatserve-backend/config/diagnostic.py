@@ -172,7 +172,7 @@ class ProductionDiagnostic:
             self.success("Using optimized static file storage")
         
         # Check middleware
-        if 'whitenoise.middleware.WhiteNoiseMiddleware' in settings.MIDDLEWARE:
+        if any(path.endswith('WhiteNoiseMiddleware') for path in settings.MIDDLEWARE):
             self.success("WhiteNoise middleware is enabled")
         else:
             self.error("WhiteNoise middleware NOT found in MIDDLEWARE")
@@ -2,13 +2,19 @@
 Diagnostic views for production troubleshooting
 """
 
+import functools
+import hmac
 import json
 import os
 from pathlib import Path
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.conf import settings
+from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
 
+from config.profiling import ProfileStore, collapsed_stacks
+from payments.stripe_client import stripe_breaker
+
 
 @require_http_methods(["GET"])
 def diagnostic_endpoint(request):
@@ -74,9 +80,12 @@ def diagnostic_endpoint(request):
         },
         'django_settings': {
             'static_storage': getattr(settings, 'STATICFILES_STORAGE', 'default'),
-            'whitenoise_enabled': 'whitenoise.middleware.WhiteNoiseMiddleware' in settings.MIDDLEWARE,
+            'whitenoise_enabled': any(path.endswith('WhiteNoiseMiddleware') for path in settings.MIDDLEWARE),
             'secure_ssl_redirect': getattr(settings, 'SECURE_SSL_REDIRECT', False),
         },
+        'integrations': {
+            'stripe_circuit': stripe_breaker.snapshot(),
+        },
         'checks': {
             'index_html_found': False,
             'static_root_exists': os.path.isdir(settings.STATIC_ROOT),
@@ -157,3 +166,98 @@ def diagnostic_summary(request):
         'report': '\n'.join(lines),
         'timestamp': __import__('datetime').datetime.now().isoformat()
     })
+
+
+def _secret_matches(request):
+    """?secret= matches an explicitly set DIAGNOSTIC_SECRET"""
+    secret = getattr(settings, 'DIAGNOSTIC_SECRET', '')
+    return bool(secret) and hmac.compare_digest(request.GET.get('secret', '').encode(), secret.encode())
+
+
+def _profiles_allowed(request):
+    """DEBUG, a logged-in admin, or the diagnostic secret"""
+    return settings.DEBUG or request.user.is_staff or _secret_matches(request)
+
+
+def _csrf_protect_unless_secret(view):
+    """
+    CSRF protection for callers authorized by their session (a GET sets the
+    csrftoken cookie to send back in X-CSRFToken)
+
+    A request carrying the diagnostic secret is authorized by the secret
+    alone (a third-party page cannot know it), so cookieless scripts can
+    call the view without a CSRF token.
+    """
+    protected = csrf_protect(ensure_csrf_cookie(view))
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if _secret_matches(request):
+            return view(request, *args, **kwargs)
+        return protected(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True  # CsrfViewMiddleware would reject the secret callers; checked above instead
+    return wrapper
+
+
+def _profile_summary(profile):
+    return {key: value for key, value in profile.items() if key not in ('stacks', 'queries')}
+
+
+@_csrf_protect_unless_secret
+@require_http_methods(["GET", "POST"])
+def profiling_toggle(request):
+    """
+    Sampling profiler switch
+    POST {"enabled": true|false}; sampling switches itself off after PROFILING_TOGGLE_TTL
+    """
+    if not _profiles_allowed(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    if request.method == 'POST':
+        try:
+            enabled = json.loads(request.body or b'{}').get('enabled')
+        except (ValueError, AttributeError):
+            enabled = None
+        if not isinstance(enabled, bool):
+            return JsonResponse({'error': 'Send {"enabled": true} or {"enabled": false}'}, status=400)
+        ProfileStore.set_enabled(enabled)
+
+    return JsonResponse({
+        'enabled': ProfileStore.is_enabled(),
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'slow_ms': settings.PROFILING_SLOW_MS,
+        'expires_after_seconds': settings.PROFILING_TOGGLE_TTL,
+    })
+
+
+@require_http_methods(["GET"])
+def profile_list(request):
+    """Stored slow-request profiles, newest first"""
+    if not _profiles_allowed(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse({'profiles': [_profile_summary(profile) for profile in ProfileStore.all()]})
+
+
+@require_http_methods(["GET"])
+def profile_detail(request, profile_id):
+    """One profile with the SQL it executed"""
+    if not _profiles_allowed(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    profile = ProfileStore.get(profile_id)
+    if profile is None:
+        return JsonResponse({'error': 'Profile not found (it may have been overwritten)'}, status=404)
+    return JsonResponse({**_profile_summary(profile), 'queries': profile['queries']})
+
+
+@require_http_methods(["GET"])
+def profile_collapsed(request, profile_id):
+    """Download a profile in collapsed-stack format"""
+    if not _profiles_allowed(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    profile = ProfileStore.get(profile_id)
+    if profile is None:
+        return JsonResponse({'error': 'Profile not found (it may have been overwritten)'}, status=404)
+    response = HttpResponse(collapsed_stacks(profile), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.collapsed"'
+    return response
@@ -0,0 +1,367 @@
+"""
+Request metrics in Prometheus text format
+MetricsMiddleware records per-route latency, database queries and time,
+cache hits/misses and response size. Each process aggregates in memory;
+with METRICS_REDIS_URL set, every worker adds its counts to one Redis hash
+each METRICS_FLUSH_SECONDS from a background thread, so /metrics reports all
+gunicorn workers and a slow Redis never holds up a response.
+"""
+import hmac
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (help, buckets)
+HISTOGRAMS = {
+    'seatserve_http_request_duration_seconds': ('Time to produce the response', LATENCY_BUCKETS),
+    'seatserve_http_request_db_queries': ('Database queries per request', QUERY_BUCKETS),
+    'seatserve_http_request_db_duration_seconds': ('Time spent in database queries per request', LATENCY_BUCKETS),
+    'seatserve_http_response_size_bytes': ('Response body size (when known)', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'seatserve_http_cache_hits_total': 'Cache reads that found a value',
+    'seatserve_http_cache_misses_total': 'Cache reads that found nothing',
+}
+LABELS = ('route', 'method', 'status')
+FIELD_SEPARATOR = '\x1f'
+
+_current_request = ContextVar('metrics_request', default=None)
+_MISSING = object()
+
+
+class RequestStats:
+    """Database and cache activity of one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+def histogram_increments(name, labels, value):
+    """(key, amount) pairs recording one observation; keys are (name, labels, slot)"""
+    slot = bisect_left(HISTOGRAMS[name][1], value)  # First bucket with value <= le; len(buckets) is +Inf
+    return [((name, labels, str(slot)), 1), ((name, labels, 'sum'), value), ((name, labels, 'count'), 1)]
+
+
+class InMemoryMetricsStore:
+    """Metrics of this process only"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, increments):
+        with self._lock:
+            for key, amount in increments:
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class RedisMetricsStore(InMemoryMetricsStore):
+    """Counts added locally and flushed to a Redis hash shared by all workers"""
+
+    def __init__(self, url, key, flush_seconds, timeout=None):
+        super().__init__()
+        self.url = url
+        self.key = key
+        self.flush_seconds = flush_seconds
+        self.timeout = timeout
+        self._client = None
+        self._flushed_at = time.monotonic()
+        self._flushing = threading.Lock()
+
+    def client(self):
+        import redis
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                self.url, socket_connect_timeout=self.timeout, socket_timeout=self.timeout
+            )
+        return self._client
+
+    def add(self, increments):
+        super().add(increments)
+        if time.monotonic() - self._flushed_at >= self.flush_seconds and self._flushing.acquire(blocking=False):
+            # Off the request path (and the event loop under ASGI)
+            threading.Thread(target=self._flush_in_background, name='metrics-flush', daemon=True).start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            self._flushing.release()
+
+    def flush(self):
+        with self._lock:
+            pending, self._values = self._values, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            pipeline = self.client().pipeline(transaction=False)
+            for (name, labels, slot), amount in pending.items():
+                pipeline.hincrbyfloat(self.key, FIELD_SEPARATOR.join((name, *labels, slot)), amount)
+            pipeline.execute()
+        except Exception as e:
+            # Keep the counts for the next flush rather than losing them
+            logger.warning(f'Failed to flush metrics to Redis: {str(e)}')
+            super().add(pending.items())
+
+    def snapshot(self):
+        self.flush()
+        values = {}
+        for field, amount in self.client().hgetall(self.key).items():
+            name, *labels, slot = field.decode().split(FIELD_SEPARATOR)
+            values[(name, tuple(labels), slot)] = float(amount)
+        return values
+
+    def clear(self):
+        super().clear()
+        self.client().delete(self.key)
+
+
+class MetricsRegistry:
+    """Process-wide metrics store, chosen from settings on first use"""
+
+    _store = None
+
+    @classmethod
+    def get_store(cls):
+        if cls._store is None:
+            if settings.METRICS_REDIS_URL:
+                cls._store = RedisMetricsStore(
+                    settings.METRICS_REDIS_URL, settings.METRICS_REDIS_KEY, settings.METRICS_FLUSH_SECONDS,
+                    timeout=settings.METRICS_REDIS_TIMEOUT
+                )
+            else:
+                cls._store = InMemoryMetricsStore()
+        return cls._store
+
+    @classmethod
+    def record(cls, labels, duration, stats, size):
+        increments = (
+            histogram_increments('seatserve_http_request_duration_seconds', labels, duration)
+            + histogram_increments('seatserve_http_request_db_queries', labels, stats.queries)
+            + histogram_increments('seatserve_http_request_db_duration_seconds', labels, stats.db_seconds)
+        )
+        if size is not None:
+            increments += histogram_increments('seatserve_http_response_size_bytes', labels, size)
+        if stats.cache_hits:
+            increments.append((('seatserve_http_cache_hits_total', labels, 'total'), stats.cache_hits))
+        if stats.cache_misses:
+            increments.append((('seatserve_http_cache_misses_total', labels, 'total'), stats.cache_misses))
+        cls.get_store().add(increments)
+
+
+def count_cache_reads(hits, misses):
+    """Add cache reads to the request in progress, if any"""
+    stats = _current_request.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def _execute(execute, sql, params, many, context):
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.record_query(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    """
+    Count a connection's queries for whichever request runs them
+
+    The request is found through a context variable, so queries that async
+    views run in worker threads (on those threads' connections) count too.
+    """
+    if _execute not in connection.execute_wrappers:
+        # First in the list: execute_wrapper() blocks pop the last wrapper on exit
+        connection.execute_wrappers.insert(0, _execute)
+
+
+def instrument_databases():
+    connection_created.connect(instrument_connection, dispatch_uid='config.metrics')
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(connection)
+
+
+def instrument_cache_backends():
+    """Count hits and misses of the configured cache backends' reads"""
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if backend.__dict__.get('_metrics_instrumented'):
+            continue
+        original_get = backend.get
+
+        def get(self, key, default=None, *args, _get=original_get, **kwargs):
+            value = _get(self, key, _MISSING, *args, **kwargs)
+            count_cache_reads(value is not _MISSING, value is _MISSING)
+            return default if value is _MISSING else value
+
+        backend.get = get
+        # BaseCache.get_many reads through get(), so only native get_many needs counting
+        if backend.get_many is not BaseCache.get_many:
+            original_get_many = backend.get_many
+
+            def get_many(self, keys, *args, _get_many=original_get_many, **kwargs):
+                keys = list(keys)
+                found = _get_many(self, keys, *args, **kwargs)
+                count_cache_reads(len(found), len(keys) - len(found))
+                return found
+
+            backend.get_many = get_many
+        backend._metrics_instrumented = True
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Record latency, DB, cache and size metrics per route (sync and async)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if settings.METRICS_ENABLED:
+            instrument_cache_backends()
+            instrument_databases()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, stats, duration):
+        route = route_label(request)
+        if route == 'metrics':
+            return
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+        labels = (route, request.method, f'{response.status_code // 100}xx')
+        MetricsRegistry.record(labels, duration, stats, size)
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _label_text(labels, **extra):
+    pairs = list(zip(LABELS, labels)) + list(extra.items())
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_metrics(values):
+    """Prometheus text exposition of a store snapshot"""
+    series = {}
+    for (name, labels, slot), amount in values.items():
+        series.setdefault(name, {}).setdefault(tuple(labels), {})[slot] = amount
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, slots in sorted(series.get(name, {}).items()):
+            cumulative = 0
+            for index, bound in enumerate(buckets + (math.inf,)):
+                cumulative += slots.get(str(index), 0)
+                le = '+Inf' if bound == math.inf else str(bound)
+                lines.append(f'{name}_bucket{_label_text(labels, le=le)} {_number(cumulative)}')
+            lines.append(f"{name}_sum{_label_text(labels)} {_number(slots.get('sum', 0))}")
+            lines.append(f"{name}_count{_label_text(labels)} {_number(slots.get('count', 0))}")
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for labels, slots in sorted(series.get(name, {}).items()):
+            lines.append(f"{name}{_label_text(labels)} {_number(slots.get('total', 0))}")
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_endpoint(request):
+    """
+    Prometheus scrape endpoint
+    Needs `Authorization: Bearer <METRICS_TOKEN>`; without a token configured
+    it is only open in DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse('Metrics are disabled: set METRICS_TOKEN\n', status=403, content_type='text/plain')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        response = HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    return HttpResponse(
+        render_metrics(MetricsRegistry.get_store().snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,286 @@
+"""
+Sampling profiler for slow requests
+ProfilingMiddleware samples the request thread's call stack every
+PROFILING_INTERVAL_MS and records the SQL it runs. A request is profiled
+when it carries `X-Profile: <PROFILING_TOKEN>`, or, while profiling is
+switched on from the diagnostic area, for a PROFILING_SAMPLE_RATE share of
+requests. Sampled requests slower than PROFILING_SLOW_MS are kept in a ring
+buffer of PROFILING_BUFFER_SIZE profiles in the cache, shared by all workers
+when the cache is, and downloadable as collapsed stacks (flamegraph.pl,
+speedscope). Under ASGI the sampled thread is the one running the request's
+sync code (the view, or the async ORM calls of an async view).
+"""
+import hmac
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from restaurants.async_cache import async_cache
+
+ENABLED_KEY = 'profiling:enabled'
+SEQUENCE_KEY = 'profiling:seq'
+PROFILE_HEADER = 'X-Profile'
+
+_current_profile = ContextVar('profiling_request', default=None)
+
+
+def _slot_key(slot):
+    return f'profiling:slot:{slot}'
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame):
+    """'root;caller;callee' for a frame, outermost call first"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Counts the call stacks of one thread, sampled from a helper thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.thread_id is None:  # Not known yet (async requests)
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class QueryRecorder:
+    """DB execute wrapper keeping the SQL (without parameters) and its timing"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += elapsed
+            if len(self.queries) < self.limit:
+                self.queries.append({'sql': sql, 'ms': round(elapsed, 3), 'many': many})
+
+
+class RequestProfile:
+    """Stack samples and SQL of one profiled request"""
+
+    def __init__(self, thread_id):
+        self.sampler = StackSampler(thread_id, settings.PROFILING_INTERVAL_MS / 1000)
+        self.recorder = QueryRecorder(settings.PROFILING_MAX_QUERIES)
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.sampler.start()
+
+    def end(self):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+
+def _execute(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.recorder(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    """Record a connection's queries for whichever profiled request runs them"""
+    if _execute not in connection.execute_wrappers:
+        # First in the list: execute_wrapper() blocks pop the last wrapper on exit
+        connection.execute_wrappers.insert(0, _execute)
+
+
+def instrument_databases():
+    connection_created.connect(instrument_connection, dispatch_uid='config.profiling')
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(connection)
+
+
+def _sync_thread():
+    """Ident of the calling thread, with the connections it already opened instrumented"""
+    instrument_databases()
+    return threading.get_ident()
+
+
+class ProfileStore:
+    """Ring buffer of profiles in the cache, plus the sampling switch"""
+
+    _enabled = False
+    _enabled_checked_at = 0.0
+
+    @classmethod
+    def set_enabled(cls, enabled):
+        if enabled:
+            cache.set(ENABLED_KEY, True, settings.PROFILING_TOGGLE_TTL)
+        else:
+            cache.delete(ENABLED_KEY)
+        cls._enabled_checked_at = 0.0
+
+    @classmethod
+    def is_enabled(cls):
+        """Whether sampling is switched on (read from the cache at most once a second)"""
+        if time.monotonic() - cls._enabled_checked_at >= 1:
+            cls._enabled = bool(cache.get(ENABLED_KEY))
+            cls._enabled_checked_at = time.monotonic()
+        return cls._enabled
+
+    @classmethod
+    async def ais_enabled(cls):
+        if time.monotonic() - cls._enabled_checked_at >= 1:
+            cls._enabled = bool(await async_cache.get(ENABLED_KEY))
+            cls._enabled_checked_at = time.monotonic()
+        return cls._enabled
+
+    @staticmethod
+    def save(profile):
+        """Store a profile over the oldest one; returns its id"""
+        cache.add(SEQUENCE_KEY, 0, None)
+        profile_id = cache.incr(SEQUENCE_KEY)
+        profile['id'] = profile_id
+        cache.set(_slot_key(profile_id % settings.PROFILING_BUFFER_SIZE), profile, settings.PROFILING_RETENTION)
+        return profile_id
+
+    @staticmethod
+    def get(profile_id):
+        profile = cache.get(_slot_key(profile_id % settings.PROFILING_BUFFER_SIZE))
+        return profile if profile and profile['id'] == profile_id else None
+
+    @staticmethod
+    def all():
+        """Stored profiles, newest first"""
+        keys = [_slot_key(slot) for slot in range(settings.PROFILING_BUFFER_SIZE)]
+        return sorted(cache.get_many(keys).values(), key=lambda profile: profile['id'], reverse=True)
+
+    @staticmethod
+    def clear():
+        cache.delete_many([SEQUENCE_KEY] + [_slot_key(slot) for slot in range(settings.PROFILING_BUFFER_SIZE)])
+
+
+def collapsed_stacks(profile):
+    """Collapsed-stack text ('frame;frame;frame count' per line)"""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(profile['stacks'].items()))
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests chosen by header or by the sampling switch
+
+    An async request shares the event loop thread with every other request,
+    so it is not sampled there: its sync code runs in the request's
+    thread-sensitive worker thread, which is looked up before the rest of
+    the chain runs and sampled instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        instrument_databases()
+
+    @staticmethod
+    def requested(request):
+        token = settings.PROFILING_TOKEN
+        header = request.headers.get(PROFILE_HEADER)
+        return bool(token and header) and hmac.compare_digest(header.encode(), token.encode())
+
+    @staticmethod
+    def sampled(enabled):
+        return enabled and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        forced = self.requested(request)
+        if not forced and not self.sampled(ProfileStore.is_enabled()):
+            return self.get_response(request)
+
+        profile = RequestProfile(threading.get_ident())
+        token = _current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+            profile.end()
+        return self.finish(request, response, profile, forced)
+
+    async def __acall__(self, request):
+        forced = self.requested(request)
+        if not forced and not self.sampled(await ProfileStore.ais_enabled()):
+            return await self.get_response(request)
+
+        profile = RequestProfile(None)
+        token = _current_profile.set(profile)
+        try:
+            # Sync views and async ORM calls run in this request's thread-sensitive thread
+            profile.sampler.thread_id = await sync_to_async(_sync_thread)()
+            response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+            profile.end()
+        # Joining the sampler and saving to the cache block, so not on the event loop
+        return await sync_to_async(self.finish, thread_sensitive=False)(request, response, profile, forced)
+
+    @staticmethod
+    def finish(request, response, profile, forced):
+        profile.sampler.stop()
+        if forced or profile.duration_ms >= settings.PROFILING_SLOW_MS:
+            match = getattr(request, 'resolver_match', None)
+            sampler, recorder = profile.sampler, profile.recorder
+            profile_id = ProfileStore.save({
+                'method': request.method,
+                'path': request.path,
+                'route': match.view_name if match else '',
+                'status': response.status_code,
+                'duration_ms': round(profile.duration_ms, 3),
+                'forced': forced,
+                'created_at': timezone.now().isoformat(),
+                'interval_ms': settings.PROFILING_INTERVAL_MS,
+                'samples': sum(sampler.stacks.values()),
+                'stacks': dict(sampler.stacks),
+                'query_count': recorder.count,
+                'sql_ms': round(recorder.total_ms, 3),
+                'queries': recorder.queries,
+            })
+            if forced:
+                response['X-Profile-Id'] = str(profile_id)
+        return response
@@ -4,7 +4,8 @@ Django settings for seatserve project.
 
 import os
 from pathlib import Path
-from decouple import config
+import dj_database_url
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,16 +33,21 @@ INSTALLED_APPS = [
     'menu',
     'orders',
     'payments',
+    'analytics',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files
+    'config.static_files.AsyncWhiteNoiseMiddleware',  # Serve static files
+    'config.metrics.MetricsMiddleware',  # After WhiteNoise: static files are not measured
+    'config.profiling.ProfilingMiddleware',
+    'config.db_router.ReplicaRoutingMiddleware',  # Before anything that reads the database
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'restaurants.middleware.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,6 +71,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
 DATABASES = {
@@ -74,6 +81,15 @@ DATABASES = {
     }
 }
 
+# Read replicas (comma-separated database URLs), routed by config.db_router
+# e.g. DATABASE_REPLICA_URLS=sqlite:///db-replica.sqlite3 to try routing locally
+REPLICA_DATABASES = []
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(url)
+    REPLICA_DATABASES.append(f'replica_{index}')
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)  # Read-your-writes window after a write
+
 # Use PostgreSQL in production:
 # DATABASES = {
 #     'default': {
@@ -149,6 +165,7 @@ REST_FRAMEWORK = {
 
 # CORS Configuration (environment-specific)
 import os
+from corsheaders.defaults import default_headers
 if os.environ.get('DEBUG', 'True') == 'False':
     CORS_ALLOWED_ORIGINS = config(
         'CORS_ALLOWED_ORIGINS',
@@ -162,7 +179,8 @@ else:
     ]
 
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ['Content-Type', 'Authorization']
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Content-Type', 'Authorization', 'Idempotent-Replayed']
 
 # JWT Configuration with HTTP-Only Cookies
 from datetime import timedelta
@@ -246,6 +264,15 @@ STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='pk_test_dev')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='sk_test_dev')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='whsec_test_dev')
 
+# Stripe HTTP client: keep-alive pool, strict timeouts, bounded retries, circuit breaker
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='')  # e.g. http://localhost:12111 for manage.py fake_stripe
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3.0, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10.0, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
+STRIPE_POOL_SIZE = config('STRIPE_POOL_SIZE', default=10, cast=int)
+STRIPE_BREAKER_FAILURE_THRESHOLD = config('STRIPE_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+STRIPE_BREAKER_RECOVERY_SECONDS = config('STRIPE_BREAKER_RECOVERY_SECONDS', default=30, cast=int)
+
 if not DEBUG:
     if not STRIPE_SECRET_KEY.startswith('sk_'):
         raise ValueError('Invalid STRIPE_SECRET_KEY format')
@@ -255,6 +282,19 @@ if not DEBUG:
 # Frontend URL for payment redirects
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 
+# Table QR codes: base of the encoded guest ordering URL, and image cache lifetime
+QR_ORDER_BASE_URL = config('QR_ORDER_BASE_URL', default=FRONTEND_URL)
+QR_IMAGE_MAX_AGE = config('QR_IMAGE_MAX_AGE', default=31536000, cast=int)  # 1 year (URLs are content-hashed)
+QR_RENDER_WORKERS = config('QR_RENDER_WORKERS', default=os.cpu_count() or 1, cast=int)
+QR_JOB_TTL = config('QR_JOB_TTL', default=3600, cast=int)  # Seconds a bulk render job's status is kept
+# A job whose heartbeat is older than this is restarted by the next status poll (its process died)
+QR_JOB_STALE_SECONDS = config('QR_JOB_STALE_SECONDS', default=120, cast=int)
+QR_JOB_MAX_ATTEMPTS = config('QR_JOB_MAX_ATTEMPTS', default=3, cast=int)
+
+# Bulk table creation: batch size limit, and the largest batch whose QR codes render inline
+TABLE_BULK_MAX = config('TABLE_BULK_MAX', default=200, cast=int)
+TABLE_BULK_SYNC_QR_MAX = config('TABLE_BULK_SYNC_QR_MAX', default=10, cast=int)
+
 # HTTPS/Security Headers
 SECURE_SSL_REDIRECT = not DEBUG
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -284,6 +324,75 @@ CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localho
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+# Stripe webhook inbox worker (manage.py process_webhooks)
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=50, cast=int)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=8, cast=int)
+WEBHOOK_RETRY_BASE_SECONDS = config('WEBHOOK_RETRY_BASE_SECONDS', default=30, cast=int)
+WEBHOOK_RETRY_MAX_SECONDS = config('WEBHOOK_RETRY_MAX_SECONDS', default=3600, cast=int)
+WEBHOOK_LOCK_SECONDS = config('WEBHOOK_LOCK_SECONDS', default=300, cast=int)  # lease before a stuck event is reclaimed
+
+# Per-user restaurant lookup cache (seconds)
+TENANT_CACHE_TTL = config('TENANT_CACHE_TTL', default=60, cast=int)
+
+# Plan entitlements cache (seconds); invalidated on subscription/usage changes
+ENTITLEMENTS_CACHE_TTL = config('ENTITLEMENTS_CACHE_TTL', default=300, cast=int)
+
+# Order change feed: each delta re-sends changes from this many seconds before the
+# cursor, so an order stamped earlier but committed later is not skipped (clients upsert by id)
+ORDER_CHANGES_OVERLAP_SECONDS = config('ORDER_CHANGES_OVERLAP_SECONDS', default=10, cast=int)
+
+# Dashboard statistics cache (seconds)
+DASHBOARD_STATS_CACHE_TTL = config('DASHBOARD_STATS_CACHE_TTL', default=5, cast=int)
+
+# Longest date range served by the analytics endpoints (days)
+ANALYTICS_MAX_DAYS = config('ANALYTICS_MAX_DAYS', default=366, cast=int)
+
+# Streaming exports: rows fetched per database cursor round trip
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Upper bound on line items per guest order
+MAX_ITEMS_PER_ORDER = config('MAX_ITEMS_PER_ORDER', default=50, cast=int)
+
+# Guest orders are marked PAID on creation while there is no checkout step
+# in the guest flow; turn off once orders are paid through the payment gateway
+ORDERS_PAID_ON_CREATE = config('ORDERS_PAID_ON_CREATE', default=True, cast=bool)
+
+# Idempotency-Key replay window (needs a shared cache such as Redis across workers)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Live order streams (Server-Sent Events)
+# Set a Redis URL when running more than one worker process
+ORDER_EVENTS_REDIS_URL = config('ORDER_EVENTS_REDIS_URL', default='')
+ORDER_STREAM_HEARTBEAT_SECONDS = config('ORDER_STREAM_HEARTBEAT_SECONDS', default=15, cast=int)
+ORDER_STREAM_MAX_SECONDS = config('ORDER_STREAM_MAX_SECONDS', default=300, cast=int)
+
+# Serve the public menu / create order routes with async views (orders.async_views)
+# under config.asgi; off until benchmarks/bench_concurrency.py shows a gain for each route
+ASYNC_GUEST_VIEWS = config('ASYNC_GUEST_VIEWS', default=False, cast=bool)
+
+# Request metrics (Prometheus format on /metrics, scraped with `Authorization: Bearer <METRICS_TOKEN>`)
+# Without a Redis URL each worker process reports only its own requests
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_REDIS_URL = config('METRICS_REDIS_URL', default='')
+METRICS_REDIS_KEY = config('METRICS_REDIS_KEY', default='seatserve:metrics')
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=float)
+METRICS_REDIS_TIMEOUT = config('METRICS_REDIS_TIMEOUT', default=2, cast=float)  # Connect and read, seconds
+
+# Sampling profiler for slow requests (profiles under /diagnostic/profiles/)
+# A request is profiled when it sends `X-Profile: <PROFILING_TOKEN>`, or while sampling is
+# switched on at /diagnostic/profiling/ (then PROFILING_SAMPLE_RATE of requests, kept if slower
+# than PROFILING_SLOW_MS)
+PROFILING_TOKEN = config('PROFILING_TOKEN', default='')
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.05, cast=float)
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=500, cast=float)
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=5, cast=float)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=50, cast=int)
+PROFILING_MAX_QUERIES = config('PROFILING_MAX_QUERIES', default=200, cast=int)  # SQL statements kept per profile
+PROFILING_RETENTION = config('PROFILING_RETENTION', default=60 * 60 * 24, cast=int)
+PROFILING_TOGGLE_TTL = config('PROFILING_TOGGLE_TTL', default=60 * 60, cast=int)
+
 # WhiteNoise Configuration for efficient static file serving
 # Use StaticFilesStorage (no hashing, no renaming)
 # WhiteNoise middleware will serve files directly from disk
@@ -293,3 +402,8 @@ STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 WHITENOISE_AUTOREFRESH = False
 WHITENOISE_USE_FINDERS = True
 
+# SPA shell (index.html) is cached in memory; how often to check it for a new build,
+# and how browsers may cache it (no-cache: always revalidate, answered with a 304)
+SPA_INDEX_CHECK_SECONDS = config('SPA_INDEX_CHECK_SECONDS', default=0 if DEBUG else 2, cast=float)
+SPA_INDEX_CACHE_CONTROL = config('SPA_INDEX_CACHE_CONTROL', default='no-cache')
+
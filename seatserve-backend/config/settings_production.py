@@ -4,7 +4,7 @@ Import this in addition to base settings in production environment
 """
 
 import os
-from decouple import config
+from decouple import Csv, config
 
 # ============================================================================
 # SECURITY SETTINGS (Production)
@@ -55,6 +55,16 @@ if config('DATABASE_URL', default=None):
         conn_health_checks=True,
     )
 
+# Read replicas (comma-separated database URLs): dashboard lists, stats,
+# exports and public reads go to them; see config/db_router.py
+REPLICA_DATABASES = []
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    DATABASES[f'replica_{index}']['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(f'replica_{index}')
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)  # Read-your-writes window after a write
+
 # ============================================================================
 # CACHING (Redis)
 # ============================================================================
@@ -73,6 +83,12 @@ CACHES = {
     }
 }
 
+# Live order streams fan out across workers through Redis pub/sub
+ORDER_EVENTS_REDIS_URL = config('ORDER_EVENTS_REDIS_URL', default=config('REDIS_URL', default='redis://127.0.0.1:6379/1'))
+
+# Request metrics are aggregated across workers in Redis
+METRICS_REDIS_URL = config('METRICS_REDIS_URL', default=config('REDIS_URL', default='redis://127.0.0.1:6379/1'))
+
 # ============================================================================
 # STATIC FILES (Production)
 # ============================================================================
@@ -80,11 +96,15 @@ CACHES = {
 # WhiteNoise for efficient static file serving
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Must be after SecurityMiddleware
+    'config.static_files.AsyncWhiteNoiseMiddleware',  # Must be after SecurityMiddleware
+    'config.metrics.MetricsMiddleware',
+    'config.profiling.ProfilingMiddleware',
+    'config.db_router.ReplicaRoutingMiddleware',  # Before anything that reads the database
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'restaurants.middleware.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
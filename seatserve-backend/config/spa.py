@@ -0,0 +1,123 @@
+"""
+SPA shell (index.html) serving
+The shell is read once per process and kept in memory with its ETag and
+precompressed gzip/brotli variants; the file is only re-read when its mtime
+changes, and its mtime is only checked every SPA_INDEX_CHECK_SECONDS
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+
+class SpaShell:
+    """One loaded version of index.html"""
+
+    def __init__(self, body, mtime):
+        self.mtime = mtime
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.last_modified = http_date(mtime)
+        self.variants = {'identity': body}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+            if len(compressed) < len(body):
+                self.variants['br'] = compressed
+
+
+class SpaIndex:
+    """Process-wide cache of the shell, reloaded when the file changes"""
+
+    def __init__(self):
+        self._shell = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path():
+        return os.path.join(settings.STATIC_ROOT, 'index.html')
+
+    def get(self):
+        """Current shell, or None if index.html does not exist"""
+        if time.monotonic() - self._checked_at < settings.SPA_INDEX_CHECK_SECONDS:
+            return self._shell
+
+        with self._lock:
+            try:
+                mtime = os.stat(self.path()).st_mtime
+                if self._shell is None or self._shell.mtime != mtime:
+                    with open(self.path(), 'rb') as f:
+                        self._shell = SpaShell(f.read(), mtime)
+            except OSError:
+                self._shell = None
+            self._checked_at = time.monotonic()
+            return self._shell
+
+    def clear(self):
+        with self._lock:
+            self._shell = None
+            self._checked_at = 0.0
+
+
+spa_index = SpaIndex()
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts (q > 0) from an Accept-Encoding header"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def spa_fallback(request, path=''):
+    """
+    Serve React index.html for SPA routing on all non-API routes.
+    Static files are served by WhiteNoise middleware BEFORE this view runs.
+    """
+    shell = spa_index.get()
+    if shell is None:
+        return HttpResponse(
+            '<!DOCTYPE html><html><body><h1>Frontend Not Found</h1>'
+            '<p>index.html could not be located at: ' + SpaIndex.path() + '</p></body></html>',
+            status=404,
+            content_type='text/html'
+        )
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if shell.etag in (tag.strip() for tag in if_none_match.split(',')):
+        response = HttpResponseNotModified()
+    else:
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = next((coding for coding in ('br', 'gzip') if coding in accepted and coding in shell.variants), None)
+        response = HttpResponse(shell.variants[encoding or 'identity'], content_type='text/html; charset=utf-8')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Content-Length'] = len(response.content)
+        response['Last-Modified'] = shell.last_modified
+
+    response['ETag'] = shell.etag
+    response['Cache-Control'] = settings.SPA_INDEX_CACHE_CONTROL
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,357 @@
+"""
+Tests for project-level views
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest import skipUnless
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.db_router import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, allow_replica, use_primary
+from config.metrics import (
+    InMemoryMetricsStore, MetricsRegistry, RedisMetricsStore, instrument_databases, render_metrics
+)
+from config.profiling import ProfileStore
+from config.spa import accepted_encodings, spa_index
+from accounts.models import User
+from orders.models import Order
+from orders.tests import create_restaurant_fixture
+from restaurants.models import Plan, Restaurant
+
+
+class SpaFallbackTest(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        settings_override = override_settings(STATIC_ROOT=self.static_root, SPA_INDEX_CHECK_SECONDS=60)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        spa_index.clear()
+        self.addCleanup(spa_index.clear)
+
+        self.index_path = os.path.join(self.static_root, 'index.html')
+        self.write_index('<!DOCTYPE html><html><body><div id="root"></div>' + ' ' * 2000 + '</body></html>')
+
+    def write_index(self, html, mtime=1_700_000_000):
+        with open(self.index_path, 'w') as f:
+            f.write(html)
+        os.utime(self.index_path, (mtime, mtime))
+
+    def test_serves_compressed_shell_with_etag(self):
+        response = self.client.get('/kitchen/orders', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'id="root"', gzip.decompress(response.content))
+
+        response = self.client.get('/kitchen/orders', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        plain = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn(b'id="root"', plain.content)
+
+    def test_reloads_when_file_changes(self):
+        etag = self.client.get('/').headers['ETag']
+        self.write_index('<html>new build</html>', mtime=1_800_000_000)
+        self.assertEqual(self.client.get('/').headers['ETag'], etag)  # Within the check interval
+
+        with override_settings(SPA_INDEX_CHECK_SECONDS=0):
+            response = self.client.get('/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'<html>new build</html>')
+
+    def test_missing_index(self):
+        os.remove(self.index_path)
+        with override_settings(SPA_INDEX_CHECK_SECONDS=0):
+            self.assertEqual(self.client.get('/').status_code, 404)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('br;q=1.0, gzip;q=0, identity'), {'br', 'identity'})
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        MetricsRegistry.get_store().clear()
+        self.addCleanup(MetricsRegistry.get_store().clear)
+
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_records_route_metrics(self):
+        fixture = create_restaurant_fixture()
+        url = f"/api/public/restaurant/{fixture['restaurant'].public_id}/table/{fixture['table'].token}/menu/"
+        self.client.get(url)
+        self.client.get(url)  # Served from the cached snapshot
+        self.client.get('/health/')
+
+        body = self.scrape()
+        labels = '{route="public_menu",method="GET",status="2xx"}'
+        self.assertIn(f'seatserve_http_request_duration_seconds_count{labels} 2', body)
+        self.assertIn(f'seatserve_http_response_size_bytes_count{labels} 2', body)
+        self.assertIn(f'seatserve_http_cache_hits_total{labels}', body)
+        self.assertIn(f'seatserve_http_cache_misses_total{labels}', body)
+        self.assertIn('seatserve_http_request_db_queries_bucket{route="config.urls.health_check",method="GET",'
+                      'status="2xx",le="0"} 1', body)
+        self.assertNotIn('route="metrics"', body)
+
+        queries = MetricsRegistry.get_store().snapshot()[
+            ('seatserve_http_request_db_queries', ('public_menu', 'GET', '2xx'), 'sum')]
+        self.assertGreater(queries, 0)
+
+    @override_settings(ROOT_URLCONF='orders.tests')
+    def test_records_async_requests(self):
+        fixture = create_restaurant_fixture()
+        url = f"/api/public/restaurant/{fixture['restaurant'].public_id}/table/{fixture['table'].token}/menu/"
+        instrument_databases()  # This thread's connection opened before the async handler loaded the middleware
+        async_to_sync(self.async_client.get)(url)
+
+        values = MetricsRegistry.get_store().snapshot()
+        labels = ('public_menu', 'GET', '2xx')
+        self.assertEqual(values[('seatserve_http_request_duration_seconds', labels, 'count')], 1)
+        self.assertGreater(values[('seatserve_http_request_db_queries', labels, 'sum')], 0)
+        self.assertGreater(values[('seatserve_http_cache_misses_total', labels, 'total')], 0)
+
+    def test_histogram_buckets_are_cumulative(self):
+        MetricsRegistry.get_store().add([
+            (('seatserve_http_request_db_queries', ('r', 'GET', '2xx'), '1'), 2),
+            (('seatserve_http_request_db_queries', ('r', 'GET', '2xx'), '4'), 1),
+            (('seatserve_http_request_db_queries', ('r', 'GET', '2xx'), 'count'), 3),
+        ])
+        body = render_metrics(MetricsRegistry.get_store().snapshot())
+        self.assertIn('seatserve_http_request_db_queries_bucket{route="r",method="GET",status="2xx",le="0"} 0', body)
+        self.assertIn('seatserve_http_request_db_queries_bucket{route="r",method="GET",status="2xx",le="3"} 2', body)
+        self.assertIn('seatserve_http_request_db_queries_bucket{route="r",method="GET",status="2xx",le="5"} 3', body)
+        self.assertIn('seatserve_http_request_db_queries_bucket{route="r",method="GET",status="2xx",le="+Inf"} 3', body)
+
+    def test_redis_flush_does_not_block_requests(self):
+        store = RedisMetricsStore('redis://10.255.255.1:6379/0', 'metrics-test', flush_seconds=0, timeout=0.5)
+        increments = [(('seatserve_http_cache_hits_total', ('r', 'GET', '2xx'), 'total'), 1)]
+        started = time.perf_counter()
+        store.add(increments)
+        self.assertLess(time.perf_counter() - started, 0.25)
+
+        self.assertTrue(store._flushing.acquire(timeout=5))  # The background flush gave up
+        self.assertEqual(InMemoryMetricsStore.snapshot(store), dict(increments))  # Kept for the next flush
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        with override_settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+@override_settings(PROFILING_TOKEN='profile-token', PROFILING_INTERVAL_MS=1, PROFILING_BUFFER_SIZE=3,
+                   DIAGNOSTIC_SECRET='diag', DEBUG=False)
+class ProfilingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        ProfileStore.set_enabled(False)
+        self.fixture = create_restaurant_fixture()
+        restaurant = self.fixture['restaurant']
+        self.url = f"/api/public/restaurant/{restaurant.public_id}/table/{self.fixture['table'].token}/menu/"
+
+    def test_header_profiles_request(self):
+        self.assertNotIn('X-Profile-Id', self.client.get(self.url, HTTP_X_PROFILE='wrong'))
+        response = self.client.get(self.url, HTTP_X_PROFILE='profile-token')
+        profile_id = int(response['X-Profile-Id'])
+
+        detail = self.client.get(f'/diagnostic/profiles/{profile_id}/?secret=diag').json()
+        self.assertEqual(detail['route'], 'public_menu')
+        self.assertGreater(detail['query_count'], 0)
+        self.assertIn('SELECT', detail['queries'][0]['sql'])
+
+        collapsed = self.client.get(f'/diagnostic/profiles/{profile_id}/collapsed/?secret=diag')
+        self.assertIn('attachment', collapsed['Content-Disposition'])
+        for line in collapsed.content.decode().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertIn(';', stack)
+            self.assertGreater(int(count), 0)
+
+    async def test_header_profiles_async_request(self):
+        response = await self.async_client.get(self.url, headers={'X-Profile': 'profile-token'})
+        profile_id = int(response['X-Profile-Id'])
+
+        detail = (await self.async_client.get(f'/diagnostic/profiles/{profile_id}/?secret=diag')).json()
+        self.assertEqual(detail['route'], 'public_menu')
+        self.assertGreater(detail['query_count'], 0)
+        self.assertGreater(detail['samples'], 0)
+
+    def test_ring_buffer_keeps_latest(self):
+        ids = [int(self.client.get(self.url, HTTP_X_PROFILE='profile-token')['X-Profile-Id']) for _ in range(5)]
+        listed = [profile['id'] for profile in self.client.get('/diagnostic/profiles/?secret=diag').json()['profiles']]
+        self.assertEqual(listed, ids[:1:-1])
+        self.assertEqual(self.client.get(f'/diagnostic/profiles/{ids[0]}/?secret=diag').status_code, 404)
+
+    def test_sampling_switch_keeps_slow_requests(self):
+        self.client.post('/diagnostic/profiling/?secret=diag', {'enabled': True}, content_type='application/json')
+        with override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0):
+            self.client.get(self.url)
+        with override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=60_000):
+            self.client.get(self.url)
+        self.assertEqual(len(ProfileStore.all()), 1)
+
+        response = self.client.post('/diagnostic/profiling/?secret=diag', {'enabled': False},
+                                    content_type='application/json')
+        self.assertFalse(response.json()['enabled'])
+
+    def test_toggle_needs_csrf_token_with_session(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='admin123')
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(admin)
+        response = client.post('/diagnostic/profiling/', {'enabled': True}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ProfileStore.is_enabled())
+
+        client.get('/diagnostic/profiling/')
+        response = client.post('/diagnostic/profiling/', {'enabled': True}, content_type='application/json',
+                               HTTP_X_CSRFTOKEN=client.cookies['csrftoken'].value)
+        self.assertTrue(response.json()['enabled'])
+
+        # The secret alone is enough for cookieless callers
+        response = Client(enforce_csrf_checks=True).post(
+            '/diagnostic/profiling/?secret=diag', {'enabled': False}, content_type='application/json'
+        )
+        self.assertFalse(response.json()['enabled'])
+
+    def test_requires_admin_or_secret(self):
+        self.assertEqual(self.client.get('/diagnostic/profiles/').status_code, 403)
+        self.assertEqual(self.client.get('/diagnostic/profiles/?secret=nope').status_code, 403)
+        admin = User.objects.create_superuser(email='admin@example.com', password='admin123')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/diagnostic/profiles/').status_code, 200)
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class ReplicaRouterTest(SimpleTestCase):
+    databases = {'default'}  # Queries without a test transaction around them
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def serve(self, request, view):
+        """Run `view` behind the middleware; returns (response, read alias the view saw)"""
+        seen = []
+
+        def get_response(request):
+            seen.append(view())
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return response, seen[0]
+
+    def read(self):
+        return self.router.db_for_read(Order)
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.serve(self.factory.get('/'), self.read)[1], 'replica_1')
+        self.assertEqual(self.serve(self.factory.post('/'), self.read)[1], 'default')
+        self.assertEqual(self.read(), 'default')  # Outside a request
+
+    def test_write_pins_request_and_client_to_primary(self):
+        def write_then_read():
+            self.assertEqual(self.router.db_for_write(Order), 'default')
+            return self.read()
+
+        response, alias = self.serve(self.factory.get('/'), write_then_read)
+        self.assertEqual(alias, 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.serve(request, self.read)[1], 'default')
+
+    def test_view_decorators(self):
+        self.assertEqual(self.serve(self.factory.get('/'), use_primary(self.read))[1], 'default')
+        self.assertEqual(self.serve(self.factory.post('/'), allow_replica(self.read))[1], 'replica_1')
+
+    def test_transactions_read_from_primary(self):
+        def read_in_transaction():
+            with transaction.atomic():
+                return self.read()
+
+        self.assertEqual(self.serve(self.factory.get('/'), read_in_transaction)[1], 'default')
+
+
+@skipUnless(settings.REPLICA_DATABASES, 'Set DATABASE_REPLICA_URLS to test against a replica database')
+class ReplicaDatabaseTest(TransactionTestCase):
+    """
+    Routing against a real second database
+    Run with DATABASE_REPLICA_URLS=sqlite:///db-replica.sqlite3. Not a
+    TestCase: reads inside its transaction would all go to the primary.
+    """
+
+    databases = {'default', *settings.REPLICA_DATABASES}
+
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.replica = settings.REPLICA_DATABASES[0]
+        restaurant, table = self.fixture['restaurant'], self.fixture['table']
+        self.menu_url = f'/api/public/restaurant/{restaurant.public_id}/table/{table.token}/menu/'
+        self.orders_url = f'/api/public/restaurant/{restaurant.public_id}/table/{table.token}/orders/'
+
+    def test_reads_use_replica(self):
+        Plan.objects.using(self.replica).create(name='Replica only', price=0, max_tables=1, max_menu_items=1)
+        client = APIClient()
+        client.force_authenticate(user=self.fixture['owner'])
+        names = [plan['name'] for plan in client.get('/api/restaurants/plans/').json()]
+        self.assertEqual(names, ['Replica only'])
+        # The restaurant only exists on the primary
+        self.assertEqual(self.client.get(self.menu_url).status_code, 404)
+
+    async def test_async_stream_reads_replica(self):
+        @sync_to_async
+        def prepare():
+            # The export's orders exist only on the replica
+            for instance in (self.fixture['owner'], self.fixture['restaurant'], self.fixture['table']):
+                instance.save(using=self.replica)
+            Order.objects.using(self.replica).create(
+                restaurant=self.fixture['restaurant'], table=self.fixture['table'], total_amount=Decimal('9.00')
+            )
+            return AccessToken.for_user(self.fixture['owner'])
+
+        token = await prepare()
+        response = await self.async_client.get(
+            '/api/analytics/export/', {'output': 'ndjson'}, headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 1)
+
+    def test_writes_read_own_data_from_primary(self):
+        payload = {'items': [{'menu_item_id': self.fixture['items']['burger'].id, 'quantity': 1}]}
+        response = self.client.post(self.orders_url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # The pin cookie (kept by the test client) sends the next reads to the primary
+        self.assertEqual(self.client.get(self.menu_url).status_code, 200)
+        self.assertFalse(Order.objects.using(self.replica).exists())
+
+    def test_cache_fills_read_primary(self):
+        # A replica that has the restaurant and table but not the menu, under an old name
+        owner, restaurant = self.fixture['owner'], self.fixture['restaurant']
+        owner.save(using=self.replica)
+        Restaurant.objects.filter(pk=restaurant.pk).update(name='Renamed Bistro')
+        restaurant.save(using=self.replica)
+        self.fixture['table'].save(using=self.replica)
+
+        response = self.client.get(self.menu_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['restaurant']['name'], 'Renamed Bistro')
+        self.assertEqual(len(response.json()['menu']), 2)
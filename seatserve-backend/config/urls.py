@@ -5,11 +5,15 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import HttpResponse, JsonResponse
-import os
+from django.http import JsonResponse
 
 # Import diagnostic views
-from config.diagnostic_views import diagnostic_endpoint, diagnostic_summary
+from config.diagnostic_views import (
+    diagnostic_endpoint, diagnostic_summary, profile_collapsed, profile_detail, profile_list, profiling_toggle
+)
+from config.metrics import metrics_endpoint
+from config.spa import spa_fallback
+from restaurants.views import table_qr_image
 
 # Health check endpoint
 def health_check(request):
@@ -20,28 +24,6 @@ def health_check(request):
         'environment': 'production' if not settings.DEBUG else 'development'
     })
 
-def spa_fallback(request, path=''):
-    """
-    Serve React index.html for SPA routing on all non-API routes.
-    Static files are served by WhiteNoise middleware BEFORE this view runs.
-    """
-    import os
-    
-    # After collectstatic, index.html should be in STATIC_ROOT
-    index_path = os.path.join(settings.STATIC_ROOT, 'index.html')
-    
-    if os.path.isfile(index_path):
-        with open(index_path, 'rb') as f:
-            return HttpResponse(f.read(), content_type='text/html; charset=utf-8')
-    
-    # Fallback message if index.html not found
-    return HttpResponse(
-        '<!DOCTYPE html><html><body><h1>Frontend Not Found</h1>'
-        '<p>index.html could not be located at: ' + index_path + '</p></body></html>',
-        status=404,
-        content_type='text/html'
-    )
-
 # CRITICAL: Static file patterns MUST come FIRST before SPA fallback
 # This ensures /static/* and /assets/* are served by Django/WhiteNoise, not by spa_fallback
 urlpatterns = []
@@ -59,13 +41,20 @@ urlpatterns += [
     path('health/', health_check),
     path('diagnostic/', diagnostic_endpoint, name='diagnostic'),
     path('diagnostic/summary/', diagnostic_summary, name='diagnostic_summary'),
+    path('diagnostic/profiling/', profiling_toggle, name='diagnostic_profiling'),
+    path('diagnostic/profiles/', profile_list, name='diagnostic_profiles'),
+    path('diagnostic/profiles/<int:profile_id>/', profile_detail, name='diagnostic_profile'),
+    path('diagnostic/profiles/<int:profile_id>/collapsed/', profile_collapsed, name='diagnostic_profile_collapsed'),
+    path('metrics', metrics_endpoint, name='metrics'),
     path('admin/', admin.site.urls),
+    path('qr/<str:token>/<str:digest>.png', table_qr_image, name='table-qr-image'),
     path('api/auth/', include('accounts.urls')),
     path('api/restaurants/', include('restaurants.urls')),
     path('api/menu/', include('menu.urls')),
     path('api/orders/', include('orders.urls')),
     path('api/public/', include('orders.public_urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/analytics/', include('analytics.urls')),
     
     # SPA Fallback Routes (LAST - catch-all patterns)
     # These run AFTER static file patterns, so /static/* and /assets/* won't reach here
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from menu.models import Category, MenuItem
+from restaurants.eager_loading import EagerLoadingMixin
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,9 +10,11 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'restaurant', 'created_at', 'updated_at')
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
 
+    select_related_fields = ('category',)
+
     class Meta:
         model = MenuItem
         fields = ('id', 'restaurant', 'category', 'category_name', 'name', 'description', 
@@ -19,10 +22,12 @@ class MenuItemSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'restaurant', 'created_at', 'updated_at')
 
 
-class MenuItemDetailSerializer(serializers.ModelSerializer):
+class MenuItemDetailSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Detailed view including category info"""
     category = CategorySerializer(read_only=True)
 
+    select_related_fields = ('category',)
+
     class Meta:
         model = MenuItem
         fields = ('id', 'category', 'name', 'description', 'price', 'image_url', 
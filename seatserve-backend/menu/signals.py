@@ -0,0 +1,26 @@
+"""
+Menu signal handlers
+Keep the public menu snapshot in sync with menu changes
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from menu.models import Category, MenuItem
+from menu.snapshot_service import MenuSnapshotService
+from restaurants.models import Restaurant
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_menu_snapshot(sender, instance, **kwargs):
+    """Invalidate the snapshot once the menu change is committed"""
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: MenuSnapshotService.invalidate(restaurant_id))
+
+
+@receiver(post_save, sender=Restaurant)
+def invalidate_menu_snapshot_for_restaurant(sender, instance, **kwargs):
+    """Restaurant name and logo are part of the snapshot"""
+    restaurant_id = instance.id
+    transaction.on_commit(lambda: MenuSnapshotService.invalidate(restaurant_id))
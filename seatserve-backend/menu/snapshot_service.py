@@ -0,0 +1,160 @@
+"""
+Public menu snapshot service
+Builds the guest-facing menu once per restaurant, stores it as pre-rendered
+JSON bytes under a versioned cache key and splices in the table per request
+"""
+import time
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from config.db_router import routing
+from menu.models import Category, MenuItem
+from restaurants.async_cache import async_cache
+from restaurants.models import Restaurant
+
+
+SNAPSHOT_TIMEOUT = 60 * 60 * 24  # Snapshots are immutable per version
+
+
+class MenuSnapshotService:
+    """Versioned, pre-serialized public menu snapshots"""
+
+    renderer = JSONRenderer()
+
+    @staticmethod
+    def _version_key(restaurant_id):
+        return f'menu:version:{restaurant_id}'
+
+    @staticmethod
+    def _snapshot_key(restaurant_id, version):
+        return f'menu:snapshot:{restaurant_id}:{version}'
+
+    @staticmethod
+    def get_version(restaurant_id):
+        """Get the current menu version for a restaurant"""
+        key = MenuSnapshotService._version_key(restaurant_id)
+        version = cache.get(key)
+        if version is None:
+            # Seed from the clock so an evicted version never reuses an old snapshot key
+            version = int(time.time() * 1000)
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        return version
+
+    @staticmethod
+    async def aget_version(restaurant_id):
+        """get_version() for async views"""
+        key = MenuSnapshotService._version_key(restaurant_id)
+        version = await async_cache.get(key)
+        if version is None:
+            version = int(time.time() * 1000)
+            if not await async_cache.add(key, version, timeout=None):
+                version = await async_cache.get(key, version)
+        return version
+
+    @staticmethod
+    def invalidate(restaurant_id):
+        """Bump the menu version so the next request rebuilds the snapshot"""
+        key = MenuSnapshotService._version_key(restaurant_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+    @staticmethod
+    def build_snapshot(restaurant):
+        """
+        Build the restaurant and menu JSON fragments (two queries)
+
+        Reads the primary, reloading a restaurant that came from a replica:
+        the snapshot is cached as immutable for its version, so a lagging
+        replica must not fill it.
+        """
+        if restaurant._state.db != DEFAULT_DB_ALIAS:
+            restaurant = Restaurant.objects.using(DEFAULT_DB_ALIAS).get(pk=restaurant.pk)
+        with routing(False):
+            categories = list(Category.objects.filter(
+                restaurant=restaurant,
+                is_active=True
+            ).prefetch_related(
+                Prefetch(
+                    'items',
+                    queryset=MenuItem.objects.filter(is_available=True).only(
+                        'id', 'category_id', 'name', 'description', 'price', 'image_url', 'tags'
+                    ).order_by('name'),
+                )
+            ))
+
+        menu = []
+        for category in categories:
+            items = [
+                {
+                    'id': item.id,
+                    'name': item.name,
+                    'description': item.description,
+                    'price': str(item.price),
+                    'image_url': item.image_url,
+                    'tags': item.tags,
+                }
+                for item in category.items.all()
+            ]
+            if items:  # Only include categories with available items
+                menu.append({
+                    'id': category.id,
+                    'name': category.name,
+                    'items': items
+                })
+
+        return {
+            'restaurant': MenuSnapshotService.renderer.render({
+                'id': restaurant.id,
+                'public_id': str(restaurant.public_id),
+                'name': restaurant.name,
+                'logo_url': restaurant.logo_url,
+            }),
+            'menu': MenuSnapshotService.renderer.render(menu),
+        }
+
+    @staticmethod
+    def get_snapshot(restaurant):
+        """
+        Get the cached snapshot for a restaurant, building it on a miss
+
+        Returns:
+            tuple: (version, snapshot dict of JSON byte fragments)
+        """
+        version = MenuSnapshotService.get_version(restaurant.id)
+        key = MenuSnapshotService._snapshot_key(restaurant.id, version)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = MenuSnapshotService.build_snapshot(restaurant)
+            cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+        return version, snapshot
+
+    @staticmethod
+    async def aget_snapshot(restaurant):
+        """get_snapshot() for async views; only a rebuild runs in a thread"""
+        version = await MenuSnapshotService.aget_version(restaurant.id)
+        key = MenuSnapshotService._snapshot_key(restaurant.id, version)
+        snapshot = await async_cache.get(key)
+        if snapshot is None:
+            snapshot = await sync_to_async(MenuSnapshotService.build_snapshot)(restaurant)
+            await async_cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+        return version, snapshot
+
+    @staticmethod
+    def render_for_table(snapshot, table):
+        """Assemble the public menu payload for a table from a snapshot"""
+        table_json = MenuSnapshotService.renderer.render({
+            'id': table.id,
+            'name': table.name,
+        })
+        return b''.join([
+            b'{"restaurant":', snapshot['restaurant'],
+            b',"table":', table_json,
+            b',"menu":', snapshot['menu'],
+            b'}',
+        ])
@@ -1,5 +1,36 @@
-from django.apps import AppConfig
+"""
+Tests for menu app
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
 
-class MenuConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'menu'
+from orders.tests import create_restaurant_fixture
+from restaurants.stats_service import DashboardStatsService
+
+
+class MenuStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        cola = self.fixture['items']['cola']
+        cola.is_available = False
+        cola.save()
+
+    def test_menu_stats_single_query(self):
+        with self.assertNumQueries(1):
+            stats = DashboardStatsService.menu_stats(self.fixture['restaurant'])
+        self.assertEqual(stats, {
+            'total_items': 3,
+            'available_items': 2,
+            'unavailable_items': 1,
+            'total_categories': 2,
+        })
+
+    def test_menu_stats_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=self.fixture['owner'])
+        response = client.get('/api/menu/items/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertEqual(response.data['plan']['tables_available'], 20)
@@ -6,9 +6,11 @@ from django.shortcuts import get_object_or_404
 
 from menu.models import Category, MenuItem
 from menu.serializers import CategorySerializer, MenuItemSerializer, MenuItemDetailSerializer
-from restaurants.models import Restaurant
 from restaurants.permissions import IsRestaurantUser
 from restaurants.plan_service import PlanEnforcementService
+from restaurants.stats_service import DashboardStatsService
+from restaurants.tenant import current_restaurant
+from restaurants.eager_loading import EagerLoadingViewSetMixin
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -18,14 +20,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Get categories for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if restaurant:
             return Category.objects.filter(restaurant=restaurant)
         return Category.objects.none()
 
     def perform_create(self, serializer):
         """Create category for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if not restaurant:
             raise ValueError('Restaurant not found')
         serializer.save(restaurant=restaurant)
@@ -35,21 +37,21 @@ class CategoryViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     """Menu item management"""
     serializer_class = MenuItemSerializer
     permission_classes = (IsAuthenticated, IsRestaurantUser)
 
     def get_queryset(self):
         """Get menu items for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if restaurant:
             return MenuItem.objects.filter(restaurant=restaurant)
         return MenuItem.objects.none()
 
     def perform_create(self, serializer):
         """Create menu item for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if not restaurant:
             raise ValueError('Restaurant not found')
         
@@ -68,7 +70,7 @@ class MenuItemViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_category(self, request):
         """Get menu items grouped by category"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
@@ -88,20 +90,14 @@ class MenuItemViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get menu statistics"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        items = MenuItem.objects.filter(restaurant=restaurant)
-        plan_info = PlanEnforcementService.get_plan_info(restaurant)
-        
         return Response({
-            'total_items': items.count(),
-            'available_items': items.filter(is_available=True).count(),
-            'unavailable_items': items.filter(is_available=False).count(),
-            'total_categories': Category.objects.filter(restaurant=restaurant).count(),
-            'plan': plan_info,
+            **DashboardStatsService.menu_stats(restaurant),
+            'plan': PlanEnforcementService.get_plan_info(restaurant),
         })
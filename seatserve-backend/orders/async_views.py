@@ -0,0 +1,151 @@
+"""
+Async versions of the public guest endpoints (menu, create order)
+Served instead of the DRF views when ASYNC_GUEST_VIEWS is on. Order status
+stays on the DRF view: it only reads the database, which Django 4.2 runs in
+a thread either way, and benchmarked slower as an async view. Lookups use the async ORM and cache reads go through
+restaurants.async_cache, so a request waiting on the database or Redis
+does not hold a worker thread; writes and serialization that need the sync
+ORM run in a thread. Responses match the DRF views.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework import status
+from rest_framework.settings import api_settings
+
+from menu.snapshot_service import MenuSnapshotService
+from orders.conditional import menu_etag, not_modified_response, set_validators
+from orders.idempotency import aidempotent, json_response
+from orders.order_service import OrderCreationService
+from orders.serializers import OrderCreateSerializer, OrderPublicStatusSerializer
+from restaurants.models import Table
+from restaurants.plan_service import PlanEnforcementService
+
+NOT_FOUND = {'detail': 'Not found.'}
+
+
+def _throttle_wait(request):
+    """
+    Apply the DRF default throttles
+
+    Returns:
+        None if allowed, otherwise the seconds to wait (possibly None)
+    """
+    waits = [
+        throttle.wait()
+        for throttle in (throttle_class() for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES)
+        if not throttle.allow_request(request, None)
+    ]
+    if not waits:
+        return None
+    known = [wait for wait in waits if wait is not None]
+    return max(known) if known else 0
+
+
+async def _throttled(request):
+    """429 response if a throttle refuses the request, else None"""
+    if not api_settings.DEFAULT_THROTTLE_CLASSES:
+        return None
+    wait = await sync_to_async(_throttle_wait)(request)
+    if wait is None:
+        return None
+    response = json_response({'detail': 'Request was throttled.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    if wait:
+        response['Retry-After'] = str(int(wait))
+    return response
+
+
+async def _get_table(restaurant_public_id, table_token):
+    try:
+        return await Table.objects.select_related('restaurant').filter(
+            restaurant__public_id=restaurant_public_id,
+            restaurant__is_active=True,
+            token=table_token,
+            is_active=True
+        ).afirst()
+    except ValidationError:  # Malformed restaurant id
+        return None
+
+
+def _public_status(order):
+    prefetch_related_objects([order], *OrderPublicStatusSerializer.prefetch_lookups())
+    return OrderPublicStatusSerializer(order).data
+
+
+async def menu(request, restaurant_public_id, table_token):
+    """Get menu for a specific table (public access)"""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    throttled = await _throttled(request)
+    if throttled is not None:
+        return throttled
+
+    table = await _get_table(restaurant_public_id, table_token)
+    if table is None:
+        return json_response(NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+    restaurant = table.restaurant
+    if not await PlanEnforcementService.ais_subscription_active(restaurant):
+        return json_response({'detail': 'Restaurant is not active'}, status=status.HTTP_403_FORBIDDEN)
+
+    etag = menu_etag(await MenuSnapshotService.aget_version(restaurant.id), table)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    version, snapshot = await MenuSnapshotService.aget_snapshot(restaurant)
+    response = HttpResponse(
+        MenuSnapshotService.render_for_table(snapshot, table),
+        content_type='application/json'
+    )
+    return set_validators(response, menu_etag(version, table))
+
+
+async def create_order(request, restaurant_public_id, table_token):
+    """Create an order from QR (public access, JSON body)"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    throttled = await _throttled(request)
+    if throttled is not None:
+        return throttled
+
+    if request.content_type != 'application/json':
+        return json_response(
+            {'detail': f'Unsupported media type "{request.content_type}" in request.'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError as e:
+        return json_response({'detail': f'JSON parse error - {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+    return await _create_order(request, data, restaurant_public_id, table_token)
+
+
+# Like DRF views; Django 4.2's csrf_exempt() does not keep async views async
+create_order.csrf_exempt = True
+
+
+@aidempotent
+async def _create_order(request, data, restaurant_public_id, table_token):
+    table = await _get_table(restaurant_public_id, table_token)
+    if table is None:
+        return json_response(NOT_FOUND, status=status.HTTP_404_NOT_FOUND)
+    restaurant = table.restaurant
+    if not await PlanEnforcementService.ais_subscription_active(restaurant):
+        return json_response({'detail': 'Restaurant is not active'}, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = OrderCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        order = await sync_to_async(OrderCreationService.create_order)(
+            restaurant,
+            table,
+            serializer.validated_data['items'],
+            customer_note=serializer.validated_data.get('customer_note', '')
+        )
+    except ValueError as e:
+        return json_response({'items': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+    return json_response(await sync_to_async(_public_status)(order), status=status.HTTP_201_CREATED)
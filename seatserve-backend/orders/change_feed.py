@@ -0,0 +1,108 @@
+"""
+Order change feed for delta-syncing clients (kitchen display)
+Cursors are opaque (updated_at, id) positions over the restaurant's orders.
+updated_at is stamped before commit, so a transaction can commit after a
+later-stamped one; each delta therefore also re-sends the orders changed in
+the ORDER_CHANGES_OVERLAP_SECONDS before the cursor, and clients upsert by id.
+"""
+import base64
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.db.models import Q
+
+from orders.models import Order
+from orders.serializers import OrderSerializer
+
+
+TOMBSTONE_STATUSES = ('SERVED', 'CANCELLED')
+
+
+class OrderChangeFeed:
+    """Incremental order changes since a cursor"""
+
+    DEFAULT_LIMIT = 200
+    MAX_LIMIT = 500
+
+    @staticmethod
+    def encode_cursor(updated_at, pk):
+        raw = f'{updated_at.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decode a cursor into its (updated_at, id) position
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            updated_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+            return datetime.fromisoformat(updated_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise ValueError('Invalid cursor')
+
+    @staticmethod
+    def _latest_cursor(restaurant):
+        latest = Order.objects.filter(restaurant=restaurant).order_by(
+            '-updated_at', '-id'
+        ).values_list('updated_at', 'id').first()
+        if latest is None:
+            latest = (datetime(1970, 1, 1, tzinfo=timezone.utc), 0)
+        return OrderChangeFeed.encode_cursor(*latest)
+
+    @staticmethod
+    def get_changes(restaurant, cursor=None, limit=None):
+        """
+        Get orders changed since `cursor`
+
+        Without a cursor, returns every open order and a cursor at the head
+        of the feed. With a cursor, returns orders changed after it, and
+        again those changed in the overlap window before it: open orders to
+        upsert and ids of served/cancelled orders to remove. Only orders
+        after the cursor count towards `limit`.
+
+        Returns:
+            dict: orders (queryset/list), removed (ids), cursor, has_more
+        """
+        limit = min(limit or OrderChangeFeed.DEFAULT_LIMIT, OrderChangeFeed.MAX_LIMIT)
+
+        if cursor is None:
+            # Take the head cursor first so concurrent changes are re-sent, not lost
+            head = OrderChangeFeed._latest_cursor(restaurant)
+            orders = OrderSerializer.setup_eager_loading(Order.objects.filter(
+                restaurant=restaurant
+            ).exclude(
+                status__in=TOMBSTONE_STATUSES
+            )).order_by('created_at')
+            return {'orders': list(orders), 'removed': [], 'cursor': head, 'has_more': False}
+
+        updated_at, pk = OrderChangeFeed.decode_cursor(cursor)
+        orders = Order.objects.filter(restaurant=restaurant)
+        after_cursor = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+        overlap = settings.ORDER_CHANGES_OVERLAP_SECONDS
+        overlap_ids = list(orders.filter(
+            updated_at__gt=updated_at - timedelta(seconds=overlap)
+        ).exclude(after_cursor).values_list('id', flat=True)) if overlap else []
+        # Overlap orders sort before the cursor, so they come first in the slice
+        changed = list(
+            OrderSerializer.setup_eager_loading(orders.filter(
+                Q(id__in=overlap_ids) | after_cursor
+            )).order_by('updated_at', 'id')[:len(overlap_ids) + limit + 1]
+        )
+        new = [order for order in changed if (order.updated_at, order.id) > (updated_at, pk)]
+        has_more = len(new) > limit
+        if has_more:
+            changed = changed[:len(changed) - len(new) + limit]
+            new = new[:limit]
+
+        if new:
+            cursor = OrderChangeFeed.encode_cursor(new[-1].updated_at, new[-1].id)
+
+        return {
+            'orders': [order for order in changed if order.status not in TOMBSTONE_STATUSES],
+            'removed': [order.id for order in changed if order.status in TOMBSTONE_STATUSES],
+            'cursor': cursor,
+            'has_more': has_more,
+        }
@@ -0,0 +1,43 @@
+"""
+Conditional GET helpers for public endpoints
+ETag / Last-Modified validators and 304 short-circuiting
+"""
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def menu_etag(version, table):
+    """Strong ETag for a table's menu: menu version plus the table row"""
+    return f'"menu-{version}-{table.id}-{int(table.updated_at.timestamp() * 1000)}"'
+
+
+def order_etag(order):
+    """Strong ETag for a public order status"""
+    return f'"order-{order.id}-{int(order.updated_at.timestamp() * 1000000)}"'
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and require clients to revalidate"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators
+
+    Args:
+        request: Incoming request
+        etag: Quoted ETag of the current representation
+        last_modified: Optional Unix timestamp of the last change
+
+    Returns:
+        HttpResponseNotModified if the client copy is fresh, otherwise None
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,133 @@
+"""
+Order event broker
+Fans order status changes out to Server-Sent Events subscribers.
+Uses Redis pub/sub when ORDER_EVENTS_REDIS_URL is set (required with more
+than one worker process), otherwise an in-process broker.
+"""
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OPEN_ORDER_STATUSES = ('RECEIVED', 'IN_KITCHEN', 'READY_TO_SERVE')
+
+
+def order_channel(public_token):
+    return f'orders:order:{public_token}'
+
+
+def restaurant_channel(restaurant_id):
+    return f'orders:restaurant:{restaurant_id}'
+
+
+def order_event(order):
+    """Compact, JSON-safe representation of an order status change"""
+    return {
+        'id': order.id,
+        'public_token': order.public_token,
+        'restaurant': order.restaurant_id,
+        'table': order.table_id,
+        'status': order.status,
+        'payment_status': order.payment_status,
+        'total_amount': str(order.total_amount),
+        'estimated_time_minutes': order.estimated_time_minutes,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+class InMemoryBroker:
+    """Single-process broker for development, tests and single-worker deployments"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass  # Subscriber's event loop already closed
+
+    async def subscribe(self, channels, timeout):
+        """Yield messages for the channels, or None after `timeout` idle seconds"""
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(entry)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(entry[1].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                for channel in channels:
+                    subscribers = self._subscribers.get(channel)
+                    if subscribers is not None:
+                        subscribers.discard(entry)
+                        if not subscribers:
+                            del self._subscribers[channel]
+
+
+class RedisBroker:
+    """Cross-process broker backed by Redis pub/sub"""
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    def publish(self, channel, message):
+        import redis
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channels, timeout):
+        """Yield messages for the channels, or None after `timeout` idle seconds"""
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(*channels)
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                yield json.loads(message['data']) if message else None
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+
+
+class OrderEventBroker:
+    """Publish order events and subscribe to them"""
+
+    _broker = None
+
+    @classmethod
+    def get_broker(cls):
+        if cls._broker is None:
+            redis_url = getattr(settings, 'ORDER_EVENTS_REDIS_URL', '')
+            cls._broker = RedisBroker(redis_url) if redis_url else InMemoryBroker()
+        return cls._broker
+
+    @classmethod
+    def publish_order(cls, event):
+        """Publish an order event to its order and restaurant channels"""
+        broker = cls.get_broker()
+        try:
+            broker.publish(order_channel(event['public_token']), event)
+            broker.publish(restaurant_channel(event['restaurant']), event)
+        except Exception as e:
+            # Streaming is best-effort; never fail the write that triggered it
+            logger.error(f"Failed to publish order event {event['id']}: {str(e)}")
+
+    @classmethod
+    def subscribe(cls, channels, timeout):
+        return cls.get_broker().subscribe(channels, timeout)
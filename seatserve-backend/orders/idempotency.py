@@ -0,0 +1,166 @@
+"""
+Idempotency-Key support for unsafe API actions
+Stores a request fingerprint and the response in the cache so client
+retries replay the original response instead of repeating the work
+"""
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from restaurants.async_cache import async_cache
+
+
+IN_PROGRESS = 'in_progress'
+COMPLETED = 'completed'
+
+
+def _cache_key(request, key, user_id=None):
+    if user_id is None:
+        user_id = request.user.pk if request.user and request.user.is_authenticated else 'anon'
+    scope = f'{request.path}|{user_id}|{key}'
+    return 'idempotency:' + hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(request, data):
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}|{request.path}|{body}'.encode()).hexdigest()
+
+
+def _replay(entry, fingerprint, respond=Response):
+    if entry['fingerprint'] != fingerprint:
+        return respond(
+            {'detail': 'Idempotency-Key was already used with a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if entry['state'] == IN_PROGRESS:
+        return respond(
+            {'detail': 'A request with this Idempotency-Key is still in progress'},
+            status=status.HTTP_409_CONFLICT
+        )
+    response = respond(entry['data'], status=entry['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _storable(response):
+    return (
+        response.status_code < 500
+        and response.status_code not in (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+    )
+
+
+def _completed(fingerprint, response):
+    return {
+        'state': COMPLETED,
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'data': response.data,
+    }
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    """JSON rendered like a DRF Response, keeping `.data` (for async views)"""
+    response = HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+    response.data = data
+    return response
+
+
+def idempotent(view_method):
+    """
+    Honour an optional Idempotency-Key header on a viewset action
+
+    The first request with a key runs the action and stores its response
+    (anything but 5xx, 409 and 429) for IDEMPOTENCY_KEY_TTL seconds. Later
+    requests with the same key and body get the stored response without
+    running the action; a different body with the same key is rejected.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'detail': 'Idempotency-Key must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request, request.data)
+
+        # Claim the key; a concurrent duplicate sees the in-progress marker
+        claimed = cache.add(
+            cache_key,
+            {'state': IN_PROGRESS, 'fingerprint': fingerprint},
+            timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if not claimed:
+            entry = cache.get(cache_key)
+            if entry is not None:
+                return _replay(entry, fingerprint)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if isinstance(response, Response) and _storable(response):
+            cache.set(cache_key, _completed(fingerprint, response), timeout=settings.IDEMPOTENCY_KEY_TTL)
+        else:
+            cache.delete(cache_key)  # Let the client retry
+        return response
+
+    return wrapper
+
+
+def aidempotent(view):
+    """
+    idempotent() for async function views called as view(request, data, ...)
+
+    `data` is the parsed request body. Async views do not authenticate, so
+    keys are scoped to the path only, like anonymous DRF requests.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, data, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return await view(request, data, *args, **kwargs)
+        if len(key) > 255:
+            return json_response(
+                {'detail': 'Idempotency-Key must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache_key = _cache_key(request, key, user_id='anon')
+        fingerprint = _fingerprint(request, data)
+
+        claimed = await async_cache.add(
+            cache_key,
+            {'state': IN_PROGRESS, 'fingerprint': fingerprint},
+            timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if not claimed:
+            entry = await async_cache.get(cache_key)
+            if entry is not None:
+                return _replay(entry, fingerprint, respond=json_response)
+
+        try:
+            response = await view(request, data, *args, **kwargs)
+        except Exception:
+            await async_cache.delete(cache_key)
+            raise
+
+        if hasattr(response, 'data') and _storable(response):
+            await async_cache.set(cache_key, _completed(fingerprint, response), timeout=settings.IDEMPOTENCY_KEY_TTL)
+        else:
+            await async_cache.delete(cache_key)
+        return response
+
+    return wrapper
@@ -41,7 +41,8 @@ class Order(models.Model):
         db_table = 'orders_order'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['restaurant', '-created_at']),
+            models.Index(fields=['restaurant', '-created_at', '-id']),  # keyset pagination
+            models.Index(fields=['restaurant', 'updated_at', 'id']),  # change feed cursor
             models.Index(fields=['public_token']),
         ]
 
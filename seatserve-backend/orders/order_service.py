@@ -0,0 +1,86 @@
+"""
+Order creation service
+Validates guest orders against the menu in memory and writes them atomically
+"""
+from django.conf import settings
+from django.db import transaction
+
+from menu.models import MenuItem
+from orders.models import Order, OrderItem
+from orders.signals import order_placed
+
+
+class OrderCreationService:
+    """Bulk, transactional creation of guest orders"""
+
+    @staticmethod
+    def load_menu_items(restaurant, items_data):
+        """
+        Load every referenced menu item in a single query
+
+        Args:
+            restaurant: Restaurant the order is placed with
+            items_data: List of {'menu_item_id', 'quantity'} dicts
+
+        Returns:
+            dict: Menu items keyed by id
+
+        Raises:
+            ValueError: If any item is unknown, belongs to another restaurant or is unavailable
+        """
+        requested_ids = {item['menu_item_id'] for item in items_data}
+        menu_items = {
+            menu_item.id: menu_item
+            for menu_item in MenuItem.objects.filter(
+                restaurant=restaurant,
+                id__in=requested_ids
+            ).only('id', 'restaurant_id', 'name', 'price', 'is_available')
+        }
+
+        invalid_ids = sorted(
+            item_id for item_id in requested_ids
+            if item_id not in menu_items or not menu_items[item_id].is_available
+        )
+        if invalid_ids:
+            raise ValueError(f'Menu items not available: {invalid_ids}')
+
+        return menu_items
+
+    @staticmethod
+    def create_order(restaurant, table, items_data, customer_note=''):
+        """
+        Create an order and its lines in one transaction
+
+        Returns:
+            Order: The created order
+
+        Raises:
+            ValueError: If any requested menu item cannot be ordered
+        """
+        menu_items = OrderCreationService.load_menu_items(restaurant, items_data)
+
+        lines = [
+            OrderItem(
+                menu_item=menu_items[item['menu_item_id']],
+                quantity=item['quantity'],
+                price_at_time=menu_items[item['menu_item_id']].price
+            )
+            for item in items_data
+        ]
+        total_amount = sum(line.price_at_time * line.quantity for line in lines)
+
+        with transaction.atomic():
+            order = Order.objects.create(
+                restaurant=restaurant,
+                table=table,
+                status='RECEIVED',
+                payment_status='PAID' if settings.ORDERS_PAID_ON_CREATE else 'PENDING',
+                total_amount=total_amount,
+                customer_note=customer_note
+            )
+            for line in lines:
+                line.order = order
+            OrderItem.objects.bulk_create(lines)
+            order_placed.send(sender=Order, order=order, items=lines)
+
+        return order
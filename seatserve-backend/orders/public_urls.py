@@ -1,26 +1,36 @@
-from django.urls import path, re_path
+from django.conf import settings
+from django.urls import re_path
+from orders import async_views
 from orders.views import PublicOrderViewSet
+from orders.stream_views import order_event_stream
 
-# Custom URL patterns for public API with complex paths
-public_views = PublicOrderViewSet()
+MENU_PATTERN = r'^restaurant/(?P<restaurant_public_id>[^/]+)/table/(?P<table_token>[^/]+)/menu/$'
+ORDERS_PATTERN = r'^restaurant/(?P<restaurant_public_id>[^/]+)/table/(?P<table_token>[^/]+)/orders/$'
+ORDER_PATTERN = r'^order/(?P<order_token>[^/]+)/$'
 
-urlpatterns = [
-    # Menu endpoint
+stream_urlpatterns = [
+    # Live order status stream (Server-Sent Events)
     re_path(
-        r'^restaurant/(?P<restaurant_public_id>[^/]+)/table/(?P<table_token>[^/]+)/menu/$',
-        public_views.menu,
-        name='public_menu'
+        r'^order/(?P<order_token>[^/]+)/events/$',
+        order_event_stream,
+        name='order_events'
     ),
+]
+
+sync_urlpatterns = [
+    # Menu endpoint
+    re_path(MENU_PATTERN, PublicOrderViewSet.as_view({'get': 'menu'}), name='public_menu'),
     # Create order endpoint
-    re_path(
-        r'^restaurant/(?P<restaurant_public_id>[^/]+)/table/(?P<table_token>[^/]+)/orders/$',
-        public_views.create_order,
-        name='create_public_order'
-    ),
+    re_path(ORDERS_PATTERN, PublicOrderViewSet.as_view({'post': 'create_order'}), name='create_public_order'),
     # Order status endpoint
-    re_path(
-        r'^order/(?P<order_token>[^/]+)/$',
-        public_views.order_status,
-        name='order_status'
-    ),
-]
+    re_path(ORDER_PATTERN, PublicOrderViewSet.as_view({'get': 'order_status'}), name='order_status'),
+] + stream_urlpatterns
+
+# Menu and order creation served by async views (ASGI)
+async_urlpatterns = [
+    re_path(MENU_PATTERN, async_views.menu, name='public_menu'),
+    re_path(ORDERS_PATTERN, async_views.create_order, name='create_public_order'),
+    re_path(ORDER_PATTERN, PublicOrderViewSet.as_view({'get': 'order_status'}), name='order_status'),
+] + stream_urlpatterns
+
+urlpatterns = async_urlpatterns if settings.ASYNC_GUEST_VIEWS else sync_urlpatterns
@@ -1,13 +1,21 @@
+from django.conf import settings
 from rest_framework import serializers
 from orders.models import Order, OrderItem
 from menu.models import MenuItem
+from restaurants.eager_loading import EagerLoadingMixin
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     menu_item = serializers.PrimaryKeyRelatedField(queryset=MenuItem.objects.all())
     menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
     menu_item_detail = serializers.SerializerMethodField()
 
+    select_related_fields = ('menu_item',)
+    expandable_fields = ('menu_item_detail',)
+    field_sources = {
+        'menu_item_detail': ('menu_item__name', 'menu_item__price', 'menu_item__description'),
+    }
+
     class Meta:
         model = OrderItem
         fields = ('id', 'menu_item', 'menu_item_name', 'menu_item_detail', 'quantity', 'price_at_time')
@@ -27,11 +35,14 @@ class OrderItemCreateSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     table_name = serializers.CharField(source='table.name', read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
 
+    select_related_fields = ('restaurant', 'table')
+    prefetch_related_fields = {'items': OrderItemSerializer}
+
     class Meta:
         model = Order
         fields = ('id', 'public_token', 'restaurant', 'restaurant_name', 'table', 'table_name',
@@ -49,6 +60,10 @@ class OrderCreateSerializer(serializers.Serializer):
     def validate_items(self, value):
         if not value:
             raise serializers.ValidationError('At least one item is required.')
+        if len(value) > settings.MAX_ITEMS_PER_ORDER:
+            raise serializers.ValidationError(
+                f'An order can contain at most {settings.MAX_ITEMS_PER_ORDER} items.'
+            )
         return value
 
 
@@ -64,10 +79,12 @@ class OrderStatusUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
-class OrderPublicStatusSerializer(serializers.ModelSerializer):
+class OrderPublicStatusSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """For public QR order status view"""
     items = OrderItemSerializer(many=True, read_only=True)
 
+    prefetch_related_fields = {'items': OrderItemSerializer}
+
     class Meta:
         model = Order
         fields = ('id', 'public_token', 'status', 'total_amount', 'estimated_time_minutes', 
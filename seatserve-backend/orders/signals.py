@@ -0,0 +1,22 @@
+"""
+Order signal handlers
+Publish order status changes to live streams
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from orders.events import OrderEventBroker, order_event
+from orders.models import Order
+
+
+# Sent after an order and its lines are created together (the lines are
+# bulk-created, so OrderItem signals never fire). Args: order, items
+order_placed = Signal()
+
+
+@receiver(post_save, sender=Order)
+def publish_order_event(sender, instance, **kwargs):
+    """Publish once the change is committed so subscribers never see rolled-back state"""
+    event = order_event(instance)
+    transaction.on_commit(lambda: OrderEventBroker.publish_order(event))
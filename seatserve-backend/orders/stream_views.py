@@ -0,0 +1,106 @@
+"""
+Server-Sent Events streams for live order status
+Async views: run under ASGI (config.asgi) so idle streams do not pin a worker
+"""
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from orders.events import (
+    OPEN_ORDER_STATUSES, OrderEventBroker, order_channel, order_event, restaurant_channel
+)
+from orders.models import Order
+from restaurants.tenant import get_restaurant_for_user
+
+
+def _format_event(event):
+    return f'event: order\nid: {event["id"]}:{event["updated_at"]}\ndata: {json.dumps(event)}\n\n'
+
+
+async def _event_stream(channels, initial_events, follow):
+    """Emit the current state, then live events with periodic heartbeats"""
+    heartbeat = getattr(settings, 'ORDER_STREAM_HEARTBEAT_SECONDS', 15)
+    max_seconds = getattr(settings, 'ORDER_STREAM_MAX_SECONDS', 300)
+
+    # Clients reconnect after the stream closes; fall back to 5s when not following
+    yield f'retry: {heartbeat * 1000 if follow else 5000}\n\n'
+    for event in initial_events:
+        yield _format_event(event)
+    if not follow:
+        return
+
+    deadline = time.monotonic() + max_seconds
+    subscription = OrderEventBroker.subscribe(channels, heartbeat)
+    try:
+        async for event in subscription:
+            yield ': heartbeat\n\n' if event is None else _format_event(event)
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        await subscription.aclose()
+
+
+def _stream_response(request, channels, initial_events):
+    # Under WSGI an async stream would be buffered in full, so only send the snapshot
+    follow = isinstance(request, ASGIRequest)
+    response = StreamingHttpResponse(
+        _event_stream(channels, initial_events, follow),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
+
+
+async def _authenticate(request):
+    """
+    Resolve a JWT from the Authorization header or the auth cookie (EventSource)
+
+    Tokens in the query string are refused: they end up in access logs and
+    browser history.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is not None:
+        raw_token = authenticator.get_raw_token(header)
+    else:
+        raw_token = request.COOKIES.get(settings.SIMPLE_JWT.get('AUTH_COOKIE', 'access_token'))
+    if not raw_token:
+        return None
+
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        return await sync_to_async(authenticator.get_user)(validated_token)
+    except (InvalidToken, TokenError):
+        return None
+
+
+async def order_event_stream(request, order_token):
+    """Live status stream for a single order (public, by order token)"""
+    order = await Order.objects.filter(public_token=order_token).afirst()
+    if order is None:
+        raise Http404('Order not found')
+    return _stream_response(request, [order_channel(order.public_token)], [order_event(order)])
+
+
+async def restaurant_event_stream(request):
+    """Live stream of the current user's restaurant orders (kitchen display)"""
+    user = await _authenticate(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    restaurant = await sync_to_async(get_restaurant_for_user)(user)
+    if restaurant is None:
+        return JsonResponse({'detail': 'Restaurant not found'}, status=404)
+
+    open_orders = Order.objects.filter(
+        restaurant=restaurant,
+        status__in=OPEN_ORDER_STATUSES
+    ).order_by('created_at')
+    initial_events = [order_event(order) async for order in open_orders]
+    return _stream_response(request, [restaurant_channel(restaurant.id)], initial_events)
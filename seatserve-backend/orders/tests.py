@@ -0,0 +1,539 @@
+"""
+Tests for orders app
+"""
+import asyncio
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from menu.models import Category, MenuItem
+from orders.events import InMemoryBroker, OrderEventBroker, order_channel
+from orders.models import Order, OrderItem
+from orders.order_service import OrderCreationService
+from orders.public_urls import async_urlpatterns
+from payments.models import Payment
+from restaurants.models import Plan, Restaurant, RestaurantSubscription, Table
+from restaurants.testing import QueryBudgetMixin
+
+
+def create_restaurant_fixture(email='owner@example.com'):
+    """Create an owner, restaurant, active subscription, table and a small menu"""
+    owner = User.objects.create_user(email=email, password='testpass123', role='RESTAURANT')
+    plan = Plan.objects.create(name='Standard', price=Decimal('24.99'), max_tables=20, max_menu_items=200)
+    restaurant = Restaurant.objects.create(owner=owner, name='Test Bistro', email=email)
+    RestaurantSubscription.objects.create(
+        restaurant=restaurant, plan=plan, status='ACTIVE', end_date=now() + timedelta(days=30)
+    )
+    table = Table.objects.create(restaurant=restaurant, name='T1')
+    mains = Category.objects.create(restaurant=restaurant, name='Mains', sort_order=1)
+    drinks = Category.objects.create(restaurant=restaurant, name='Drinks', sort_order=2)
+    burger = MenuItem.objects.create(restaurant=restaurant, category=mains, name='Burger', price=Decimal('12.50'))
+    pasta = MenuItem.objects.create(restaurant=restaurant, category=mains, name='Pasta', price=Decimal('10.00'))
+    cola = MenuItem.objects.create(restaurant=restaurant, category=drinks, name='Cola', price=Decimal('2.50'))
+    return {
+        'owner': owner,
+        'restaurant': restaurant,
+        'table': table,
+        'items': {'burger': burger, 'pasta': pasta, 'cola': cola},
+    }
+
+
+class PublicMenuTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        restaurant = self.fixture['restaurant']
+        self.url = f'/api/public/restaurant/{restaurant.public_id}/table/{self.fixture["table"].token}/menu/'
+
+    def test_menu_payload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['restaurant']['name'], 'Test Bistro')
+        self.assertEqual(data['table']['name'], 'T1')
+        self.assertEqual([c['name'] for c in data['menu']], ['Mains', 'Drinks'])
+        self.assertEqual([i['name'] for i in data['menu'][0]['items']], ['Burger', 'Pasta'])
+        self.assertEqual(data['menu'][0]['items'][0]['price'], '12.50')
+
+    def test_menu_served_from_snapshot(self):
+        self.client.get(self.url)
+        # Table lookup only; entitlements and the menu come from cache
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_menu_snapshot_invalidated_on_change(self):
+        self.client.get(self.url)
+        cola = self.fixture['items']['cola']
+        cola.is_available = False
+        with self.captureOnCommitCallbacks(execute=True):
+            cola.save()
+        data = self.client.get(self.url).json()
+        self.assertEqual([c['name'] for c in data['menu']], ['Mains'])
+
+    def test_unknown_table(self):
+        restaurant = self.fixture['restaurant']
+        response = self.client.get(f'/api/public/restaurant/{restaurant.public_id}/table/missing/menu/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        restaurant = self.fixture['restaurant']
+        self.menu_url = f'/api/public/restaurant/{restaurant.public_id}/table/{self.fixture["table"].token}/menu/'
+        burger = self.fixture['items']['burger']
+        self.order = Order.objects.create(restaurant=restaurant, table=self.fixture['table'], total_amount=burger.price)
+        OrderItem.objects.create(order=self.order, menu_item=burger, quantity=1, price_at_time=burger.price)
+        self.order_url = f'/api/public/order/{self.order.public_token}/'
+
+    def test_menu_not_modified(self):
+        response = self.client.get(self.menu_url)
+        etag = response['ETag']
+        response = self.client.get(self.menu_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_menu_etag_changes_with_menu(self):
+        etag = self.client.get(self.menu_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.filter(pk=self.fixture['items']['cola'].pk).first().save()
+        response = self.client.get(self.menu_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_order_status_not_modified_skips_items(self):
+        response = self.client.get(self.order_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.order_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_order_status_modified_after_update(self):
+        etag = self.client.get(self.order_url)['ETag']
+        self.order.status = 'IN_KITCHEN'
+        self.order.save()
+        response = self.client.get(self.order_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'IN_KITCHEN')
+
+
+class OrderEventStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.order = Order.objects.create(restaurant=self.fixture['restaurant'], table=self.fixture['table'])
+
+    def test_broker_delivers_to_subscribers(self):
+        broker = InMemoryBroker()
+        channel = order_channel(self.order.public_token)
+
+        async def consume():
+            subscription = broker.subscribe([channel], timeout=1)
+            first = asyncio.ensure_future(subscription.__anext__())
+            await asyncio.sleep(0)  # let the subscription register
+            broker.publish(channel, {'status': 'IN_KITCHEN'})
+            message = await first
+            await subscription.aclose()
+            return message
+
+        self.assertEqual(asyncio.run(consume()), {'status': 'IN_KITCHEN'})
+
+    def test_order_save_publishes_event(self):
+        published = []
+        original = OrderEventBroker.publish_order
+        OrderEventBroker.publish_order = classmethod(lambda cls, event: published.append(event))
+        try:
+            self.order.status = 'READY_TO_SERVE'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.save()
+        finally:
+            OrderEventBroker.publish_order = original
+        self.assertEqual(published[-1]['status'], 'READY_TO_SERVE')
+        self.assertEqual(published[-1]['public_token'], self.order.public_token)
+
+    def test_order_stream_sends_current_state(self):
+        response = self.client.get(f'/api/public/order/{self.order.public_token}/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        body = asyncio.run(collect()).decode()
+        data = json.loads(body.split('data: ')[1].split('\n')[0])
+        self.assertEqual(data['status'], 'RECEIVED')
+
+    def test_restaurant_stream_requires_authentication(self):
+        response = self.client.get('/api/orders/events/')
+        self.assertEqual(response.status_code, 401)
+
+        token = str(AccessToken.for_user(self.fixture['owner']))
+        response = self.client.get('/api/orders/events/', {'token': token})
+        self.assertEqual(response.status_code, 401)  # Never from the query string
+        self.client.cookies['access_token'] = token
+        self.assertEqual(self.client.get('/api/orders/events/').status_code, 200)
+
+
+@override_settings(ORDER_CHANGES_OVERLAP_SECONDS=0)
+class OrderChangeFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+        restaurant, table = self.fixture['restaurant'], self.fixture['table']
+        self.open_order = Order.objects.create(restaurant=restaurant, table=table)
+        self.served_order = Order.objects.create(restaurant=restaurant, table=table, status='SERVED')
+
+    def test_initial_sync_returns_open_orders(self):
+        response = self.client.get('/api/orders/changes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o['id'] for o in response.data['orders']], [self.open_order.id])
+        self.assertTrue(response.data['cursor'])
+
+    def test_delta_returns_only_changes_and_tombstones(self):
+        cursor = self.client.get('/api/orders/changes/').data['cursor']
+        self.assertEqual(self.client.get(f'/api/orders/changes/?since={cursor}').data['orders'], [])
+
+        new_order = Order.objects.create(restaurant=self.fixture['restaurant'], table=self.fixture['table'])
+        self.open_order.status = 'CANCELLED'
+        self.open_order.save()
+
+        response = self.client.get(f'/api/orders/changes/?since={cursor}')
+        self.assertEqual([o['id'] for o in response.data['orders']], [new_order.id])
+        self.assertEqual(response.data['removed'], [self.open_order.id])
+        self.assertNotEqual(response.data['cursor'], cursor)
+
+        response = self.client.get(f'/api/orders/changes/?since={response.data["cursor"]}')
+        self.assertEqual(response.data['orders'], [])
+        self.assertEqual(response.data['removed'], [])
+
+    def test_delta_is_paginated(self):
+        cursor = self.client.get('/api/orders/changes/').data['cursor']
+        for _ in range(3):
+            Order.objects.create(restaurant=self.fixture['restaurant'], table=self.fixture['table'])
+        response = self.client.get(f'/api/orders/changes/?since={cursor}&limit=2')
+        self.assertEqual(len(response.data['orders']), 2)
+        self.assertTrue(response.data['has_more'])
+        response = self.client.get(f'/api/orders/changes/?since={response.data["cursor"]}&limit=2')
+        self.assertEqual(len(response.data['orders']), 1)
+        self.assertFalse(response.data['has_more'])
+
+    @override_settings(ORDER_CHANGES_OVERLAP_SECONDS=10)
+    def test_late_commit_inside_overlap_is_sent(self):
+        cursor = self.client.get('/api/orders/changes/').data['cursor']
+        # Stamped before the cursor's order but committed after the cursor was handed out
+        head = self.served_order.updated_at
+        late = Order.objects.create(restaurant=self.fixture['restaurant'], table=self.fixture['table'])
+        Order.objects.filter(pk=late.pk).update(updated_at=head - timedelta(seconds=1))
+        Order.objects.filter(pk=self.open_order.pk).update(updated_at=head - timedelta(minutes=1))  # Outside it
+
+        response = self.client.get(f'/api/orders/changes/?since={cursor}')
+        self.assertEqual([o['id'] for o in response.data['orders']], [late.id])
+        self.assertEqual(response.data['removed'], [self.served_order.id])  # Re-sent, the client dedups
+        self.assertEqual(response.data['cursor'], cursor)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/orders/changes/?since=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+
+class CreateOrderTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        restaurant = self.fixture['restaurant']
+        self.url = f'/api/public/restaurant/{restaurant.public_id}/table/{self.fixture["table"].token}/orders/'
+        self.items = self.fixture['items']
+
+    def test_create_order(self):
+        payload = {
+            'items': [
+                {'menu_item_id': self.items['burger'].id, 'quantity': 2},
+                {'menu_item_id': self.items['cola'].id, 'quantity': 3},
+            ],
+            'customer_note': 'No onions',
+        }
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(public_token=response.json()['public_token'])
+        self.assertEqual(order.total_amount, Decimal('32.50'))
+        self.assertEqual(order.payment_status, 'PAID')
+        self.assertEqual(order.customer_note, 'No onions')
+        self.assertEqual(order.items.count(), 2)
+
+    @override_settings(ORDERS_PAID_ON_CREATE=False)
+    def test_payment_left_pending_without_auto_pay(self):
+        payload = {'items': [{'menu_item_id': self.items['burger'].id, 'quantity': 1}]}
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().payment_status, 'PENDING')
+
+    def test_unavailable_item_creates_nothing(self):
+        cola = self.items['cola']
+        cola.is_available = False
+        cola.save()
+        payload = {'items': [
+            {'menu_item_id': self.items['burger'].id, 'quantity': 1},
+            {'menu_item_id': cola.id, 'quantity': 1},
+        ]}
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_other_restaurants_item_rejected(self):
+        other = create_restaurant_fixture(email='other@example.com')
+        payload = {'items': [{'menu_item_id': other['items']['burger'].id, 'quantity': 1}]}
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(MAX_ITEMS_PER_ORDER=2)
+    def test_items_per_order_bounded(self):
+        payload = {'items': [{'menu_item_id': self.items['burger'].id, 'quantity': 1}] * 3}
+        response = self.client.post(self.url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class IdempotentCreateOrderTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        restaurant = self.fixture['restaurant']
+        self.url = f'/api/public/restaurant/{restaurant.public_id}/table/{self.fixture["table"].token}/orders/'
+        self.payload = {'items': [{'menu_item_id': self.fixture['items']['burger'].id, 'quantity': 1}]}
+
+    def post(self, payload, key):
+        return self.client.post(self.url, payload, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self.post(self.payload, 'key-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(0):
+            second = self.post(self.payload, 'key-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json()['public_token'], first.json()['public_token'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_different_body(self):
+        self.post(self.payload, 'key-1')
+        payload = {'items': [{'menu_item_id': self.fixture['items']['cola'].id, 'quantity': 1}]}
+        response = self.post(payload, 'key-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_distinct_keys_create_distinct_orders(self):
+        self.post(self.payload, 'key-1')
+        self.post(self.payload, 'key-2')
+        self.assertEqual(Order.objects.count(), 2)
+
+
+# ROOT_URLCONF of AsyncGuestViewsTest: the public routes served by the async views
+urlpatterns = [path('api/public/', include(async_urlpatterns))]
+
+
+@override_settings(ROOT_URLCONF='orders.tests')
+class AsyncGuestViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        restaurant, table = self.fixture['restaurant'], self.fixture['table']
+        self.menu_url = f'/api/public/restaurant/{restaurant.public_id}/table/{table.token}/menu/'
+        self.orders_url = f'/api/public/restaurant/{restaurant.public_id}/table/{table.token}/orders/'
+        self.payload = {'items': [{'menu_item_id': self.fixture['items']['burger'].id, 'quantity': 2}]}
+
+    def get(self, url, **headers):
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def post(self, payload, **headers):
+        return async_to_sync(self.async_client.post)(
+            self.orders_url, payload, content_type='application/json', headers=headers
+        )
+
+    def sync_get(self, url):
+        with override_settings(ROOT_URLCONF='config.urls'):
+            return self.client.get(url)
+
+    def test_menu_matches_sync_view(self):
+        expected = self.sync_get(self.menu_url)
+        response = self.get(self.menu_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+        # Table lookup only; entitlements and the menu come from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(self.menu_url, **{'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_unknown_table(self):
+        restaurant = self.fixture['restaurant']
+        self.assertEqual(self.get(f'/api/public/restaurant/{restaurant.public_id}/table/missing/menu/').status_code, 404)
+        self.assertEqual(self.get('/api/public/restaurant/not-a-uuid/table/missing/menu/').status_code, 404)
+
+    def test_create_order_and_status(self):
+        response = self.post(self.payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_amount'], '25.00')
+        order = Order.objects.get()
+        self.assertEqual(order.items.get().quantity, 2)
+
+        url = f'/api/public/order/{order.public_token}/'
+        status_response = self.get(url)
+        self.assertEqual(status_response.json(), self.sync_get(url).json())
+        self.assertEqual(self.get(url, **{'If-None-Match': status_response['ETag']}).status_code, 304)
+
+    def test_create_order_rejects_bad_requests(self):
+        self.assertEqual(self.post({'items': []}).status_code, 400)
+        response = async_to_sync(self.async_client.post)(self.orders_url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = async_to_sync(self.async_client.post)(self.orders_url, {'items': ''})
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self.get(self.orders_url).status_code, 405)
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_idempotent(self):
+        first = self.post(self.payload, **{'Idempotency-Key': 'key-1'})
+        with self.assertNumQueries(0):
+            second = self.post(self.payload, **{'Idempotency-Key': 'key-1'})
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json()['public_token'], first.json()['public_token'])
+        other = {'items': [{'menu_item_id': self.fixture['items']['cola'].id, 'quantity': 1}]}
+        self.assertEqual(self.post(other, **{'Idempotency-Key': 'key-1'}).status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+        restaurant, table = self.fixture['restaurant'], self.fixture['table']
+        Order.objects.create(restaurant=restaurant, table=table, total_amount=Decimal('10.00'), payment_status='PAID')
+        Order.objects.create(restaurant=restaurant, table=table, total_amount=Decimal('5.50'), status='IN_KITCHEN')
+        Order.objects.create(restaurant=restaurant, table=table, total_amount=Decimal('7.25'), status='SERVED')
+
+    def test_stats(self):
+        response = self.client.get('/api/orders/stats/')
+        self.assertEqual(response.data, {
+            'total_orders_today': 3,
+            'total_revenue_today': 22.75,
+            'paid_orders': 1,
+            'pending_orders': 2,
+            'served_orders': 1,
+        })
+
+    def test_stats_single_query_and_cached(self):
+        # Restaurant lookup + one aggregate
+        with self.assertNumQueries(2):
+            self.client.get('/api/orders/stats/')
+        # Restaurant and stats both come from cache
+        with self.assertNumQueries(0):
+            self.client.get('/api/orders/stats/')
+
+    def test_hourly_breakdown(self):
+        response = self.client.get('/api/orders/stats/?breakdown=hour')
+        self.assertEqual(sum(row['orders'] for row in response.data['by_hour']), 3)
+
+    def test_revenue_summed_as_decimal(self):
+        midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        amounts = [Decimal('0.10'), Decimal('0.20'), Decimal('0.70')] * 3
+        for hour, amount in enumerate(amounts):
+            order = Order.objects.create(
+                restaurant=self.fixture['restaurant'], table=self.fixture['table'], total_amount=amount
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=midnight + timedelta(hours=hour))
+
+        response = self.client.get('/api/orders/stats/?breakdown=hour')
+        self.assertEqual(response.data['total_revenue_today'], Decimal('25.75'))
+        self.assertTrue(all(isinstance(row['revenue'], Decimal) for row in response.data['by_hour']))
+        self.assertEqual(response.json()['total_revenue_today'], 25.75)  # Still a JSON number
+
+
+class OrderQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+        self.add_orders(1)
+        self.client.get('/api/orders/')  # Warm the tenant cache
+
+    def add_orders(self, count):
+        items = self.fixture['items']
+        items_data = [
+            {'menu_item_id': items['burger'].id, 'quantity': 1},
+            {'menu_item_id': items['cola'].id, 'quantity': 2},
+        ]
+        for _ in range(count):
+            order = OrderCreationService.create_order(self.fixture['restaurant'], self.fixture['table'], items_data)
+            Payment.objects.create(order=order, restaurant=order.restaurant, amount=order.total_amount)
+
+    def test_order_list(self):
+        # orders with restaurant/table + items with menu items (no COUNT with cursor pages)
+        response = self.assertConstantQueries(2, self.client.get, lambda: self.add_orders(20), '/api/orders/')
+        self.assertNotIn('count', response.data)
+        self.assertEqual(response.data['results'][0]['items'][0]['menu_item_name'], 'Burger')
+
+    def test_kitchen_views(self):
+        # changes/ also reads the head cursor
+        for url, budget in (('/api/orders/pending/', 2), ('/api/orders/today/', 2), ('/api/orders/changes/', 3)):
+            self.assertConstantQueries(budget, self.client.get, lambda: self.add_orders(5), url)
+
+    def test_payment_list(self):
+        # Slim by default: no order join or items prefetch
+        response = self.assertConstantQueries(1, self.client.get, lambda: self.add_orders(20), '/api/payments/')
+        self.assertNotIn('order_detail', response.data['results'][0])
+
+        response = self.assertQueryBudget(2, self.client.get, '/api/payments/?expand=order_detail')
+        self.assertEqual(response.data['results'][0]['order_detail']['table_name'], 'T1')
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/orders/?fields=id,status,items.quantity')
+        order = response.data['results'][0]
+        self.assertEqual(set(order), {'id', 'status', 'items'})
+        self.assertEqual(order['items'][0], {'quantity': 1})
+        self.assertNotIn('customer_note', context.captured_queries[0]['sql'])
+
+        # Detail views include expandable fields; lists need ?expand=
+        detail = self.client.get(f"/api/orders/{order['id']}/").data
+        self.assertIn('menu_item_detail', detail['items'][0])
+        listed = self.client.get('/api/orders/').data['results'][0]
+        self.assertNotIn('menu_item_detail', listed['items'][0])
+        listed = self.client.get('/api/orders/?expand=items.menu_item_detail').data['results'][0]
+        self.assertEqual(listed['items'][0]['menu_item_detail']['name'], 'Burger')
+
+    def test_cursor_pages(self):
+        self.add_orders(4)
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        seen, url = [], '/api/orders/?page_size=2'
+        while url:
+            response = self.assertQueryBudget(2, self.client.get, url)
+            seen.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+        response = self.client.get('/api/orders/?count=true')
+        self.assertEqual(response.data['count'], 5)
+
+    def test_public_order_status(self):
+        order = Order.objects.first()
+        self.assertQueryBudget(2, self.client.get, f'/api/public/order/{order.public_token}/')
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from orders.views import OrderViewSet
+from orders.stream_views import restaurant_event_stream
 
 router = DefaultRouter()
 router.register(r'', OrderViewSet, basename='order')
 
 urlpatterns = [
+    path('events/', restaurant_event_stream, name='order-events'),
     path('', include(router.urls)),
 ]
@@ -2,29 +2,43 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Q, F
-
-from orders.models import Order, OrderItem
+from django.db.models import prefetch_related_objects
+
+from config.db_router import use_primary
+from orders.models import Order
+from orders.change_feed import OrderChangeFeed
+from orders.order_service import OrderCreationService
+from orders.idempotency import idempotent
+from orders.conditional import menu_etag, order_etag, not_modified_response, set_validators
 from orders.serializers import (
     OrderSerializer, OrderCreateSerializer, OrderStatusUpdateSerializer,
-    OrderPublicStatusSerializer, OrderItemSerializer
+    OrderPublicStatusSerializer
 )
-from menu.models import MenuItem
-from restaurants.models import Restaurant, Table
-from restaurants.permissions import IsRestaurantUser, IsRestaurantOrderOwner
+from menu.snapshot_service import MenuSnapshotService
+from restaurants.models import Table
+from restaurants.permissions import IsRestaurantUser
+from restaurants.plan_service import PlanEnforcementService
+from restaurants.stats_service import DashboardStatsService
+from restaurants.tenant import current_restaurant
+from restaurants.eager_loading import EagerLoadingViewSetMixin
+from restaurants.pagination import CreatedAtCursorPagination
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     """Restaurant order management"""
     serializer_class = OrderSerializer
     permission_classes = (IsAuthenticated, IsRestaurantUser)
+    pagination_class = CreatedAtCursorPagination
+    ordering = CreatedAtCursorPagination.ordering
+    ordering_fields = ('created_at',)  # Cursor pages need an indexed, stable order
 
     def get_queryset(self):
         """Get orders for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if restaurant:
-            return Order.objects.filter(restaurant=restaurant).prefetch_related('items')
+            return Order.objects.filter(restaurant=restaurant)
         return Order.objects.none()
 
     @action(detail=False, methods=['get'])
@@ -33,17 +47,17 @@ class OrderViewSet(viewsets.ModelViewSet):
         from django.utils.timezone import now
         today = now().date()
         
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        orders = Order.objects.filter(
+        orders = OrderSerializer.setup_eager_loading(Order.objects.filter(
             restaurant=restaurant,
             created_at__date=today
-        ).prefetch_related('items').order_by('-created_at')
+        )).order_by('-created_at')
         
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
@@ -51,21 +65,52 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def pending(self, request):
         """Get pending orders"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        orders = Order.objects.filter(
+        orders = OrderSerializer.setup_eager_loading(Order.objects.filter(
             restaurant=restaurant,
             status__in=['RECEIVED', 'IN_KITCHEN']
-        ).prefetch_related('items').order_by('-created_at')
+        )).order_by('-created_at')
         
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    @use_primary  # A lagging replica would let the cursor pass changes it has not received yet
+    def changes(self, request):
+        """Get orders changed since a cursor (kitchen display delta sync)"""
+        restaurant = current_restaurant(request)
+        if not restaurant:
+            return Response(
+                {'detail': 'Restaurant not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', OrderChangeFeed.DEFAULT_LIMIT))
+            feed = OrderChangeFeed.get_changes(
+                restaurant,
+                cursor=request.query_params.get('since') or None,
+                limit=max(limit, 1)
+            )
+        except ValueError:
+            return Response(
+                {'detail': 'Invalid cursor or limit'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'cursor': feed['cursor'],
+            'has_more': feed['has_more'],
+            'orders': OrderSerializer(feed['orders'], many=True).data,
+            'removed': feed['removed'],
+        })
+
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """Update order status"""
@@ -82,29 +127,18 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get order statistics for restaurant"""
-        from django.utils.timezone import now
-        today = now().date()
-        
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        """Get order statistics for restaurant (?breakdown=hour adds hourly buckets)"""
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        today_orders = Order.objects.filter(
-            restaurant=restaurant,
-            created_at__date=today
-        )
-        
-        return Response({
-            'total_orders_today': today_orders.count(),
-            'total_revenue_today': float(today_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0),
-            'paid_orders': today_orders.filter(payment_status='PAID').count(),
-            'pending_orders': today_orders.filter(status__in=['RECEIVED', 'IN_KITCHEN']).count(),
-            'served_orders': today_orders.filter(status='SERVED').count(),
-        })
+        return Response(DashboardStatsService.order_stats(
+            restaurant,
+            include_hourly=request.query_params.get('breakdown') == 'hour'
+        ))
 
 
 class PublicOrderViewSet(viewsets.ViewSet):
@@ -114,86 +148,51 @@ class PublicOrderViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='restaurant/(?P<restaurant_public_id>[^/.]+)/table/(?P<table_token>[^/.]+)/menu')
     def menu(self, request, restaurant_public_id=None, table_token=None):
         """Get menu for a specific table (public access)"""
-        restaurant = get_object_or_404(
-            Restaurant,
-            public_id=restaurant_public_id,
-            is_active=True
-        )
-        
         table = get_object_or_404(
-            Table,
-            restaurant=restaurant,
+            Table.objects.select_related('restaurant'),
+            restaurant__public_id=restaurant_public_id,
+            restaurant__is_active=True,
             token=table_token,
             is_active=True
         )
+        restaurant = table.restaurant
 
         # Check if restaurant has active subscription
-        if not restaurant.active_subscription:
+        if not PlanEnforcementService.is_subscription_active(restaurant):
             return Response(
                 {'detail': 'Restaurant is not active'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Get menu grouped by category
-        from menu.models import Category
-        categories = Category.objects.filter(
-            restaurant=restaurant,
-            is_active=True
-        ).prefetch_related('items')
-        
-        data = {
-            'restaurant': {
-                'id': restaurant.id,
-                'public_id': str(restaurant.public_id),
-                'name': restaurant.name,
-                'logo_url': restaurant.logo_url,
-            },
-            'table': {
-                'id': table.id,
-                'name': table.name,
-            },
-            'menu': []
-        }
-        
-        for category in categories:
-            items = []
-            for item in category.items.filter(is_available=True):
-                items.append({
-                    'id': item.id,
-                    'name': item.name,
-                    'description': item.description,
-                    'price': str(item.price),
-                    'image_url': item.image_url,
-                    'tags': item.tags,
-                })
-            
-            if items:  # Only include categories with available items
-                data['menu'].append({
-                    'id': category.id,
-                    'name': category.name,
-                    'items': items
-                })
-        
-        return Response(data)
+        # Answer revalidations from the menu version alone
+        etag = menu_etag(MenuSnapshotService.get_version(restaurant.id), table)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        # Serve the pre-rendered menu snapshot with only the table filled in
+        version, snapshot = MenuSnapshotService.get_snapshot(restaurant)
+        response = HttpResponse(
+            MenuSnapshotService.render_for_table(snapshot, table),
+            content_type='application/json'
+        )
+        return set_validators(response, menu_etag(version, table))
 
     @action(detail=False, methods=['post'], url_path='restaurant/(?P<restaurant_public_id>[^/.]+)/table/(?P<table_token>[^/.]+)/orders')
+    @idempotent
     def create_order(self, request, restaurant_public_id=None, table_token=None):
         """Create an order from QR (public access)"""
-        restaurant = get_object_or_404(
-            Restaurant,
-            public_id=restaurant_public_id,
-            is_active=True
-        )
-        
         table = get_object_or_404(
-            Table,
-            restaurant=restaurant,
+            Table.objects.select_related('restaurant'),
+            restaurant__public_id=restaurant_public_id,
+            restaurant__is_active=True,
             token=table_token,
             is_active=True
         )
+        restaurant = table.restaurant
 
         # Check if restaurant has active subscription
-        if not restaurant.active_subscription:
+        if not PlanEnforcementService.is_subscription_active(restaurant):
             return Response(
                 {'detail': 'Restaurant is not active'},
                 status=status.HTTP_403_FORBIDDEN
@@ -201,41 +200,20 @@ class PublicOrderViewSet(viewsets.ViewSet):
 
         serializer = OrderCreateSerializer(data=request.data)
         if serializer.is_valid():
-            # Create order
-            order = Order.objects.create(
-                restaurant=restaurant,
-                table=table,
-                payment_status='PENDING',  # Will be updated after payment
-                status='RECEIVED',
-                customer_note=serializer.validated_data.get('customer_note', '')
-            )
-
-            total_amount = 0
-            # Create order items
-            for item_data in serializer.validated_data['items']:
-                menu_item = get_object_or_404(
-                    MenuItem,
-                    id=item_data['menu_item_id'],
-                    restaurant=restaurant
+            try:
+                order = OrderCreationService.create_order(
+                    restaurant,
+                    table,
+                    serializer.validated_data['items'],
+                    customer_note=serializer.validated_data.get('customer_note', '')
                 )
-                
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=menu_item,
-                    quantity=item_data['quantity'],
-                    price_at_time=menu_item.price
+            except ValueError as e:
+                return Response(
+                    {'items': [str(e)]},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-                
-                total_amount += menu_item.price * item_data['quantity']
-
-            order.total_amount = total_amount
-            order.save()
-
-            # TODO: In production, redirect to payment gateway
-            # For MVP, mark as PAID automatically
-            order.payment_status = 'PAID'
-            order.save()
 
+            prefetch_related_objects([order], *OrderPublicStatusSerializer.prefetch_lookups())
             return Response(
                 OrderPublicStatusSerializer(order).data,
                 status=status.HTTP_201_CREATED
@@ -247,4 +225,14 @@ class PublicOrderViewSet(viewsets.ViewSet):
     def order_status(self, request, order_token=None):
         """Get order status by public token"""
         order = get_object_or_404(Order, public_token=order_token)
-        return Response(OrderPublicStatusSerializer(order).data)
+
+        # Unchanged orders get a 304 before any order items are loaded
+        etag = order_etag(order)
+        last_modified = int(order.updated_at.timestamp())
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        prefetch_related_objects([order], *OrderPublicStatusSerializer.prefetch_lookups())
+        response = Response(OrderPublicStatusSerializer(order).data)
+        return set_validators(response, etag, last_modified)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from payments.models import Payment
+from payments.models import Payment, StripeWebhookEvent
+from payments.webhook_service import WebhookInboxService
 
 
 @admin.register(Payment)
@@ -8,3 +9,17 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'gateway', 'created_at')
     search_fields = ('order__public_token', 'gateway_reference')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(StripeWebhookEvent)
+class StripeWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'status', 'attempts', 'next_attempt_at', 'received_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('event_id',)
+    readonly_fields = ('received_at', 'processed_at')
+    actions = ('requeue',)
+
+    @admin.action(description='Requeue selected events')
+    def requeue(self, request, queryset):
+        count = WebhookInboxService.requeue(queryset)
+        self.message_user(request, f'{count} events requeued')
@@ -0,0 +1,112 @@
+"""
+Circuit breaker for calls to external services
+Fails fast while a dependency is down instead of tying up workers on timeouts
+"""
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f'{name} is unavailable (circuit open, retry in {retry_after:.0f}s)')
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker
+
+    CLOSED: calls pass through; `failure_threshold` consecutive failures open it.
+    OPEN: calls fail fast with CircuitOpenError for `recovery_timeout` seconds.
+    HALF_OPEN: one trial call is let through; success closes, failure re-opens.
+
+    Only exceptions in `failure_exceptions` count as failures, so client
+    errors (bad card, invalid request) never trip the breaker.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, failure_exceptions=(Exception,)):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_exceptions = failure_exceptions
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def snapshot(self):
+        """State for health/diagnostic output"""
+        with self._lock:
+            state = self._current_state()
+            retry_after = None
+            if state == self.OPEN:
+                retry_after = round(self.recovery_timeout - (time.monotonic() - self._opened_at), 1)
+            return {
+                'name': self.name,
+                'state': state,
+                'consecutive_failures': self._failures,
+                'retry_after': retry_after,
+            }
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                raise CircuitOpenError(self.name, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            if state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self._trial_in_flight = True
+
+    def _record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func through the breaker
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions:
+            self._record_failure()
+            raise
+        except Exception:
+            self._record_success()  # The dependency answered; the request itself was rejected
+            raise
+        self._record_success()
+        return result
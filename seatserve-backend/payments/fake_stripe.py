@@ -0,0 +1,144 @@
+"""
+Minimal fake of the Stripe API for offline load testing
+Covers the endpoints StripePaymentService calls, with injectable latency
+and failure rate. Point STRIPE_API_BASE at it (manage.py fake_stripe).
+"""
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+def _new_id(prefix):
+    return f'{prefix}_fake_{uuid.uuid4().hex[:24]}'
+
+
+def _unflatten(form):
+    """Decode Stripe's form encoding (a[b][0][c]=v) into nested dicts/lists"""
+    result = {}
+    for key, value in form:
+        parts = re.findall(r'[^\[\]]+', key)
+        node = result
+        for part, following in zip(parts, parts[1:]):
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def listify(node):
+        if isinstance(node, dict):
+            if node and all(k.isdigit() for k in node):
+                return [listify(node[k]) for k in sorted(node, key=int)]
+            return {k: listify(v) for k, v in node.items()}
+        return node
+
+    return listify(result)
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Request-Id', _new_id('req'))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate(self):
+        """Apply latency and failures; returns True if the request was failed"""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            self._send(500, {'error': {'type': 'api_error', 'message': 'Fake Stripe injected failure'}})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._simulate():
+            return
+        path = self.path.split('?')[0]
+
+        match = re.fullmatch(r'/v1/checkout/sessions/([^/]+)', path)
+        if match:
+            session_id = match.group(1)
+            return self._send(200, {
+                'id': session_id,
+                'object': 'checkout.session',
+                'payment_status': 'paid',
+                'status': 'complete',
+                'payment_intent': f'pi_{session_id}',
+                'amount_total': 1000,
+                'customer_email': None,
+                'metadata': {},
+            })
+
+        match = re.fullmatch(r'/v1/payment_intents/([^/]+)', path)
+        if match:
+            return self._send(200, {
+                'id': match.group(1), 'object': 'payment_intent', 'status': 'succeeded',
+                'amount': 1000, 'currency': 'usd', 'latest_charge': _new_id('ch'),
+            })
+
+        match = re.fullmatch(r'/v1/events/([^/]+)', path)
+        if match:
+            return self._send(200, {'id': match.group(1), 'object': 'event', 'type': 'ping', 'data': {'object': {}}})
+
+        self._send(404, {'error': {'type': 'invalid_request_error', 'message': f'Unrecognized request URL {path}'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        params = _unflatten(parse_qsl(self.rfile.read(length).decode()))
+        if self._simulate():
+            return
+        path = self.path.split('?')[0]
+
+        if path == '/v1/checkout/sessions':
+            session_id = _new_id('cs')
+            amount_total = sum(
+                int(item['price_data']['unit_amount']) * int(item.get('quantity', 1))
+                for item in params.get('line_items', [])
+            )
+            return self._send(200, {
+                'id': session_id,
+                'object': 'checkout.session',
+                'client_secret': f'{session_id}_secret',
+                'url': f'https://checkout.stripe.test/{session_id}',
+                'payment_status': 'unpaid',
+                'status': 'open',
+                'amount_total': amount_total,
+                'metadata': params.get('metadata', {}),
+            })
+
+        if path == '/v1/refunds':
+            return self._send(200, {
+                'id': _new_id('re'),
+                'object': 'refund',
+                'status': 'succeeded',
+                'amount': int(params.get('amount', 1000)),
+                'payment_intent': params.get('payment_intent'),
+                'reason': None,
+                'metadata': {},
+            })
+
+        self._send(404, {'error': {'type': 'invalid_request_error', 'message': f'Unrecognized request URL {path}'}})
+
+
+def make_server(host='127.0.0.1', port=12111, latency=0.0, jitter=0.0, error_rate=0.0):
+    """Threaded fake Stripe server (port 0 picks a free port)"""
+    handler = type('ConfiguredFakeStripeHandler', (FakeStripeHandler,), {
+        'latency': latency, 'jitter': jitter, 'error_rate': error_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,34 @@
+"""
+Run a local fake Stripe API for offline load testing
+"""
+from django.core.management.base import BaseCommand
+
+from payments.fake_stripe import make_server
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake Stripe API (set STRIPE_API_BASE=http://HOST:PORT in the app)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Added to every response')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency, up to this much')
+        parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests failed with a 500')
+
+    def handle(self, *args, **options):
+        server = make_server(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency_ms'] / 1000,
+            jitter=options['jitter_ms'] / 1000,
+            error_rate=options['error_rate'],
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f'Fake Stripe listening on http://{host}:{port}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
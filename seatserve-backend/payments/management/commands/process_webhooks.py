@@ -0,0 +1,29 @@
+"""
+Drain the Stripe webhook inbox
+"""
+import time
+from django.core.management.base import BaseCommand
+
+from payments.webhook_service import WebhookInboxService
+
+
+class Command(BaseCommand):
+    help = 'Process pending Stripe webhook events (use --loop to run as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Events claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when idle')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when idle (with --loop)')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = WebhookInboxService.process_batch(options['batch_size'])
+            total += handled
+            if handled:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} webhook events'))
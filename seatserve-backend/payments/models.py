@@ -46,7 +46,7 @@ class Payment(models.Model):
         db_table = 'payments_payment'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['restaurant', '-created_at']),
+            models.Index(fields=['restaurant', '-created_at', '-id']),  # keyset pagination
             models.Index(fields=['gateway_reference']),
             models.Index(fields=['status']),
         ]
@@ -71,3 +71,38 @@ class Payment(models.Model):
         self.refund_amount += refund_amount
         self.status = 'REFUND_PENDING'
         self.save()
+
+
+class StripeWebhookEvent(models.Model):
+    """Inbox of verified Stripe webhook events, drained by the process_webhooks worker"""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('PROCESSED', 'Processed'),
+        ('RETRY', 'Retry Scheduled'),
+        ('DEAD', 'Dead Letter'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.CharField(max_length=255, unique=True)  # Stripe event id, dedupes redeliveries
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)  # PROCESSING lease
+    last_error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'payments_webhook_event'
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} {self.event_id} ({self.status})'
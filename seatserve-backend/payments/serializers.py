@@ -4,12 +4,21 @@ Payment serializers for DRF
 from rest_framework import serializers
 from .models import Payment
 from orders.serializers import OrderSerializer
+from restaurants.eager_loading import EagerLoadingMixin
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     order_detail = OrderSerializer(source='order', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
+
+    nested_fields = {'order': OrderSerializer}
+    expandable_fields = ('order_detail',)
+    field_sources = {
+        'status_display': ('status',),
+        'payment_method_display': ('payment_method',),
+        'is_refundable': ('status', 'amount', 'refund_amount'),
+    }
     
     class Meta:
         model = Payment
@@ -26,10 +35,12 @@ class PaymentSerializer(serializers.ModelSerializer):
         ]
 
 
-class PaymentDetailSerializer(serializers.ModelSerializer):
+class PaymentDetailSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     order = OrderSerializer(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
+
+    nested_fields = {'order': OrderSerializer}
     
     class Meta:
         model = Payment
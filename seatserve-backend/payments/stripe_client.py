@@ -0,0 +1,80 @@
+"""
+Shared Stripe API client
+One pooled, timeout-bounded client per process, guarded by a circuit breaker
+"""
+import os
+import threading
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from payments.circuit_breaker import CircuitBreaker
+
+
+# Errors that mean Stripe is unreachable or unhealthy (card/validation errors do not count)
+STRIPE_FAILURES = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+stripe_breaker = CircuitBreaker(
+    'stripe',
+    failure_threshold=settings.STRIPE_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.STRIPE_BREAKER_RECOVERY_SECONDS,
+    failure_exceptions=STRIPE_FAILURES,
+)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def build_stripe_client():
+    """Stripe client over a keep-alive connection pool with strict timeouts"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)  # Local fake server
+
+    options = {}
+    if settings.STRIPE_API_BASE:
+        options['base_addresses'] = {'api': settings.STRIPE_API_BASE}
+
+    return stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        http_client=stripe.RequestsClient(
+            timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+            session=session,
+        ),
+        # Retries back off and reuse an idempotency key, so POSTs are safe to retry
+        max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+        **options
+    )
+
+
+def get_stripe_client():
+    """The process-wide client (rebuilt after fork so workers never share sockets)"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = build_stripe_client()
+                _client_pid = os.getpid()
+    return _client
+
+
+def reset_stripe_client():
+    """Drop the cached client, e.g. after settings change in tests"""
+    global _client
+    with _client_lock:
+        _client = None
+    stripe_breaker.reset()
+
+
+def call_stripe(operation, *args, **kwargs):
+    """
+    Call `operation(client, ...)` through the circuit breaker
+
+    Raises:
+        CircuitOpenError: If Stripe has been failing and the circuit is open
+        stripe.StripeError: Errors from the call itself
+    """
+    return stripe_breaker.call(operation, get_stripe_client(), *args, **kwargs)
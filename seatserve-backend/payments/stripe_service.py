@@ -5,11 +5,29 @@ Handles checkout sessions, payment confirmation, and refunds
 import stripe
 from decimal import Decimal
 from django.conf import settings
-from django.urls import reverse
 
+from payments.circuit_breaker import CircuitOpenError
+from payments.stripe_client import call_stripe
 
-# Configure Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+
+class PaymentGatewayUnavailable(Exception):
+    """Stripe is unreachable or its circuit is open; safe to retry later"""
+
+    def __init__(self, message, retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+def _gateway_call(error_prefix, operation, *args, **kwargs):
+    """Call Stripe through the shared client, mapping errors to service exceptions"""
+    try:
+        return call_stripe(operation, *args, **kwargs)
+    except CircuitOpenError as e:
+        raise PaymentGatewayUnavailable(str(e), retry_after=e.retry_after)
+    except (stripe.APIConnectionError, stripe.RateLimitError) as e:
+        raise PaymentGatewayUnavailable(f"{error_prefix}: {str(e)}")
+    except stripe.StripeError as e:
+        raise Exception(f"{error_prefix}: {str(e)}")
 
 
 class StripePaymentService:
@@ -28,58 +46,53 @@ class StripePaymentService:
             dict: Session data with session_id and client_secret
             
         Raises:
-            stripe.error.StripeError: If Stripe API call fails
+            PaymentGatewayUnavailable: If Stripe is unreachable or the circuit is open
+            Exception: If Stripe rejects the request
         """
-        try:
-            restaurant = order.restaurant
-            
-            # Prepare line items
-            line_items = []
-            for item in order.items.all():
-                line_items.append({
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': item.menu_item.name,
-                            'description': f"Table {order.table.number}" if order.table else "To-go",
-                            'metadata': {
-                                'restaurant_id': str(restaurant.id),
-                                'order_id': str(order.id),
-                            }
-                        },
-                        'unit_amount': int(item.price * 100),  # Convert to cents
+        restaurant = order.restaurant
+
+        # Prepare line items
+        line_items = []
+        for item in order.items.select_related('menu_item'):
+            line_items.append({
+                'price_data': {
+                    'currency': 'usd',
+                    'product_data': {
+                        'name': item.menu_item.name,
+                        'description': f"Table {order.table.name}" if order.table else "To-go",
+                        'metadata': {
+                            'restaurant_id': str(restaurant.id),
+                            'order_id': str(order.id),
+                        }
                     },
-                    'quantity': item.quantity,
-                })
-            
-            # Build success/cancel URLs
-            base_url = settings.FRONTEND_URL if hasattr(settings, 'FRONTEND_URL') else 'http://localhost:3000'
-            success_url = f"{base_url}/order-status/{order.public_token}?session_id={{CHECKOUT_SESSION_ID}}"
-            cancel_url = f"{base_url}/order/{restaurant.public_id}/{order.table.token if order.table else 'checkout'}"
-            
-            # Create session
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=line_items,
-                mode='payment',
-                success_url=success_url,
-                cancel_url=cancel_url,
-                metadata={
-                    'order_id': str(order.id),
-                    'restaurant_id': str(restaurant.id),
-                    'customer_email': order.customer_email or '',
+                    'unit_amount': int(item.price_at_time * 100),  # Convert to cents
                 },
-                customer_email=order.customer_email,
-            )
-            
-            return {
-                'session_id': session.id,
-                'client_secret': session.client_secret,
-                'status': 'created'
-            }
-            
-        except stripe.error.StripeError as e:
-            raise Exception(f"Stripe API error: {str(e)}")
+                'quantity': item.quantity,
+            })
+
+        # Build success/cancel URLs
+        base_url = settings.FRONTEND_URL if hasattr(settings, 'FRONTEND_URL') else 'http://localhost:3000'
+        success_url = f"{base_url}/order-status/{order.public_token}?session_id={{CHECKOUT_SESSION_ID}}"
+        cancel_url = f"{base_url}/order/{restaurant.public_id}/{order.table.token if order.table else 'checkout'}"
+
+        # Create session
+        session = _gateway_call('Stripe API error', lambda client: client.v1.checkout.sessions.create({
+            'payment_method_types': ['card'],
+            'line_items': line_items,
+            'mode': 'payment',
+            'success_url': success_url,
+            'cancel_url': cancel_url,
+            'metadata': {
+                'order_id': str(order.id),
+                'restaurant_id': str(restaurant.id),
+            },
+        }))
+
+        return {
+            'session_id': session.id,
+            'client_secret': session.get('client_secret'),
+            'status': 'created'
+        }
     
     @staticmethod
     def confirm_payment(session_id):
@@ -92,20 +105,19 @@ class StripePaymentService:
         Returns:
             dict: Session data with payment status
         """
-        try:
-            session = stripe.checkout.Session.retrieve(session_id)
-            
-            return {
-                'session_id': session.id,
-                'payment_intent': session.payment_intent,
-                'payment_status': session.payment_status,
-                'customer_email': session.customer_email,
-                'amount_total': Decimal(session.amount_total) / 100,  # Convert from cents
-                'metadata': session.metadata,
-            }
-            
-        except stripe.error.StripeError as e:
-            raise Exception(f"Failed to retrieve session: {str(e)}")
+        session = _gateway_call(
+            'Failed to retrieve session',
+            lambda client: client.v1.checkout.sessions.retrieve(session_id)
+        )
+
+        return {
+            'session_id': session.id,
+            'payment_intent': session.get('payment_intent'),
+            'payment_status': session.get('payment_status'),
+            'customer_email': session.get('customer_email'),
+            'amount_total': Decimal(session.get('amount_total') or 0) / 100,  # Convert from cents
+            'metadata': session.get('metadata'),
+        }
     
     @staticmethod
     def confirm_payment_intent(payment_intent_id):
@@ -118,26 +130,18 @@ class StripePaymentService:
         Returns:
             dict: Payment intent details
         """
-        try:
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-            
-            return {
-                'id': intent.id,
-                'status': intent.status,
-                'amount': Decimal(intent.amount) / 100,
-                'currency': intent.currency,
-                'charges': [
-                    {
-                        'id': charge.id,
-                        'amount': Decimal(charge.amount) / 100,
-                        'status': charge.status,
-                    }
-                    for charge in intent.charges.data
-                ]
-            }
-            
-        except stripe.error.StripeError as e:
-            raise Exception(f"Failed to retrieve payment intent: {str(e)}")
+        intent = _gateway_call(
+            'Failed to retrieve payment intent',
+            lambda client: client.v1.payment_intents.retrieve(payment_intent_id)
+        )
+
+        return {
+            'id': intent.id,
+            'status': intent.status,
+            'amount': Decimal(intent.amount) / 100,
+            'currency': intent.currency,
+            'latest_charge': intent.get('latest_charge'),
+        }
     
     @staticmethod
     def refund_payment(payment_intent_id, amount=None):
@@ -151,27 +155,23 @@ class StripePaymentService:
         Returns:
             dict: Refund details
         """
-        try:
-            refund_params = {
-                'payment_intent': payment_intent_id,
-            }
-            
-            if amount:
-                # Convert to cents
-                refund_params['amount'] = int(amount * 100)
-            
-            refund = stripe.Refund.create(**refund_params)
-            
-            return {
-                'id': refund.id,
-                'status': refund.status,
-                'amount': Decimal(refund.amount) / 100,
-                'reason': refund.reason,
-                'metadata': refund.metadata,
-            }
-            
-        except stripe.error.StripeError as e:
-            raise Exception(f"Refund failed: {str(e)}")
+        refund_params = {
+            'payment_intent': payment_intent_id,
+        }
+
+        if amount:
+            # Convert to cents
+            refund_params['amount'] = int(amount * 100)
+
+        refund = _gateway_call('Refund failed', lambda client: client.v1.refunds.create(refund_params))
+
+        return {
+            'id': refund.id,
+            'status': refund.status,
+            'amount': Decimal(refund.amount) / 100,
+            'reason': refund.get('reason'),
+            'metadata': refund.get('metadata'),
+        }
     
     @staticmethod
     def verify_webhook_signature(payload, sig_header, endpoint_secret):
@@ -197,14 +197,10 @@ class StripePaymentService:
             
         except ValueError as e:
             raise Exception(f"Invalid payload: {str(e)}")
-        except stripe.error.SignatureVerificationError as e:
+        except stripe.SignatureVerificationError as e:
             raise Exception(f"Invalid signature: {str(e)}")
     
     @staticmethod
     def get_webhook_event(event_id):
         """Retrieve webhook event details"""
-        try:
-            event = stripe.Event.retrieve(event_id)
-            return event
-        except stripe.error.StripeError as e:
-            raise Exception(f"Failed to retrieve event: {str(e)}")
+        return _gateway_call('Failed to retrieve event', lambda client: client.v1.events.retrieve(event_id))
@@ -0,0 +1,206 @@
+"""
+Tests for payments app
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.events import OrderEventBroker
+from orders.models import Order
+from orders.order_service import OrderCreationService
+from orders.tests import create_restaurant_fixture
+from payments.circuit_breaker import CircuitBreaker, CircuitOpenError
+from payments.fake_stripe import make_server
+from payments.models import Payment, StripeWebhookEvent
+from payments.stripe_client import reset_stripe_client, stripe_breaker
+from payments.stripe_service import StripePaymentService
+from payments.webhook_service import WebhookInboxService
+
+
+WEBHOOK_SECRET = 'whsec_test_secret'
+
+
+def stripe_event(event_id, event_type, data):
+    return {'id': event_id, 'object': 'event', 'type': event_type, 'data': {'object': data}}
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class WebhookInboxTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.order = Order.objects.create(
+            restaurant=self.fixture['restaurant'], table=self.fixture['table'], total_amount=12
+        )
+        self.payment = Payment.objects.create(
+            order=self.order, restaurant=self.order.restaurant, amount=12, session_id='cs_test_1'
+        )
+
+    def post_event(self, event, secret=WEBHOOK_SECRET):
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+        return APIClient().post(
+            '/api/payments/webhooks/webhook/',
+            payload,
+            content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}'
+        )
+
+    def test_webhook_recorded_and_acknowledged(self):
+        event = stripe_event('evt_1', 'checkout.session.completed', {'id': 'cs_test_1', 'payment_intent': 'pi_1'})
+        response = self.post_event(event)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post_event(event).status_code, 200)  # Redelivery
+
+        inbox = StripeWebhookEvent.objects.get()
+        self.assertEqual((inbox.event_id, inbox.status), ('evt_1', 'PENDING'))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'PENDING')  # Not processed inline
+
+    def test_invalid_signature_rejected(self):
+        response = self.post_event(stripe_event('evt_1', 'charge.failed', {}), secret='whsec_wrong')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(StripeWebhookEvent.objects.exists())
+
+    def test_worker_processes_inbox(self):
+        self.post_event(stripe_event('evt_1', 'checkout.session.completed', {'id': 'cs_test_1', 'payment_intent': 'pi_1'}))
+        self.post_event(stripe_event('evt_2', 'customer.created', {'id': 'cus_1'}))  # No handler
+
+        call_command('process_webhooks', stdout=StringIO())
+
+        self.assertEqual(set(StripeWebhookEvent.objects.values_list('status', flat=True)), {'PROCESSED'})
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.gateway_reference), ('COMPLETED', 'pi_1'))
+
+    def test_charge_failed_keeps_order_payment_status(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status='PAID')
+        WebhookInboxService.record(stripe_event('evt_1', 'charge.failed', {'metadata': {'order_id': self.order.id}}))
+
+        with mock.patch.object(OrderEventBroker, 'publish_order') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                WebhookInboxService.process_batch()
+
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual((self.payment.status, self.order.payment_status), ('FAILED', 'PAID'))
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[0]['id'], self.order.id)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_dead_letter(self):
+        WebhookInboxService.record(stripe_event('evt_1', 'charge.failed', {'metadata': {'order_id': self.order.id}}))
+
+        failing_handler = mock.Mock(side_effect=RuntimeError('boom'))
+        with mock.patch.dict('payments.webhook_service.HANDLERS', {'charge.failed': failing_handler}):
+            self.assertEqual(WebhookInboxService.process_batch(), 1)
+            event = StripeWebhookEvent.objects.get()
+            self.assertEqual((event.status, event.attempts), ('RETRY', 1))
+            self.assertGreater(event.next_attempt_at, timezone.now())
+            self.assertIn('boom', event.last_error)
+
+            self.assertEqual(WebhookInboxService.process_batch(), 0)  # Not due yet
+            event.next_attempt_at = timezone.now() - timedelta(seconds=1)
+            event.save()
+            WebhookInboxService.process_batch()
+
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ('DEAD', 2))
+
+        WebhookInboxService.requeue(StripeWebhookEvent.objects.all())
+        WebhookInboxService.process_batch()
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'PROCESSED')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'FAILED')
+
+    def test_expired_lease_is_reclaimed(self):
+        event, _ = WebhookInboxService.record(stripe_event('evt_1', 'customer.created', {}))
+        self.assertEqual(len(WebhookInboxService.claim_batch()), 1)
+        self.assertEqual(WebhookInboxService.claim_batch(), [])  # Leased
+
+        StripeWebhookEvent.objects.filter(pk=event.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(WebhookInboxService.claim_batch()), 1)
+
+
+class CircuitBreakerTest(TestCase):
+    def test_opens_after_failures_and_recovers(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=60, failure_exceptions=(ConnectionError,))
+        failing = mock.Mock(side_effect=ConnectionError('down'))
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                breaker.call(failing)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(failing)
+        self.assertEqual(failing.call_count, 2)  # Failed fast
+
+        with mock.patch('payments.circuit_breaker.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertEqual(breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(breaker.snapshot()['state'], CircuitBreaker.CLOSED)
+
+    def test_client_errors_do_not_trip(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, failure_exceptions=(ConnectionError,))
+        with self.assertRaises(ValueError):
+            breaker.call(mock.Mock(side_effect=ValueError('bad request')))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class FakeStripeServerTest(TestCase):
+    def start_server(self, **kwargs):
+        server = make_server(port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        settings_override = override_settings(STRIPE_API_BASE=f'http://{host}:{port}', STRIPE_MAX_NETWORK_RETRIES=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_stripe_client()
+        self.addCleanup(reset_stripe_client)
+
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        items = self.fixture['items']
+        self.order = OrderCreationService.create_order(
+            self.fixture['restaurant'], self.fixture['table'],
+            [{'menu_item_id': items['burger'].id, 'quantity': 2}]
+        )
+
+    def test_checkout_against_fake_server(self):
+        self.start_server()
+        session = StripePaymentService.create_checkout_session(self.order)
+        self.assertTrue(session['session_id'].startswith('cs_fake_'))
+        confirmed = StripePaymentService.confirm_payment(session['session_id'])
+        self.assertEqual(confirmed['payment_status'], 'paid')
+        refund = StripePaymentService.refund_payment(confirmed['payment_intent'], Decimal('5.00'))
+        self.assertEqual(refund['amount'], Decimal('5.00'))
+
+    def test_outage_opens_circuit_and_returns_503(self):
+        self.start_server(error_rate=1.0)
+        client = APIClient()
+        client.force_authenticate(user=self.fixture['owner'])
+
+        for _ in range(stripe_breaker.failure_threshold):
+            response = client.post('/api/payments/create_checkout/', {'order_id': self.order.id}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(stripe_breaker.state, CircuitBreaker.OPEN)
+
+        response = client.post('/api/payments/create_checkout/', {'order_id': self.order.id}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
@@ -19,31 +19,49 @@ from payments.serializers import (
     PaymentSerializer, PaymentDetailSerializer, CreateCheckoutSessionSerializer,
     ConfirmPaymentSerializer, RefundPaymentSerializer
 )
-from payments.stripe_service import StripePaymentService
+from payments.stripe_service import PaymentGatewayUnavailable, StripePaymentService
+from payments.webhook_service import WebhookInboxService, mark_order_received
 from orders.models import Order
-from restaurants.models import Restaurant
+from orders.idempotency import idempotent
 from restaurants.permissions import IsRestaurantUser
+from restaurants.tenant import current_restaurant
+from restaurants.eager_loading import EagerLoadingViewSetMixin
+from restaurants.pagination import CreatedAtCursorPagination
 
 logger = logging.getLogger(__name__)
 payment_logger = logging.getLogger('payment')
 security_logger = logging.getLogger('security')
 
 
+def _gateway_unavailable(error):
+    """503 telling the client when Stripe may be reachable again"""
+    logger.warning(f"Stripe unavailable: {str(error)}")
+    response = Response(
+        {'detail': 'Payment provider is temporarily unavailable, please retry shortly'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = str(max(1, int(error.retry_after or settings.STRIPE_BREAKER_RECOVERY_SECONDS)))
+    return response
+
+
 class WebhookThrottle(UserRateThrottle):
     """Rate limit webhook endpoints"""
     scope = 'webhook'
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     """Payment management with Stripe integration"""
     serializer_class = PaymentSerializer
     permission_classes = (IsAuthenticated, IsRestaurantUser)
+    pagination_class = CreatedAtCursorPagination
+    ordering = CreatedAtCursorPagination.ordering
+    ordering_fields = ('created_at',)  # Cursor pages need an indexed, stable order
 
     def get_queryset(self):
         """Get payments for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if restaurant:
-            return Payment.objects.filter(restaurant=restaurant).order_by('-created_at')
+            return Payment.objects.filter(restaurant=restaurant)
         return Payment.objects.none()
     
     def get_serializer_class(self):
@@ -57,17 +75,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
         from django.utils.timezone import now
         
         today = now().date()
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        payments = Payment.objects.filter(
+        payments = PaymentSerializer.setup_eager_loading(Payment.objects.filter(
             restaurant=restaurant,
             created_at__date=today
-        ).order_by('-created_at')
+        )).order_by('-created_at')
         
         serializer = PaymentSerializer(payments, many=True)
         
@@ -85,6 +103,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def create_checkout(self, request):
         """Create Stripe checkout session for an order"""
         serializer = CreateCheckoutSessionSerializer(data=request.data)
@@ -119,7 +138,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 order=order,
                 defaults={
                     'restaurant': restaurant,
-                    'amount': order.total,
+                    'amount': order.total_amount,
                     'currency': 'USD',
                     'payment_method': 'STRIPE',
                 }
@@ -145,6 +164,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 {'detail': 'Order not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except PaymentGatewayUnavailable as e:
+            return _gateway_unavailable(e)
         except Exception as e:
             logger.error(f"Checkout creation failed: {str(e)}")
             return Response(
@@ -182,10 +203,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 payment.save()
                 
                 # Update order status
+                mark_order_received(payment)
                 order = payment.order
-                if order.status == 'PENDING':
-                    order.status = 'RECEIVED'
-                    order.save()
                 
                 logger.info(f"Payment confirmed: {payment.id}")
                 
@@ -212,6 +231,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 {'detail': 'Payment not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except PaymentGatewayUnavailable as e:
+            return _gateway_unavailable(e)
         except Exception as e:
             logger.error(f"Payment confirmation failed: {str(e)}")
             return Response(
@@ -274,6 +295,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+        except PaymentGatewayUnavailable as e:
+            return _gateway_unavailable(e)
         except Exception as e:
             logger.error(f"Refund failed: {str(e)}")
             return Response(
@@ -301,13 +324,14 @@ class StripeWebhookViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def webhook(self, request):
         """
-        ✅ SECURE: Handle Stripe webhook events with signature verification
-        
-        Stripe sends events to this endpoint when:
-        - Payment succeeded
-        - Payment failed
+        ✅ SECURE: Receive Stripe webhook events with signature verification
+
+        Verified events are stored in the webhook inbox (deduplicated by
+        Stripe event id) and acknowledged immediately. The process_webhooks
+        worker applies them:
+        - Checkout completed
+        - Charge succeeded / failed
         - Refund completed
-        - Dispute opened
         """
         payload = request.body
         sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
@@ -332,135 +356,15 @@ class StripeWebhookViewSet(viewsets.ViewSet):
                 {'error': 'Invalid payload'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except stripe.error.SignatureVerificationError as e:
+        except stripe.SignatureVerificationError as e:
             security_logger.warning(f'Webhook signature verification failed: {str(e)}')
             return Response(
                 {'error': 'Invalid signature'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        try:
-            # Process event only after verification
-            event_type = event['type']
-            event_data = event['data']['object']
-            
-            if event_type == 'checkout.session.completed':
-                payment_logger.info(f'Checkout completed: {event_data.get("id")}')
-                # ... handle payment
-            
-            elif event_type == 'charge.refunded':
-                payment_logger.warning(f'Refund processed: {event_data.get("id")}')
-                # ... handle refund
-            
-            return Response({'success': True})
-        
-        except Exception as e:
-            payment_logger.error(f'Webhook processing error: {str(e)}')
-            return Response(
-                {'error': 'Processing failed'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        payload = request.body
-        sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
-        
-        try:
-            event = StripePaymentService.verify_webhook_signature(
-                payload,
-                sig_header,
-                settings.STRIPE_WEBHOOK_SECRET
-            )
-            
-            event_type = event['type']
-            event_data = event['data']['object']
-            
-            logger.info(f"Stripe webhook received: {event_type}")
-            
-            if event_type == 'checkout.session.completed':
-                _handle_checkout_completed(event_data)
-            
-            elif event_type == 'charge.succeeded':
-                _handle_charge_succeeded(event_data)
-            
-            elif event_type == 'charge.failed':
-                _handle_charge_failed(event_data)
-            
-            elif event_type == 'charge.refunded':
-                _handle_charge_refunded(event_data)
-            
-            return Response({'received': True}, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            logger.error(f"Webhook error: {str(e)}")
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-
-def _handle_checkout_completed(session_data):
-    """Handle checkout.session.completed webhook"""
-    session_id = session_data['id']
-    payment_intent = session_data.get('payment_intent')
-    
-    try:
-        payment = Payment.objects.get(session_id=session_id)
-        if payment.status != 'COMPLETED':
-            payment.status = 'COMPLETED'
-            payment.gateway_reference = payment_intent
-            payment.save()
-            
-            # Update order status
-            order = payment.order
-            if order.status == 'PENDING':
-                order.status = 'RECEIVED'
-                order.save()
-            
-            logger.info(f"Payment completed via webhook: {payment.id}")
-    except Payment.DoesNotExist:
-        logger.warning(f"Payment not found for session: {session_id}")
-
-
-def _handle_charge_succeeded(charge_data):
-    """Handle charge.succeeded webhook"""
-    metadata = charge_data.get('metadata', {})
-    order_id = metadata.get('order_id')
-    
-    if order_id:
-        try:
-            payment = Payment.objects.get(order_id=order_id)
-            payment.status = 'COMPLETED'
-            payment.save()
-            logger.info(f"Payment charge succeeded: {payment.id}")
-        except Payment.DoesNotExist:
-            pass
-
-
-def _handle_charge_failed(charge_data):
-    """Handle charge.failed webhook"""
-    metadata = charge_data.get('metadata', {})
-    order_id = metadata.get('order_id')
-    
-    if order_id:
-        try:
-            payment = Payment.objects.get(order_id=order_id)
-            payment.status = 'FAILED'
-            payment.save()
-            logger.error(f"Payment charge failed: {payment.id}")
-        except Payment.DoesNotExist:
-            pass
-
-
-def _handle_charge_refunded(charge_data):
-    """Handle charge.refunded webhook"""
-    metadata = charge_data.get('metadata', {})
-    order_id = metadata.get('order_id')
-    
-    if order_id:
-        try:
-            payment = Payment.objects.get(order_id=order_id)
-            payment.status = 'REFUNDED'
-            payment.save()
-            logger.info(f"Payment refunded via webhook: {payment.id}")
-        except Payment.DoesNotExist:
-            pass
-
+        # Acknowledge right away; the process_webhooks worker applies the event
+        inbox_event, created = WebhookInboxService.record(json.loads(payload))
+        if not created:
+            security_logger.info(f'Duplicate webhook ignored: {inbox_event.event_id}')
+        return Response({'received': True}, status=status.HTTP_200_OK)
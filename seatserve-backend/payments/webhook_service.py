@@ -0,0 +1,203 @@
+"""
+Stripe webhook inbox
+The webhook endpoint only verifies and records events; the process_webhooks
+worker drains the inbox in batches with retry/backoff and a dead-letter state
+"""
+import logging
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from orders.events import OrderEventBroker, order_event
+from payments.models import Payment, StripeWebhookEvent
+
+logger = logging.getLogger(__name__)
+payment_logger = logging.getLogger('payment')
+
+
+def publish_payment_event(payment):
+    """Push the payment's order to live streams once the payment change commits"""
+    event = order_event(payment.order)
+    transaction.on_commit(lambda: OrderEventBroker.publish_order(event))
+
+
+def mark_order_received(payment):
+    """Move a PENDING order to RECEIVED once paid (the save publishes the event)"""
+    order = payment.order
+    if order.status == 'PENDING':
+        order.status = 'RECEIVED'
+        order.save()
+    else:
+        publish_payment_event(payment)
+
+
+def handle_checkout_completed(session_data):
+    """Handle checkout.session.completed webhook"""
+    session_id = session_data['id']
+    payment_intent = session_data.get('payment_intent')
+
+    try:
+        payment = Payment.objects.select_related('order').get(session_id=session_id)
+        if payment.status != 'COMPLETED':
+            payment.status = 'COMPLETED'
+            payment.gateway_reference = payment_intent or ''
+            payment.save()
+
+            # Update order status
+            mark_order_received(payment)
+
+            logger.info(f"Payment completed via webhook: {payment.id}")
+    except Payment.DoesNotExist:
+        logger.warning(f"Payment not found for session: {session_id}")
+
+
+def _payment_for_charge(charge_data):
+    order_id = (charge_data.get('metadata') or {}).get('order_id')
+    if not order_id:
+        return None
+    return Payment.objects.select_related('order').filter(order_id=order_id).first()
+
+
+def handle_charge_succeeded(charge_data):
+    """Handle charge.succeeded webhook"""
+    payment = _payment_for_charge(charge_data)
+    if payment:
+        payment.status = 'COMPLETED'
+        payment.save()
+        publish_payment_event(payment)
+        logger.info(f"Payment charge succeeded: {payment.id}")
+
+
+def handle_charge_failed(charge_data):
+    """Handle charge.failed webhook"""
+    payment = _payment_for_charge(charge_data)
+    if payment:
+        payment.status = 'FAILED'
+        payment.save()
+        publish_payment_event(payment)
+        logger.error(f"Payment charge failed: {payment.id}")
+
+
+def handle_charge_refunded(charge_data):
+    """Handle charge.refunded webhook"""
+    payment = _payment_for_charge(charge_data)
+    if payment:
+        payment.status = 'REFUNDED'
+        payment.save()
+        logger.info(f"Payment refunded via webhook: {payment.id}")
+
+
+HANDLERS = {
+    'checkout.session.completed': handle_checkout_completed,
+    'charge.succeeded': handle_charge_succeeded,
+    'charge.failed': handle_charge_failed,
+    'charge.refunded': handle_charge_refunded,
+}
+
+
+class WebhookInboxService:
+    """Record, claim and process inbox events"""
+
+    @staticmethod
+    def record(event):
+        """
+        Store a verified event; redeliveries of the same event id are ignored
+
+        Args:
+            event: Decoded Stripe event payload (dict)
+
+        Returns:
+            tuple: (StripeWebhookEvent, created)
+        """
+        try:
+            with transaction.atomic():
+                return StripeWebhookEvent.objects.create(
+                    event_id=event['id'],
+                    event_type=event['type'],
+                    payload=event
+                ), True
+        except IntegrityError:
+            return StripeWebhookEvent.objects.get(event_id=event['id']), False
+
+    @staticmethod
+    def claim_batch(batch_size=None):
+        """
+        Lease a batch of due events to this worker
+
+        Due events are PENDING/RETRY past next_attempt_at, or PROCESSING with
+        an expired lease (the worker holding it died). Rows are locked with
+        SKIP LOCKED where the database supports it, so workers can run side by side.
+        """
+        batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                StripeWebhookEvent.objects.select_for_update(skip_locked=True).filter(
+                    Q(status__in=['PENDING', 'RETRY'], next_attempt_at__lte=now)
+                    | Q(status='PROCESSING', locked_until__lt=now)
+                ).order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            if events:
+                StripeWebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                    status='PROCESSING',
+                    locked_until=now + timedelta(seconds=settings.WEBHOOK_LOCK_SECONDS)
+                )
+        return events
+
+    @staticmethod
+    def retry_delay(attempts):
+        """Exponential backoff with jitter, capped at WEBHOOK_RETRY_MAX_SECONDS"""
+        delay = min(settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX_SECONDS)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    @staticmethod
+    def process(event):
+        """
+        Run the handler for one claimed event and record the outcome
+
+        Returns:
+            str: Resulting status (PROCESSED, RETRY or DEAD)
+        """
+        handler = HANDLERS.get(event.event_type)
+        event.attempts += 1
+        try:
+            if handler is not None:
+                with transaction.atomic():
+                    handler(event.payload['data']['object'])
+        except Exception as e:
+            event.last_error = f'{type(e).__name__}: {e}'
+            if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                event.status = 'DEAD'
+                payment_logger.error(f'Webhook {event.event_id} dead-lettered after {event.attempts} attempts: {e}')
+            else:
+                event.status = 'RETRY'
+                event.next_attempt_at = timezone.now() + WebhookInboxService.retry_delay(event.attempts)
+                payment_logger.warning(f'Webhook {event.event_id} failed (attempt {event.attempts}): {e}')
+        else:
+            event.status = 'PROCESSED'
+            event.processed_at = timezone.now()
+            event.last_error = ''
+
+        event.locked_until = None
+        event.save(update_fields=[
+            'status', 'attempts', 'next_attempt_at', 'locked_until', 'last_error', 'processed_at'
+        ])
+        return event.status
+
+    @staticmethod
+    def process_batch(batch_size=None):
+        """Claim and process one batch; returns the number of events handled"""
+        events = WebhookInboxService.claim_batch(batch_size)
+        for event in events:
+            WebhookInboxService.process(event)
+        return len(events)
+
+    @staticmethod
+    def requeue(queryset):
+        """Send dead-lettered (or any) events back to the inbox for another round"""
+        return queryset.update(
+            status='PENDING', attempts=0, next_attempt_at=timezone.now(), locked_until=None
+        )
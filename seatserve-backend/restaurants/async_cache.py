@@ -0,0 +1,123 @@
+"""
+Async cache access for async views
+With django-redis as the cache, reads and writes go through a redis.asyncio
+client using django-redis's own key function, serializer and compressor, so
+values stay shared with the sync cache API. Other backends fall back to
+Django's cache.aget()/aset(), which run the sync call in a thread.
+"""
+import asyncio
+import logging
+import weakref
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from config.metrics import count_cache_reads
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:  # Optional: production cache only
+    RedisCache = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCache:
+    """Awaitable get/set/add/delete on a configured cache"""
+
+    def __init__(self, alias=DEFAULT_CACHE_ALIAS):
+        self.alias = alias
+        self._clients = weakref.WeakKeyDictionary()  # Event loop -> redis.asyncio client
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def native(self):
+        """(redis.asyncio client for the running loop, django-redis client), or None"""
+        backend = self.backend
+        if RedisCache is None or not isinstance(backend, RedisCache):
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import redis.asyncio as aioredis
+            servers = backend._server
+            location = (servers.split(',') if isinstance(servers, str) else servers)[0]  # The primary
+            options = backend._params.get('OPTIONS', {})
+            client = aioredis.Redis.from_url(
+                location,
+                socket_connect_timeout=options.get('SOCKET_CONNECT_TIMEOUT'),
+                socket_timeout=options.get('SOCKET_TIMEOUT'),
+            )
+            self._clients[loop] = client
+        return client, backend.client
+
+    def _failed(self, operation, error):
+        if not getattr(self.backend, '_ignore_exceptions', False):
+            raise error
+        logger.warning(f'Async cache {operation} failed: {str(error)}')
+
+    @staticmethod
+    def _expiry(backend, timeout):
+        """Milliseconds until expiry (None: never), following django-redis's timeout rules"""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = backend.default_timeout
+        if timeout is None:
+            return None
+        return max(0, int(timeout * 1000))
+
+    async def get(self, key, default=None):
+        native = self.native()
+        if native is None:
+            return await self.backend.aget(key, default)
+
+        client, codec = native
+        try:
+            value = await client.get(codec.make_key(key))
+        except Exception as e:
+            self._failed('get', e)
+            value = None
+        count_cache_reads(value is not None, value is None)
+        return default if value is None else codec.decode(value)
+
+    async def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """Store a value (timeout in seconds, None never expires)"""
+        native = self.native()
+        if native is None:
+            await self.backend.aset(key, value, timeout)
+        else:
+            await self._write(native, key, value, timeout, nx=False)
+
+    async def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """Store a value unless the key exists; returns whether it was stored"""
+        native = self.native()
+        if native is None:
+            return await self.backend.aadd(key, value, timeout)
+        return await self._write(native, key, value, timeout, nx=True)
+
+    async def delete(self, key):
+        native = self.native()
+        if native is None:
+            return await self.backend.adelete(key)
+        client, codec = native
+        try:
+            return bool(await client.delete(codec.make_key(key)))
+        except Exception as e:
+            self._failed('delete', e)
+            return False
+
+    async def _write(self, native, key, value, timeout, nx):
+        client, codec = native
+        expiry = self._expiry(self.backend, timeout)
+        try:
+            if expiry == 0:  # Already expired, as django-redis treats it
+                if not nx:
+                    await client.delete(codec.make_key(key))
+                return False
+            return bool(await client.set(codec.make_key(key), codec.encode(value), px=expiry, nx=nx))
+        except Exception as e:
+            self._failed('set', e)
+            return False
+
+
+async_cache = AsyncCache()
@@ -0,0 +1,230 @@
+"""
+Eager loading and sparse fieldsets for serializers
+Serializers declare the relations their fields read; viewsets apply the
+matching select_related/prefetch_related so pages cost a fixed number
+of queries. Clients can narrow a response with ?fields= and opt in to
+heavy fields with ?expand=, and the queryset is trimmed to match.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def parse_field_paths(value):
+    """'id,items.quantity' -> {'id', 'items.quantity'} (None if not given)"""
+    if value is None:
+        return None
+    return {path.strip() for path in value.split(',') if path.strip()}
+
+
+def _split_paths(paths):
+    """{'id', 'items.quantity'} -> ({'id', 'items'}, {'items': {'quantity'}})"""
+    top, nested = set(), {}
+    for path in paths:
+        name, _, rest = path.partition('.')
+        top.add(name)
+        if rest:
+            nested.setdefault(name, set()).add(rest)
+    return top, nested
+
+
+class EagerLoadingMixin:
+    """
+    Serializer mixin declaring relation needs
+
+    select_related_fields: forward FK/one-to-one paths read by the fields
+    prefetch_related_fields: reverse/many relation -> serializer class used
+        for its rows (or None), loaded with one query per relation
+    nested_fields: forward relation -> nested serializer class whose own
+        needs are joined under that relation
+    expandable_fields: heavy fields left out unless requested with expand
+    field_sources: field -> model paths it reads, for fields whose source
+        is not a model field (methods, properties, get_FOO_display)
+
+    fields/expand are sets of dotted field paths. fields=None keeps every
+    field; expand=None expands everything, expand=set() nothing.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = {}
+    nested_fields = {}
+    expandable_fields = ()
+    field_sources = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = fields
+        self.expanded_fields = expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted, wanted_nested = (None, {}) if self.sparse_fields is None else _split_paths(self.sparse_fields)
+        expand, expand_nested = (None, {}) if self.expanded_fields is None else _split_paths(self.expanded_fields)
+
+        for name in list(fields):
+            if wanted is not None and name not in wanted:
+                del fields[name]
+            elif (name in self.expandable_fields and expand is not None
+                    and name not in expand and wanted is None):
+                del fields[name]
+            else:
+                nested = getattr(fields[name], 'child', fields[name])
+                if isinstance(nested, EagerLoadingMixin):
+                    nested.sparse_fields = wanted_nested.get(name)
+                    nested.expanded_fields = None if expand is None else expand_nested.get(name, set())
+        return fields
+
+    def _field_reads(self):
+        """
+        Model paths read by the kept fields, and the nested serializers by relation
+
+        Returns:
+            tuple: (set of paths, or None if some field's reads are unknown;
+                set of relations traversed; {relation: nested serializer instance})
+        """
+        model = self.Meta.model
+        paths, traversed, nested = set(), set(), {}
+        for name, field in self.fields.items():
+            child = getattr(field, 'child', field)
+            if isinstance(child, serializers.BaseSerializer):
+                nested[field.source] = child
+                traversed.add(field.source)
+                continue
+            if name in self.field_sources:
+                field_paths = self.field_sources[name]
+            elif field.source == '*':
+                paths = None
+                continue
+            else:
+                field_paths = (field.source.replace('.', '__'),)
+
+            for path in field_paths:
+                root = path.split('__')[0]
+                try:
+                    model_field = model._meta.get_field(root)
+                except FieldDoesNotExist:
+                    paths = None  # A method or property; its reads are unknown
+                    continue
+                if '__' in path or not model_field.concrete or (
+                        model_field.is_relation and not isinstance(field, serializers.RelatedField)):
+                    traversed.add(root)  # Reads the related object, not just the FK column
+                if paths is not None and model_field.concrete:
+                    paths.add(path)
+        return paths, traversed, nested
+
+    def eager_loading(self, prefix='', trim=False):
+        """
+        Relations to load for the kept fields, and the columns they read
+
+        With trim, prefetch querysets are narrowed with only() as well.
+
+        Returns:
+            tuple: (select_related paths, prefetch lookups, only() paths or
+                None if the columns can't be narrowed)
+        """
+        paths, traversed, nested = self._field_reads()
+        model = self.Meta.model
+        pk = model._meta.pk.name
+
+        def used(relation):
+            return paths is None or relation.split('__')[0] in traversed
+
+        joined = [relation for relation in self.select_related_fields if used(relation)]
+        select = [prefix + relation for relation in joined]
+        only = None
+        if paths is not None:
+            roots = {relation.split('__')[0] for relation in joined}
+            only = {prefix + pk} | {prefix + root for root in roots} | {
+                prefix + path for path in paths if path.split('__')[0] in roots or '__' not in path
+            }
+
+        prefetch = []
+        for relation, serializer_class in self.prefetch_related_fields.items():
+            child = nested.get(relation)
+            if not used(relation):
+                continue
+            if serializer_class is None or not isinstance(child, EagerLoadingMixin):
+                prefetch.append(prefix + relation)
+                continue
+            child_select, child_prefetch, child_only = child.eager_loading(trim=trim)
+            related = serializer_class.Meta.model.objects.all()
+            if child_select:
+                related = related.select_related(*child_select)
+            if child_prefetch:
+                related = related.prefetch_related(*child_prefetch)
+            if trim and child_only is not None:
+                # The prefetch joins back to the parent rows through this FK
+                related = related.only(*child_only, model._meta.get_field(relation).field.name)
+            prefetch.append(Prefetch(prefix + relation, queryset=related))
+
+        for relation in self.nested_fields:
+            child = nested.get(relation)
+            if not isinstance(child, EagerLoadingMixin):
+                continue
+            select.append(prefix + relation)
+            child_select, child_prefetch, child_only = child.eager_loading(f'{prefix}{relation}__', trim)
+            select.extend(child_select)
+            prefetch.extend(child_prefetch)
+            if only is not None:
+                only.add(prefix + relation)
+                if child_only is not None:
+                    only.update(child_only)
+
+        return select, prefetch, only
+
+    @classmethod
+    def prefetch_lookups(cls, prefix='', fields=None, expand=None):
+        """Prefetch lookups, also usable with prefetch_related_objects()"""
+        return cls(fields=fields, expand=expand).eager_loading(prefix)[1]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, prefix='', fields=None, expand=None):
+        """
+        Load what the (optionally narrowed) serializer reads
+
+        Columns are only trimmed with only() when specific fields were asked for.
+        """
+        trim = fields is not None
+        select, prefetch, only = cls(fields=fields, expand=expand).eager_loading(prefix, trim)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if trim and only is not None:
+            queryset = queryset.only(*only)
+        return queryset
+
+
+class EagerLoadingViewSetMixin:
+    """
+    Apply the serializer's eager loading to list/detail querysets
+
+    GET requests accept ?fields=id,status,items.quantity and
+    ?expand=order_detail. List actions leave expandable fields out unless
+    expanded; detail actions include them.
+    """
+
+    def sparse_fieldset(self):
+        """(fields, expand) for this request"""
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None, None  # Writes validate and return the full representation
+        fields = parse_field_paths(self.request.query_params.get('fields'))
+        expand = parse_field_paths(self.request.query_params.get('expand'))
+        if expand is None and self.action == 'list':
+            expand = set()
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, EagerLoadingMixin):
+            fields, expand = self.sparse_fieldset()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, EagerLoadingMixin):
+            fields, expand = self.sparse_fieldset()
+            queryset = serializer_class.setup_eager_loading(queryset, fields=fields, expand=expand)
+        return queryset
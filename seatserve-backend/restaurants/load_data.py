@@ -0,0 +1,267 @@
+"""
+Synthetic load dataset generator
+Builds restaurants with menus and a history of orders, items and payments
+at production scale, deterministically from a seed. Rows are written with
+bulk_create in batches, so no model signals run; rebuild the analytics
+rollups afterwards (generate_load_data does this by default).
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from menu.models import Category, MenuItem
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from restaurants.models import Plan, Restaurant, RestaurantSubscription, Table
+
+EMAIL_DOMAIN = 'loadtest.seatserve.invalid'
+
+# Relative order volume per local hour: lunch and dinner peaks
+HOUR_WEIGHTS = (
+    0, 0, 0, 0, 0, 0, 0, 1, 3, 4, 5, 9,
+    16, 15, 8, 4, 4, 7, 14, 17, 15, 10, 5, 2,
+)
+# Monday..Sunday
+WEEKDAY_WEIGHTS = (0.8, 0.85, 0.9, 1.0, 1.3, 1.45, 1.1)
+
+CATEGORIES = (
+    ('Starters', (4, 12)), ('Mains', (11, 32)), ('Pizza', (9, 22)),
+    ('Desserts', (5, 11)), ('Drinks', (2, 7)), ('Sides', (3, 8)),
+)
+ITEMS_PER_ORDER_WEIGHTS = (30, 34, 20, 10, 6)  # 1..5 distinct items
+PAST_STATUS_WEIGHTS = (('SERVED', 94), ('CANCELLED', 6))
+OPEN_STATUS_WEIGHTS = (('RECEIVED', 3), ('IN_KITCHEN', 4), ('READY_TO_SERVE', 2), ('SERVED', 6))
+PAYMENT_METHOD_WEIGHTS = (('STRIPE', 70), ('CASH', 30))
+NOTES = ('', '', '', '', 'No onions', 'Extra spicy', 'Allergic to nuts', 'Birthday!', 'Well done')
+
+
+@contextmanager
+def historic_timestamps(*models):
+    """Let bulk_create keep explicit created_at/updated_at values"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class LoadDataGenerator:
+    """
+    Deterministic dataset builder
+
+    The same seed and options always produce the same restaurants, menus and
+    order history (timestamps are relative to the day the data is generated).
+    History ends at `now` (default: the current time); pass the end of today
+    to get a full day of today's orders whatever the time of the run.
+    """
+
+    def __init__(self, seed=42, restaurants=10, tables=20, menu_items=40, days=90,
+                 orders_per_day=120, batch_size=5000, log=None, now=None):
+        self.rng = random.Random(seed)
+        self.now = now
+        self.seed = seed
+        self.restaurant_count = restaurants
+        self.tables_per_restaurant = tables
+        self.menu_items_per_restaurant = menu_items
+        self.days = days
+        self.orders_per_day = orders_per_day
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.counts = {'restaurants': 0, 'tables': 0, 'menu_items': 0, 'orders': 0, 'items': 0, 'payments': 0}
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def email(self, index):
+        return f'load-{self.seed}-{index}@{EMAIL_DOMAIN}'
+
+    def already_generated(self):
+        return User.objects.filter(email=self.email(0)).exists()
+
+    def run(self):
+        """
+        Generate the dataset
+
+        Returns:
+            dict: Rows created per kind, plus the restaurant ids
+        """
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise ValueError('The database must return ids from bulk inserts (PostgreSQL, SQLite 3.35+)')
+
+        with transaction.atomic():
+            restaurants = self.create_restaurants()
+            menus = {restaurant.pk: self.create_menu(restaurant) for restaurant in restaurants}
+            tables = {restaurant.pk: self.create_tables(restaurant) for restaurant in restaurants}
+        self.log(f"Created {len(restaurants)} restaurants, {self.counts['tables']} tables, "
+                 f"{self.counts['menu_items']} menu items")
+
+        with historic_timestamps(Order, OrderItem, Payment):
+            self.create_history(restaurants, menus, tables)
+        return {**self.counts, 'restaurant_ids': [restaurant.pk for restaurant in restaurants]}
+
+    def create_restaurants(self):
+        password = make_password(f'load-{self.seed}')  # Hash once; hashing per user dominates otherwise
+        users = User.objects.bulk_create([
+            User(email=self.email(index), password=password, role='RESTAURANT', first_name='Load', last_name=str(index))
+            for index in range(self.restaurant_count)
+        ])
+        plans = list(Plan.objects.filter(is_active=True).order_by('price'))
+        if not plans:
+            plans = [Plan.objects.create(name='Load', price=Decimal('49.99'), max_tables=1000, max_menu_items=10000)]
+
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(
+                owner=user, public_id=self.uuid(), name=f'Load Bistro {index}',
+                email=user.email, city=self.rng.choice(('Lisbon', 'Austin', 'Pune', 'Leeds', 'Osaka')),
+            )
+            for index, user in enumerate(users)
+        ])
+        RestaurantSubscription.objects.bulk_create([
+            RestaurantSubscription(
+                restaurant=restaurant, plan=plans[-1], status='ACTIVE',
+                end_date=timezone.now() + timedelta(days=365)
+            )
+            for restaurant in restaurants
+        ])
+        self.counts['restaurants'] = len(restaurants)
+        return restaurants
+
+    def create_menu(self, restaurant):
+        categories = Category.objects.bulk_create([
+            Category(restaurant=restaurant, name=name, sort_order=position)
+            for position, (name, _) in enumerate(CATEGORIES)
+        ])
+        items = []
+        for index in range(self.menu_items_per_restaurant):
+            category = categories[index % len(categories)]
+            low, high = CATEGORIES[index % len(categories)][1]
+            items.append(MenuItem(
+                restaurant=restaurant, category=category,
+                name=f'{category.name} {index // len(categories) + 1}',
+                description='Generated menu item for load testing',
+                price=Decimal(self.rng.randint(low * 4, high * 4)) / 4,
+                tags=self.rng.sample(('veg', 'spicy', 'gluten-free', 'vegan', 'chef-special'), self.rng.randint(0, 2)),
+            ))
+        items = MenuItem.objects.bulk_create(items)
+        self.counts['menu_items'] += len(items)
+        # Popularity follows a long tail, like real menus
+        weights = [1 / (rank + 1) for rank in range(len(items))]
+        self.rng.shuffle(weights)
+        return items, weights
+
+    def create_tables(self, restaurant):
+        tables = Table.objects.bulk_create([
+            Table(restaurant=restaurant, name=f'T{number}', token=str(self.uuid()), capacity=self.rng.choice((2, 4, 4, 6)))
+            for number in range(1, self.tables_per_restaurant + 1)
+        ])
+        self.counts['tables'] += len(tables)
+        return tables
+
+    def create_history(self, restaurants, menus, tables):
+        now = self.now or timezone.now()
+        today = timezone.localdate(now)
+        tz = timezone.get_current_timezone()
+        # Restaurant sizes vary a lot; the mean stays at orders_per_day
+        scales = [self.rng.lognormvariate(0, 0.5) for _ in restaurants]
+        mean_scale = sum(scales) / len(scales)
+
+        pending = []
+        for day_offset in range(self.days - 1, -1, -1):
+            day = today - timedelta(days=day_offset)
+            day_start = timezone.make_aware(datetime.combine(day, time.min), tz)
+            weekday_factor = WEEKDAY_WEIGHTS[day.weekday()]
+
+            for restaurant, scale in zip(restaurants, scales):
+                expected = self.orders_per_day * weekday_factor * scale / mean_scale
+                count = max(0, round(self.rng.gauss(expected, expected ** 0.5)))
+                hours = self.rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+                for hour in hours:
+                    created_at = day_start + timedelta(seconds=hour * 3600 + self.rng.randrange(3600))
+                    if created_at > now:
+                        continue
+                    pending.append(self.build_order(restaurant, menus[restaurant.pk], tables[restaurant.pk], created_at, now))
+                    if len(pending) >= self.batch_size:
+                        self.flush(pending)
+                        pending = []
+        if pending:
+            self.flush(pending)
+
+    def build_order(self, restaurant, menu, tables, created_at, now):
+        """Order plus its unsaved items and payment"""
+        items, weights = menu
+        age = now - created_at
+        if age > timedelta(hours=2):
+            order_status = self.rng.choices(*zip(*PAST_STATUS_WEIGHTS))[0]
+        else:
+            order_status = self.rng.choices(*zip(*OPEN_STATUS_WEIGHTS))[0]
+
+        line_count = self.rng.choices(range(1, 6), weights=ITEMS_PER_ORDER_WEIGHTS)[0]
+        lines = [
+            (menu_item, self.rng.choices((1, 2, 3), weights=(75, 20, 5))[0])
+            for menu_item in dict.fromkeys(self.rng.choices(items, weights=weights, k=line_count))
+        ]
+        total = sum((menu_item.price * quantity for menu_item, quantity in lines), Decimal('0'))
+
+        roll = self.rng.random()
+        if order_status == 'CANCELLED':
+            payment_status, payment = 'PENDING', None
+        elif order_status == 'SERVED' and roll < 0.9:
+            payment_status = 'PAID'
+            payment = 'REFUNDED' if roll < 0.01 else 'COMPLETED'
+        elif roll < 0.95:
+            payment_status, payment = 'PENDING', 'PENDING' if roll < 0.5 else None
+        else:
+            payment_status, payment = 'FAILED', 'FAILED'
+
+        updated_at = min(created_at + timedelta(minutes=self.rng.randint(5, 60)), now)
+        order = Order(
+            restaurant_id=restaurant.pk, table_id=self.rng.choice(tables).pk, public_token=str(self.uuid()),
+            status=order_status, payment_status=payment_status, total_amount=total,
+            estimated_time_minutes=self.rng.choice((10, 15, 20, 25, 30)),
+            customer_note=self.rng.choice(NOTES), created_at=created_at, updated_at=updated_at,
+        )
+        return order, lines, payment
+
+    def flush(self, pending):
+        """Write one batch of orders with their items and payments"""
+        with transaction.atomic():
+            orders = Order.objects.bulk_create([order for order, _, _ in pending])
+            items, payments = [], []
+            for order, (_, lines, payment_status) in zip(orders, pending):
+                for menu_item, quantity in lines:
+                    # *_id assignments skip the related-object descriptors, which add up at this volume
+                    items.append(OrderItem(
+                        order_id=order.pk, menu_item_id=menu_item.pk, quantity=quantity,
+                        price_at_time=menu_item.price, created_at=order.created_at,
+                    ))
+                if payment_status:
+                    refunded = payment_status == 'REFUNDED'
+                    payments.append(Payment(
+                        order_id=order.pk, restaurant_id=order.restaurant_id, status=payment_status,
+                        amount=order.total_amount,
+                        payment_method=self.rng.choices(*zip(*PAYMENT_METHOD_WEIGHTS))[0],
+                        gateway_reference=f'pi_load_{order.public_token[:24]}' if payment_status != 'PENDING' else '',
+                        refund_amount=order.total_amount if refunded else Decimal('0'),
+                        refunded_at=order.updated_at if refunded else None,
+                        created_at=order.created_at, updated_at=order.updated_at,
+                    ))
+            OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+            Payment.objects.bulk_create(payments, batch_size=self.batch_size)
+
+        self.counts['orders'] += len(orders)
+        self.counts['items'] += len(items)
+        self.counts['payments'] += len(payments)
+        self.log(f"{self.counts['orders']} orders written")
@@ -0,0 +1,54 @@
+"""
+Generate a production-scale synthetic dataset for load testing and benchmarks
+"""
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollup_service import RollupService
+from restaurants.load_data import LoadDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Create restaurants, menus and an order/payment history (deterministic from --seed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--tables', type=int, default=20, help='Tables per restaurant')
+        parser.add_argument('--menu-items', type=int, default=40, help='Menu items per restaurant')
+        parser.add_argument('--days', type=int, default=90, help='Days of order history, ending today')
+        parser.add_argument('--orders-per-day', type=int, default=120, help='Mean orders per restaurant per day')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Orders per bulk insert batch')
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild analytics rollups')
+
+    def handle(self, *args, **options):
+        generator = LoadDataGenerator(
+            seed=options['seed'],
+            restaurants=options['restaurants'],
+            tables=options['tables'],
+            menu_items=options['menu_items'],
+            days=options['days'],
+            orders_per_day=options['orders_per_day'],
+            batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(message),
+        )
+        if generator.already_generated():
+            raise CommandError(f"Data for seed {options['seed']} already exists; use another --seed or a fresh database")
+
+        call_command('seed_data', stdout=self.stdout)  # Plans
+        started = time.monotonic()
+        try:
+            counts = generator.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not options['skip_rollups']:
+            self.stdout.write('Rebuilding analytics rollups...')
+            RollupService.rebuild(restaurant_ids=counts['restaurant_ids'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['restaurants']} restaurants, {counts['orders']} orders, "
+            f"{counts['items']} order items and {counts['payments']} payments "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,37 @@
+"""
+Pre-render table QR codes into the asset store
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from restaurants.models import Table
+from restaurants.qr_service import QRCodeService
+
+
+class Command(BaseCommand):
+    help = 'Render missing table QR images in parallel (e.g. after a domain change or deploy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant', type=int, action='append', dest='restaurants',
+            help='Restaurant id to render (repeatable; default: all)'
+        )
+        parser.add_argument('--force', action='store_true', help='Re-render images that already exist')
+        parser.add_argument('--workers', type=int, help='Render processes (default: QR_RENDER_WORKERS)')
+
+    def handle(self, *args, **options):
+        tables = Table.objects.select_related('restaurant').only('token', 'restaurant__public_id')
+        if options['restaurants']:
+            tables = tables.filter(restaurant_id__in=options['restaurants'])
+
+        pairs = [(table.restaurant.public_id, table.token) for table in tables.iterator()]
+        if options['force']:
+            for public_id, token in pairs:
+                digest = QRCodeService.content_hash(public_id, token)
+                default_storage.delete(QRCodeService.storage_path(token, digest))
+
+        rendered = QRCodeService.render_many(pairs, workers=options['workers'])
+        if rendered:
+            self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} QR images'))
+        else:
+            self.stdout.write('All QR images are up to date')
@@ -0,0 +1,24 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from restaurants.tenant import TenantContext
+
+
+class TenantMiddleware:
+    """
+    Attach `request.tenant` so views resolve the restaurant at most once
+
+    DRF authenticates inside the view and sets the user on the underlying
+    request, so the restaurant is looked up on first access, not here.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.tenant = TenantContext(request)
+        return self.get_response(request)
@@ -175,6 +175,7 @@ class StaffMember(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['restaurant', 'status']),
+            models.Index(fields=['restaurant', '-created_at', '-id']),  # keyset pagination
             models.Index(fields=['invitation_token']),
         ]
 
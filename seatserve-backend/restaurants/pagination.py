@@ -0,0 +1,40 @@
+"""
+Keyset (cursor) pagination for growing, time-ordered listings
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Newest-first pages keyed on (created_at, id)
+
+    Pages seek from the last row seen instead of using OFFSET, and no
+    COUNT(*) is issued unless the client asks for one with ?count=true, so
+    page latency does not depend on how far back a user scrolls. Cursors are
+    opaque; clients follow the `next` and `previous` links.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        body = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            body['count'] = self.count
+        body['results'] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
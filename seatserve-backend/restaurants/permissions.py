@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission
+from restaurants.tenant import current_restaurant
 
 
 class IsRestaurantOwner(BasePermission):
@@ -12,7 +13,7 @@ class IsRestaurantUser(BasePermission):
     """Permission to check if user has a restaurant"""
     
     def has_permission(self, request, view):
-        return hasattr(request.user, 'restaurant')
+        return current_restaurant(request) is not None
 
 
 class IsRestaurantTableOwner(BasePermission):
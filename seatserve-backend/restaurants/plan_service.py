@@ -2,15 +2,62 @@
 Plan enforcement service
 Validates restaurant operations against their subscription plan limits
 """
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef
 from django.utils.timezone import now
+from config.db_router import routing
+from restaurants.async_cache import async_cache
 from restaurants.models import Restaurant, RestaurantSubscription
+from restaurants.stats_service import count_subquery
 from menu.models import MenuItem
 from restaurants.models import Table
 
 
+def _cache_key(restaurant_id):
+    return f'entitlements:{restaurant_id}'
+
+
+class Entitlements:
+    """Plan limits, features, expiry and usage of one restaurant (cacheable)"""
+
+    def __init__(self, restaurant_id, subscription=None, tables_used=0, menu_items_used=0):
+        self.restaurant_id = restaurant_id
+        self.tables_used = tables_used
+        self.menu_items_used = menu_items_used
+        self.subscription_id = subscription.id if subscription else None
+        self.status = subscription.status if subscription else None
+        self.end_date = subscription.end_date if subscription else None
+        plan = subscription.plan if subscription else None
+        self.plan = {
+            'id': plan.id,
+            'name': plan.name,
+            'price': float(plan.price),
+            'billing_period': plan.billing_period,
+            'features': plan.features,
+        } if plan else None
+        self.max_tables = plan.max_tables if plan else 0
+        self.max_menu_items = plan.max_menu_items if plan else 0
+        self.features = (plan.features or {}) if plan else {}
+
+    @property
+    def is_active(self):
+        """Subscription still valid, checked against the cached expiry"""
+        return self.subscription_id is not None and self.end_date >= now()
+
+    @property
+    def remaining_tables(self):
+        return max(0, self.max_tables - self.tables_used) if self.is_active else 0
+
+    @property
+    def remaining_menu_items(self):
+        return max(0, self.max_menu_items - self.menu_items_used) if self.is_active else 0
+
+
 class PlanEnforcementService:
     """Service for checking and enforcing plan limits"""
-    
+
     @staticmethod
     def get_active_subscription(restaurant):
         """Get active subscription for restaurant"""
@@ -18,80 +65,99 @@ class PlanEnforcementService:
             status='ACTIVE',
             end_date__gte=now()
         ).select_related('plan').first()
-    
+
+    @staticmethod
+    def build_entitlements(restaurant):
+        """Load subscription, plan and usage counts (two queries, from the primary as they get cached)"""
+        with routing(False):
+            subscription = PlanEnforcementService.get_active_subscription(restaurant)
+            usage = Restaurant.objects.filter(pk=restaurant.pk).annotate(
+                tables_used=count_subquery(Table.objects.filter(restaurant=OuterRef('pk'))),
+                menu_items_used=count_subquery(MenuItem.objects.filter(restaurant=OuterRef('pk'))),
+            ).values('tables_used', 'menu_items_used').first() or {}
+        return Entitlements(restaurant.pk, subscription, **usage)
+
+    @staticmethod
+    def get_entitlements(restaurant):
+        """
+        Get the restaurant's cached entitlements
+
+        A cached subscription that has since expired is reloaded once, in
+        case a later subscription has taken over.
+        """
+        key = _cache_key(restaurant.pk)
+        entitlements = cache.get(key)
+        if entitlements is None or (entitlements.subscription_id and not entitlements.is_active):
+            entitlements = PlanEnforcementService.build_entitlements(restaurant)
+            cache.set(key, entitlements, getattr(settings, 'ENTITLEMENTS_CACHE_TTL', 300))
+        return entitlements
+
+    @staticmethod
+    async def aget_entitlements(restaurant):
+        """get_entitlements() for async views; only a reload runs in a thread"""
+        key = _cache_key(restaurant.pk)
+        entitlements = await async_cache.get(key)
+        if entitlements is None or (entitlements.subscription_id and not entitlements.is_active):
+            entitlements = await sync_to_async(PlanEnforcementService.build_entitlements)(restaurant)
+            await async_cache.set(key, entitlements, getattr(settings, 'ENTITLEMENTS_CACHE_TTL', 300))
+        return entitlements
+
+    @staticmethod
+    def invalidate(*restaurant_ids):
+        cache.delete_many([_cache_key(restaurant_id) for restaurant_id in restaurant_ids])
+
     @staticmethod
     def get_remaining_tables(restaurant):
         """Get remaining table quota for restaurant"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        if not subscription:
-            return 0
-        
-        plan = subscription.plan
-        current_tables = restaurant.tables.count()
-        return max(0, plan.max_tables - current_tables)
-    
+        return PlanEnforcementService.get_entitlements(restaurant).remaining_tables
+
     @staticmethod
     def get_remaining_menu_items(restaurant):
         """Get remaining menu item quota for restaurant"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        if not subscription:
-            return 0
-        
-        plan = subscription.plan
-        current_items = restaurant.menu_items.count()
-        return max(0, plan.max_menu_items - current_items)
-    
+        return PlanEnforcementService.get_entitlements(restaurant).remaining_menu_items
+
     @staticmethod
     def can_add_table(restaurant):
         """Check if restaurant can add a new table"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        
-        if not subscription:
+        entitlements = PlanEnforcementService.get_entitlements(restaurant)
+
+        if not entitlements.is_active:
             raise ValueError("No active subscription")
-        
-        plan = subscription.plan
-        current_tables = restaurant.tables.count()
-        
-        if current_tables >= plan.max_tables:
-            return False, f"Plan limit reached: {plan.max_tables} tables allowed"
-        
+
+        if entitlements.tables_used >= entitlements.max_tables:
+            return False, f"Plan limit reached: {entitlements.max_tables} tables allowed"
+
         return True, None
-    
+
     @staticmethod
     def can_add_menu_item(restaurant):
         """Check if restaurant can add a new menu item"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        
-        if not subscription:
+        entitlements = PlanEnforcementService.get_entitlements(restaurant)
+
+        if not entitlements.is_active:
             raise ValueError("No active subscription")
-        
-        plan = subscription.plan
-        current_items = restaurant.menu_items.count()
-        
-        if current_items >= plan.max_menu_items:
-            return False, f"Plan limit reached: {plan.max_menu_items} menu items allowed"
-        
+
+        if entitlements.menu_items_used >= entitlements.max_menu_items:
+            return False, f"Plan limit reached: {entitlements.max_menu_items} menu items allowed"
+
         return True, None
-    
+
     @staticmethod
     def has_feature(restaurant, feature_name):
         """Check if restaurant's plan has a specific feature"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        
-        if not subscription:
+        entitlements = PlanEnforcementService.get_entitlements(restaurant)
+
+        if not entitlements.is_active:
             return False
-        
-        plan = subscription.plan
-        features = plan.features or {}
-        
-        return features.get(feature_name, False)
-    
+
+        return entitlements.features.get(feature_name, False)
+
     @staticmethod
     def get_plan_info(restaurant):
         """Get detailed plan information"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        
-        if not subscription:
+        entitlements = PlanEnforcementService.get_entitlements(restaurant)
+
+        if not entitlements.is_active:
             return {
                 'status': 'no_subscription',
                 'plan': None,
@@ -102,33 +168,30 @@ class PlanEnforcementService:
                 'menu_items_available': 0,
                 'features': {}
             }
-        
-        plan = subscription.plan
-        tables_used = restaurant.tables.count()
-        menu_items_used = restaurant.menu_items.count()
-        
+
+        tables_used = entitlements.tables_used
+        menu_items_used = entitlements.menu_items_used
+
         return {
-            'status': subscription.status,
-            'plan': {
-                'id': plan.id,
-                'name': plan.name,
-                'price': float(plan.price),
-                'billing_period': plan.billing_period,
-                'features': plan.features,
-            },
-            'end_date': subscription.end_date.isoformat(),
+            'status': entitlements.status,
+            'plan': entitlements.plan,
+            'end_date': entitlements.end_date.isoformat(),
             'tables_used': tables_used,
-            'tables_available': plan.max_tables,
+            'tables_available': entitlements.max_tables,
             'menu_items_used': menu_items_used,
-            'menu_items_available': plan.max_menu_items,
+            'menu_items_available': entitlements.max_menu_items,
             'usage_percent': {
-                'tables': round((tables_used / plan.max_tables) * 100, 1),
-                'menu_items': round((menu_items_used / plan.max_menu_items) * 100, 1),
+                'tables': round((tables_used / entitlements.max_tables) * 100, 1),
+                'menu_items': round((menu_items_used / entitlements.max_menu_items) * 100, 1),
             }
         }
-    
+
     @staticmethod
     def is_subscription_active(restaurant):
         """Check if restaurant has an active subscription"""
-        subscription = PlanEnforcementService.get_active_subscription(restaurant)
-        return subscription is not None
+        return PlanEnforcementService.get_entitlements(restaurant).is_active
+
+    @staticmethod
+    async def ais_subscription_active(restaurant):
+        """is_subscription_active() for async views"""
+        return (await PlanEnforcementService.aget_entitlements(restaurant)).is_active
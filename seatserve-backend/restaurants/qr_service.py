@@ -0,0 +1,223 @@
+"""
+Table QR code asset store
+QR images are rendered once per content hash, written to default storage and
+served from immutable, long-cached URLs instead of being inlined into responses
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import qrcode
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendering changes so every image gets a new URL
+RENDER_VERSION = 1
+
+
+def render_png(url):
+    """Render a QR code PNG for `url` (module-level so process pools can pickle it)"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color='black', back_color='white')
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRCodeService:
+    """Content-addressed QR images for tables"""
+
+    @staticmethod
+    def order_url(restaurant_public_id, table_token):
+        """Guest ordering URL encoded in a table's QR code"""
+        return f'{settings.QR_ORDER_BASE_URL.rstrip("/")}/order/{restaurant_public_id}/{table_token}'
+
+    @staticmethod
+    def content_hash(restaurant_public_id, table_token):
+        url = QRCodeService.order_url(restaurant_public_id, table_token)
+        return hashlib.sha256(f'{RENDER_VERSION}|{url}'.encode()).hexdigest()[:20]
+
+    @staticmethod
+    def storage_path(table_token, digest):
+        return f'qr/{table_token}/{digest}.png'
+
+    @staticmethod
+    def image_path(table):
+        """Image URL path for a table (needs table.restaurant loaded)"""
+        digest = QRCodeService.content_hash(table.restaurant.public_id, table.token)
+        return reverse('table-qr-image', kwargs={'token': table.token, 'digest': digest})
+
+    @staticmethod
+    def ensure_image(restaurant_public_id, table_token, png=None):
+        """
+        Write the table's image to storage unless it is already there
+
+        Returns:
+            str: Storage path of the image
+        """
+        digest = QRCodeService.content_hash(restaurant_public_id, table_token)
+        path = QRCodeService.storage_path(table_token, digest)
+        if not default_storage.exists(path):
+            if png is None:
+                png = render_png(QRCodeService.order_url(restaurant_public_id, table_token))
+            default_storage.save(path, ContentFile(png))
+        return path
+
+    @staticmethod
+    def is_stored(restaurant_public_id, table_token):
+        digest = QRCodeService.content_hash(restaurant_public_id, table_token)
+        return default_storage.exists(QRCodeService.storage_path(table_token, digest))
+
+    @staticmethod
+    def render_many(tables, workers=None, progress=None):
+        """
+        Render and store images for (restaurant_public_id, table_token) pairs
+
+        Rendering is CPU-bound, so it is spread over worker processes; the
+        storage writes stay in the calling process. Images already in storage
+        are skipped.
+
+        Returns:
+            int: Number of images rendered
+        """
+        pending = [pair for pair in tables if not QRCodeService.is_stored(*pair)]
+        if not pending:
+            return 0
+
+        urls = [QRCodeService.order_url(*pair) for pair in pending]
+        workers = max(1, min(workers or settings.QR_RENDER_WORKERS, len(pending)))
+        executor = None
+        if workers == 1:
+            images = map(render_png, urls)
+        else:
+            # Spawned (not forked) workers are safe to start from a threaded server
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            images = executor.map(render_png, urls, chunksize=16)
+
+        try:
+            for done, (pair, png) in enumerate(zip(pending, images), start=1):
+                QRCodeService.ensure_image(*pair, png=png)
+                if progress:
+                    progress(done)
+        finally:
+            if executor:
+                executor.shutdown()
+        return len(pending)
+
+
+def _job_key(job_id):
+    return f'qr-job:{job_id}'
+
+
+def _tables_key(job_id):
+    return f'qr-job:{job_id}:tables'
+
+
+class QRRenderJobService:
+    """
+    Background QR rendering for large table batches
+
+    Job state lives in the cache so any web worker can answer status polls.
+    Jobs run on a thread of the process that started them and only touch
+    storage, never the database. Running jobs save a heartbeat with their
+    progress; when the process dies mid-job (restart, deploy, timeout), the
+    next status poll finds the heartbeat stale and runs the job again in the
+    polling process, skipping images that were already stored.
+    """
+
+    @staticmethod
+    def get(job_id):
+        return cache.get(_job_key(job_id))
+
+    @staticmethod
+    def _save(job):
+        job['heartbeat'] = time.time()
+        cache.set(_job_key(job['id']), job, settings.QR_JOB_TTL)
+
+    @staticmethod
+    def start(restaurant_id, tables):
+        """
+        Queue rendering for (restaurant_public_id, table_token) pairs
+
+        Returns:
+            dict: Initial job state (id, status, total, done)
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'restaurant_id': restaurant_id,
+            'status': 'PENDING',
+            'total': len(tables),
+            'done': 0,
+            'error': '',
+            'attempts': 1,
+        }
+        tables = list(tables)
+        cache.set(_tables_key(job['id']), tables, settings.QR_JOB_TTL)
+        QRRenderJobService._save(job)
+        QRRenderJobService._launch(job, tables)
+        return job
+
+    @staticmethod
+    def poll(job_id):
+        """Current job state, restarting the job if its process stopped running it"""
+        job = QRRenderJobService.get(job_id)
+        if job is None or job['status'] not in ('PENDING', 'RUNNING'):
+            return job
+        if time.time() - job['heartbeat'] < settings.QR_JOB_STALE_SECONDS:
+            return job
+        # Only one poller takes the job over
+        if not cache.add(f'{_job_key(job_id)}:retry', True, settings.QR_JOB_STALE_SECONDS):
+            return job
+
+        tables = cache.get(_tables_key(job_id))
+        if tables is None or job['attempts'] >= settings.QR_JOB_MAX_ATTEMPTS:
+            logger.warning(f"QR render job {job_id} stopped after {job['attempts']} attempts")
+            job['status'] = 'FAILED'
+            job['error'] = 'Rendering stopped before finishing'
+            QRRenderJobService._save(job)
+            return job
+
+        logger.warning(f'Restarting stale QR render job {job_id}')
+        job['status'] = 'PENDING'
+        job['attempts'] += 1
+        QRRenderJobService._save(job)
+        QRRenderJobService._launch(job, tables)
+        return job
+
+    @staticmethod
+    def _launch(job, tables):
+        thread = threading.Thread(target=QRRenderJobService._run, args=(dict(job), tables), daemon=True)
+        thread.start()
+
+    @staticmethod
+    def _run(job, tables):
+        job['status'] = 'RUNNING'
+        QRRenderJobService._save(job)
+
+        def progress(done):
+            # Report every few images rather than once per image
+            if done % 25 == 0:
+                job['done'] = done
+                QRRenderJobService._save(job)
+
+        try:
+            QRCodeService.render_many(tables, progress=progress)
+        except Exception as e:
+            logger.exception(f"QR render job {job['id']} failed")
+            job['status'] = 'FAILED'
+            job['error'] = str(e)
+        else:
+            job['status'] = 'COMPLETED'
+            job['done'] = job['total']
+        QRRenderJobService._save(job)
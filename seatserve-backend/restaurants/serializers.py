@@ -1,6 +1,10 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.utils.timezone import now, timedelta
 from restaurants.models import Plan, Restaurant, RestaurantSubscription, Table, StaffMember, StaffPermission
+from restaurants.eager_loading import EagerLoadingMixin
+from restaurants.qr_service import QRCodeService
+from restaurants.table_service import TableProvisioningService
 
 
 class PlanSerializer(serializers.ModelSerializer):
@@ -11,10 +15,14 @@ class PlanSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     owner_email = serializers.CharField(source='owner.email', read_only=True)
     active_subscription = serializers.SerializerMethodField()
 
+    select_related_fields = ('owner',)
+    expandable_fields = ('active_subscription',)
+    field_sources = {'active_subscription': ()}  # Its own query
+
     class Meta:
         model = Restaurant
         fields = ('id', 'public_id', 'name', 'description', 'address', 'city', 'country', 
@@ -43,10 +51,12 @@ class RestaurantCreateSerializer(serializers.Serializer):
         pass
 
 
-class RestaurantSubscriptionSerializer(serializers.ModelSerializer):
+class RestaurantSubscriptionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     plan_name = serializers.CharField(source='plan.name', read_only=True)
     plan_details = PlanSerializer(source='plan', read_only=True)
 
+    select_related_fields = ('plan',)
+
     class Meta:
         model = RestaurantSubscription
         fields = ('id', 'restaurant', 'plan', 'plan_name', 'plan_details', 'status', 
@@ -54,9 +64,12 @@ class RestaurantSubscriptionSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at')
 
 
-class TableSerializer(serializers.ModelSerializer):
+class TableSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     qr_code_url = serializers.SerializerMethodField()
 
+    select_related_fields = ('restaurant',)
+    field_sources = {'qr_code_url': ('token', 'restaurant__public_id')}
+
     class Meta:
         model = Table
         fields = ('id', 'restaurant', 'name', 'token', 'qr_code_url', 'capacity', 
@@ -64,11 +77,37 @@ class TableSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'restaurant', 'token', 'created_at', 'updated_at')
 
     def get_qr_code_url(self, obj):
-        if obj.qr_code_url:
-            return obj.qr_code_url
-        # Generate QR code URL if not already stored
-        # This would typically be generated and stored during creation
-        return None
+        """Link to the cached QR image (never the image itself)"""
+        path = QRCodeService.image_path(obj)
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
+
+
+class TableBulkCreateSerializer(serializers.Serializer):
+    """Either an explicit list of names or a prefix + count pattern (T1..T60)"""
+    names = serializers.ListField(child=serializers.CharField(max_length=100), required=False, allow_empty=False)
+    prefix = serializers.CharField(max_length=90, required=False)
+    start = serializers.IntegerField(min_value=0, default=1)
+    count = serializers.IntegerField(min_value=1, required=False)
+    capacity = serializers.IntegerField(min_value=1, default=4)
+
+    def validate(self, data):
+        if 'names' in data:
+            if 'prefix' in data or 'count' in data:
+                raise serializers.ValidationError('Provide either names or prefix and count, not both')
+            names = data['names']
+        elif 'prefix' in data and 'count' in data:
+            names = TableProvisioningService.expand_names(data['prefix'], data['count'], data['start'])
+        else:
+            raise serializers.ValidationError('Provide names, or prefix and count')
+
+        if len(names) > settings.TABLE_BULK_MAX:
+            raise serializers.ValidationError(f'At most {settings.TABLE_BULK_MAX} tables per request')
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError('Table names must be unique')
+
+        data['names'] = names
+        return data
 
 
 class StaffPermissionSerializer(serializers.ModelSerializer):
@@ -77,12 +116,21 @@ class StaffPermissionSerializer(serializers.ModelSerializer):
         fields = ('id', 'permission_name', 'allowed')
 
 
-class StaffMemberSerializer(serializers.ModelSerializer):
+class StaffMemberSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user_email = serializers.CharField(source='user.email', read_only=True)
     permissions = StaffPermissionSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     role_display = serializers.CharField(source='get_role_display', read_only=True)
 
+    select_related_fields = ('user',)
+    prefetch_related_fields = {'permissions': None}
+    field_sources = {
+        'status_display': ('status',),
+        'role_display': ('role',),
+        'is_invited': ('invitation_token', 'invitation_accepted_at'),
+        'is_active_user': ('status', 'user'),
+    }
+
     class Meta:
         model = StaffMember
         fields = (
@@ -0,0 +1,43 @@
+"""
+Restaurant signal handlers
+Keep the tenant and entitlement caches in sync with model changes
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from menu.models import MenuItem
+from restaurants.models import Plan, Restaurant, RestaurantSubscription, Table
+from restaurants.plan_service import PlanEnforcementService
+from restaurants.tenant import invalidate_user
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    owner_id = instance.owner_id
+    invalidate_user(owner_id)  # Also now, so this request's later lookups miss
+    transaction.on_commit(lambda: invalidate_user(owner_id))
+
+
+@receiver([post_save, post_delete], sender=RestaurantSubscription)
+def invalidate_entitlements_for_subscription(sender, instance, **kwargs):
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: PlanEnforcementService.invalidate(restaurant_id))
+
+
+@receiver(post_save, sender=Plan)
+def invalidate_entitlements_for_plan(sender, instance, **kwargs):
+    restaurant_ids = list(
+        RestaurantSubscription.objects.filter(plan=instance).values_list('restaurant_id', flat=True).distinct()
+    )
+    if restaurant_ids:
+        transaction.on_commit(lambda: PlanEnforcementService.invalidate(*restaurant_ids))
+
+
+@receiver([post_save, post_delete], sender=Table)
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_entitlements_for_usage(sender, instance, created=True, **kwargs):
+    """Usage counts only change when tables/menu items are added or removed"""
+    if created:
+        restaurant_id = instance.restaurant_id
+        transaction.on_commit(lambda: PlanEnforcementService.invalidate(restaurant_id))
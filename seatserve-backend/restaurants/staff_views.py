@@ -11,46 +11,46 @@ from django.conf import settings
 from django.utils import timezone
 import logging
 
-from restaurants.models import StaffMember, Restaurant, StaffPermission
+from restaurants.models import StaffMember, StaffPermission
 from restaurants.serializers import (
     StaffMemberSerializer, StaffMemberCreateSerializer, StaffMemberUpdateSerializer,
     StaffPermissionSerializer
 )
 from restaurants.permissions import IsRestaurantOwner
+from restaurants.stats_service import DashboardStatsService
+from restaurants.tenant import current_restaurant
+from restaurants.eager_loading import EagerLoadingViewSetMixin
+from restaurants.pagination import CreatedAtCursorPagination
 
 logger = logging.getLogger(__name__)
 
 
-class StaffMemberViewSet(viewsets.ModelViewSet):
+class StaffMemberViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     """Manage restaurant staff members"""
     serializer_class = StaffMemberSerializer
     permission_classes = (IsAuthenticated, IsRestaurantOwner)
+    pagination_class = CreatedAtCursorPagination
+    ordering = CreatedAtCursorPagination.ordering
+    ordering_fields = ('created_at',)  # Cursor pages need an indexed, stable order
 
     def get_queryset(self):
         """Get staff members for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if restaurant:
-            return StaffMember.objects.filter(restaurant=restaurant).order_by('-created_at')
+            return StaffMember.objects.filter(restaurant=restaurant)
         return StaffMember.objects.none()
 
     def list(self, request, *args, **kwargs):
-        """List all staff members"""
+        """List staff members a page at a time, with a summary of the whole team"""
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        
-        # Add summary
-        active_count = queryset.filter(status='ACTIVE').count()
-        inactive_count = queryset.filter(status='INACTIVE').count()
-        pending_invitations = queryset.filter(status='ACTIVE', invitation_accepted_at__isnull=True).count()
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
         
         return Response({
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
             'staff_members': serializer.data,
-            'summary': {
-                'total': queryset.count(),
-                'active': active_count,
-                'inactive': inactive_count,
-                'pending_invitations': pending_invitations,
-            }
+            'summary': DashboardStatsService.staff_summary(queryset),
         })
 
     def create(self, request, *args, **kwargs):
@@ -59,7 +59,7 @@ class StaffMemberViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
@@ -176,7 +176,7 @@ class StaffMemberViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_role(self, request):
         """Get staff members grouped by role"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
@@ -0,0 +1,137 @@
+"""
+Dashboard statistics service
+Computes each dashboard's numbers with a single conditional-aggregation
+query and caches the result for a few seconds per restaurant
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from menu.models import Category, MenuItem
+from orders.models import Order
+from restaurants.models import Restaurant, Table
+
+
+CENT = Decimal('0.01')
+
+
+def _day_bounds(day=None):
+    """Aware [start, end) datetimes for a day, so the created_at index stays usable"""
+    day = day or timezone.localdate()
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def count_subquery(queryset):
+    """Scalar COUNT(*) subquery correlated on restaurant"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values('restaurant').annotate(count=Count('pk')).values('count')
+        ),
+        0
+    )
+
+
+def _cached(key, compute):
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, getattr(settings, 'DASHBOARD_STATS_CACHE_TTL', 5))
+    return data
+
+
+class DashboardStatsService:
+    """One-query dashboard statistics"""
+
+    @staticmethod
+    def order_stats(restaurant, include_hourly=False):
+        """Today's order counts and revenue, optionally broken down by hour"""
+        start, end = _day_bounds()
+
+        def compute():
+            rows = Order.objects.filter(
+                restaurant=restaurant,
+                created_at__gte=start,
+                created_at__lt=end
+            ).annotate(
+                hour=TruncHour('created_at')
+            ).values('hour').annotate(
+                orders=Count('id'),
+                revenue=Sum('total_amount'),
+                paid=Count('id', filter=Q(payment_status='PAID')),
+                pending=Count('id', filter=Q(status__in=['RECEIVED', 'IN_KITCHEN'])),
+                served=Count('id', filter=Q(status='SERVED')),
+            ).order_by('hour')
+
+            by_hour = [
+                {
+                    'hour': row['hour'].isoformat(),
+                    'orders': row['orders'],
+                    'revenue': row['revenue'] or Decimal('0.00'),
+                    'paid_orders': row['paid'],
+                    'pending_orders': row['pending'],
+                    'served_orders': row['served'],
+                }
+                for row in rows
+            ]
+            return {
+                'total_orders_today': sum(row['orders'] for row in by_hour),
+                'total_revenue_today': sum((row['revenue'] for row in by_hour), Decimal('0')).quantize(CENT),
+                'paid_orders': sum(row['paid_orders'] for row in by_hour),
+                'pending_orders': sum(row['pending_orders'] for row in by_hour),
+                'served_orders': sum(row['served_orders'] for row in by_hour),
+                'by_hour': by_hour,
+            }
+
+        data = dict(_cached(f'stats:orders:{restaurant.id}:{start.date()}', compute))
+        if not include_hourly:
+            data.pop('by_hour')
+        return data
+
+    @staticmethod
+    def menu_stats(restaurant):
+        """Menu item and category counts"""
+        def compute():
+            counts = Restaurant.objects.filter(pk=restaurant.pk).annotate(
+                total_items=count_subquery(MenuItem.objects.filter(restaurant=OuterRef('pk'))),
+                available_items=count_subquery(
+                    MenuItem.objects.filter(restaurant=OuterRef('pk'), is_available=True)
+                ),
+                total_categories=count_subquery(Category.objects.filter(restaurant=OuterRef('pk'))),
+            ).values('total_items', 'available_items', 'total_categories').first()
+            return {
+                'total_items': counts['total_items'],
+                'available_items': counts['available_items'],
+                'unavailable_items': counts['total_items'] - counts['available_items'],
+                'total_categories': counts['total_categories'],
+            }
+
+        return _cached(f'stats:menu:{restaurant.id}', compute)
+
+    @staticmethod
+    def table_stats(restaurant):
+        """Table counts by active state"""
+        def compute():
+            return Table.objects.filter(restaurant=restaurant).aggregate(
+                total_tables=Count('id'),
+                active_tables=Count('id', filter=Q(is_active=True)),
+                inactive_tables=Count('id', filter=Q(is_active=False)),
+            )
+
+        return _cached(f'stats:tables:{restaurant.id}', compute)
+
+    @staticmethod
+    def staff_summary(queryset):
+        """Staff counts by status (not cached: shown next to the live staff list)"""
+        return queryset.order_by().aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='ACTIVE')),
+            inactive=Count('id', filter=Q(status='INACTIVE')),
+            pending_invitations=Count(
+                'id', filter=Q(status='ACTIVE', invitation_accepted_at__isnull=True)
+            ),
+        )
@@ -0,0 +1,85 @@
+"""
+Table provisioning service
+Creates many tables in one round trip with a single plan quota check
+"""
+import uuid
+from django.conf import settings
+from django.db import transaction
+
+from restaurants.models import Restaurant, Table
+from restaurants.plan_service import PlanEnforcementService
+from restaurants.qr_service import QRCodeService, QRRenderJobService
+
+
+class TableProvisioningService:
+    """Bulk table creation for onboarding"""
+
+    @staticmethod
+    def expand_names(prefix, count, start=1):
+        """Names from a pattern, e.g. ('T', 3) -> ['T1', 'T2', 'T3']"""
+        return [f'{prefix}{number}' for number in range(start, start + count)]
+
+    @staticmethod
+    def bulk_create(restaurant, names, capacity=4):
+        """
+        Create tables named `names`, all or nothing
+
+        The quota is checked once for the whole batch, against a fresh count
+        taken under a lock on the restaurant row so concurrent batches cannot
+        overshoot the plan. bulk_create skips Table.save() and signals, so
+        tokens are generated here and entitlements are invalidated explicitly.
+
+        Returns:
+            list: Created Table instances
+
+        Raises:
+            ValueError: If there's no active subscription, the batch exceeds the
+                plan limit or a name is already taken
+        """
+        entitlements = PlanEnforcementService.get_entitlements(restaurant)
+        if not entitlements.is_active:
+            raise ValueError("No active subscription")
+
+        with transaction.atomic():
+            list(Restaurant.objects.select_for_update().filter(pk=restaurant.pk).values_list('pk', flat=True))
+            existing = set(Table.objects.filter(restaurant=restaurant).values_list('name', flat=True))
+
+            if len(existing) + len(names) > entitlements.max_tables:
+                raise ValueError(
+                    f"Plan limit reached: {entitlements.max_tables} tables allowed, "
+                    f"{max(entitlements.max_tables - len(existing), 0)} remaining"
+                )
+
+            taken = sorted(existing.intersection(names))
+            if taken:
+                raise ValueError(f"Table names already in use: {', '.join(taken)}")
+
+            tables = Table.objects.bulk_create([
+                Table(restaurant=restaurant, name=name, token=str(uuid.uuid4()), capacity=capacity)
+                for name in names
+            ])
+            if any(table.pk is None for table in tables):
+                # Backends that can't return ids from bulk inserts
+                tables = list(Table.objects.filter(token__in=[table.token for table in tables]))
+
+            restaurant_id = restaurant.pk
+            transaction.on_commit(lambda: PlanEnforcementService.invalidate(restaurant_id))
+
+        return tables
+
+    @staticmethod
+    def render_qr_codes(restaurant, tables):
+        """
+        Render QR images for new tables
+
+        Small batches render inline; larger ones go to a background job over a
+        process pool.
+
+        Returns:
+            dict: Job state, or None if the images were rendered inline
+        """
+        pairs = [(restaurant.public_id, table.token) for table in tables]
+        if len(pairs) <= settings.TABLE_BULK_SYNC_QR_MAX:
+            QRCodeService.render_many(pairs, workers=1)
+            return None
+        return QRRenderJobService.start(restaurant.pk, pairs)
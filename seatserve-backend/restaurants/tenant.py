@@ -0,0 +1,68 @@
+"""
+Tenant resolution
+Resolves the current user's restaurant once per request, backed by a
+short-lived cache keyed by user id
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from config.db_router import routing
+from restaurants.models import Restaurant
+
+
+NO_RESTAURANT = 'none'  # Cached marker for users without a restaurant
+
+
+def _cache_key(user_id):
+    return f'tenant:restaurant:{user_id}'
+
+
+def get_restaurant_for_user(user):
+    """
+    Get the restaurant owned by `user`
+
+    Returns:
+        Restaurant or None: None for anonymous users and users without one
+    """
+    if user is None or not user.is_authenticated:
+        return None
+
+    key = _cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return None if cached == NO_RESTAURANT else cached
+
+    with routing(False):  # Cached until invalidated, so not from a lagging replica
+        restaurant = Restaurant.objects.filter(owner_id=user.pk).first()
+    cache.set(key, restaurant or NO_RESTAURANT, getattr(settings, 'TENANT_CACHE_TTL', 60))
+    return restaurant
+
+
+def invalidate_user(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+class TenantContext:
+    """Per-request tenant; resolved lazily so DRF authentication runs first"""
+
+    def __init__(self, request):
+        self._request = request
+
+    @cached_property
+    def restaurant(self):
+        return get_restaurant_for_user(getattr(self._request, 'user', None))
+
+
+def current_restaurant(request):
+    """
+    The restaurant of the user making `request` (DRF or Django request)
+
+    Uses the context attached by TenantMiddleware, attaching one if the
+    middleware did not run (e.g. requests built by RequestFactory).
+    """
+    request = getattr(request, '_request', request)
+    tenant = getattr(request, 'tenant', None)
+    if tenant is None:
+        tenant = request.tenant = TenantContext(request)
+    return tenant.restaurant
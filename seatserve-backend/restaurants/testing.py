@@ -0,0 +1,30 @@
+"""
+Test helpers shared across apps
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting an endpoint's query count stays fixed"""
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        """Run func and fail if it issues more than `budget` queries"""
+        with CaptureQueriesContext(connection) as context:
+            result = func(*args, **kwargs)
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries executed, budget is {budget}\n{queries}')
+        return result
+
+    def assertConstantQueries(self, budget, func, grow, *args, **kwargs):
+        """
+        Check func stays within `budget` queries before and after `grow()`
+        adds rows, i.e. its query count does not scale with page size
+        """
+        self.assertQueryBudget(budget, func, *args, **kwargs)
+        grow()
+        return self.assertQueryBudget(budget, func, *args, **kwargs)
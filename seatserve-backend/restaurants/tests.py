@@ -0,0 +1,260 @@
+"""
+Tests for restaurants app
+"""
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from orders.tests import create_restaurant_fixture
+from orders.models import Order, OrderItem
+from restaurants.load_data import LoadDataGenerator
+from restaurants.models import Restaurant, Table
+from restaurants.plan_service import PlanEnforcementService
+from restaurants.qr_service import QRCodeService, QRRenderJobService
+from restaurants.tenant import get_restaurant_for_user
+
+
+class TenantResolutionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+
+    def test_restaurant_resolved_once_per_request(self):
+        # Permission check, get_queryset and the action share one lookup
+        with self.assertNumQueries(2):  # restaurant + orders
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):  # orders only
+            self.client.get('/api/orders/')
+
+    def test_restaurant_save_invalidates(self):
+        get_restaurant_for_user(self.fixture['owner'])
+        restaurant = self.fixture['restaurant']
+        restaurant.name = 'Renamed Bistro'
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.save()
+
+        response = self.client.get('/api/restaurants/me/me/')
+        self.assertEqual(response.data['name'], 'Renamed Bistro')
+
+    def test_user_without_restaurant(self):
+        user = User.objects.create_user(email='guest@example.com', password='testpass123', role='RESTAURANT')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/orders/').status_code, 403)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/orders/').status_code, 403)
+
+
+class EntitlementsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = create_restaurant_fixture()
+        self.restaurant = self.fixture['restaurant']
+
+    def test_checks_served_from_cache(self):
+        with self.assertNumQueries(2):  # subscription + usage counts
+            self.assertEqual(PlanEnforcementService.get_remaining_tables(self.restaurant), 19)
+        with self.assertNumQueries(0):
+            self.assertEqual(PlanEnforcementService.can_add_table(self.restaurant), (True, None))
+            self.assertEqual(PlanEnforcementService.get_remaining_menu_items(self.restaurant), 197)
+            self.assertTrue(PlanEnforcementService.is_subscription_active(self.restaurant))
+            self.assertEqual(PlanEnforcementService.get_plan_info(self.restaurant)['tables_used'], 1)
+
+    def test_usage_change_invalidates(self):
+        PlanEnforcementService.get_entitlements(self.restaurant)
+        with self.captureOnCommitCallbacks(execute=True):
+            Table.objects.create(restaurant=self.restaurant, name='T2')
+        self.assertEqual(PlanEnforcementService.get_remaining_tables(self.restaurant), 18)
+
+    def test_subscription_change_invalidates(self):
+        PlanEnforcementService.get_entitlements(self.restaurant)
+        subscription = self.restaurant.subscriptions.get()
+        subscription.status = 'CANCELLED'
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.save()
+        self.assertFalse(PlanEnforcementService.is_subscription_active(self.restaurant))
+        with self.assertRaises(ValueError):
+            PlanEnforcementService.can_add_table(self.restaurant)
+
+    def test_expiry_checked_in_memory(self):
+        entitlements = PlanEnforcementService.get_entitlements(self.restaurant)
+        self.assertTrue(entitlements.is_active)
+        entitlements.end_date = now() - timedelta(seconds=1)
+        self.assertFalse(entitlements.is_active)
+        self.assertEqual(entitlements.remaining_tables, 0)
+
+
+class QRCodeAssetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.fixture = create_restaurant_fixture()
+        self.table = self.fixture['table']
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+
+    def stored_path(self):
+        digest = QRCodeService.content_hash(self.fixture['restaurant'].public_id, self.table.token)
+        return QRCodeService.storage_path(self.table.token, digest)
+
+    def test_table_list_links_to_image(self):
+        response = self.client.get('/api/restaurants/tables/')
+        url = response.data['results'][0]['qr_code_url']
+        self.assertTrue(url.startswith('http://testserver/qr/'))
+        self.assertFalse(default_storage.exists(self.stored_path()))  # Rendered lazily
+
+    def test_image_served_immutable(self):
+        path = QRCodeService.image_path(self.table)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+        self.assertTrue(default_storage.exists(self.stored_path()))
+
+        stale = path.replace(path.rsplit('/', 1)[1], 'stale.png')
+        self.assertEqual(self.client.get(stale).status_code, 404)
+
+    def test_regenerate_command(self):
+        call_command('regenerate_qr_codes', workers=1, stdout=StringIO())
+        self.assertTrue(default_storage.exists(self.stored_path()))
+
+    def test_render_many_over_process_pool(self):
+        restaurant = self.fixture['restaurant']
+        tables = [self.table, Table.objects.create(restaurant=restaurant, name='T2')]
+        pairs = [(restaurant.public_id, table.token) for table in tables]
+        self.assertEqual(QRCodeService.render_many(pairs, workers=2), 2)
+        for pair in pairs:
+            self.assertTrue(QRCodeService.is_stored(*pair))
+        self.assertEqual(QRCodeService.render_many(pairs, workers=2), 0)  # Already stored
+
+
+class BulkTableCreateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, QR_RENDER_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.fixture = create_restaurant_fixture()
+        self.restaurant = self.fixture['restaurant']
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fixture['owner'])
+
+    def test_pattern_creates_tables_and_renders_inline(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/restaurants/tables/bulk/', {'prefix': 'B', 'count': 3}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertIsNone(response.data['qr_job'])
+
+        tables = Table.objects.filter(restaurant=self.restaurant, name__startswith='B')
+        self.assertEqual(sorted(tables.values_list('name', flat=True)), ['B1', 'B2', 'B3'])
+        self.assertEqual(len({table.token for table in tables}), 3)
+        for table in tables:
+            self.assertTrue(QRCodeService.is_stored(self.restaurant.public_id, table.token))
+        self.assertEqual(PlanEnforcementService.get_remaining_tables(self.restaurant), 16)
+
+    def test_quota_checked_for_whole_batch(self):
+        response = self.client.post('/api/restaurants/tables/bulk/', {'prefix': 'B', 'count': 20}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('19 remaining', response.data['detail'])
+        self.assertEqual(Table.objects.filter(restaurant=self.restaurant).count(), 1)
+
+    def test_rejects_existing_and_duplicate_names(self):
+        response = self.client.post('/api/restaurants/tables/bulk/', {'names': ['T1', 'T2']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('T1', response.data['detail'])
+        response = self.client.post('/api/restaurants/tables/bulk/', {'names': ['T2', 'T2']}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(TABLE_BULK_SYNC_QR_MAX=2)
+    def test_large_batch_returns_job(self):
+        response = self.client.post('/api/restaurants/tables/bulk/', {'names': ['A', 'B', 'C']}, format='json')
+        self.assertEqual(response.status_code, 201)
+        job = response.data['qr_job']
+        self.assertEqual(job['total'], 3)
+
+        for _ in range(200):
+            status = self.client.get(job['url']).data['status']
+            if status in ('COMPLETED', 'FAILED'):
+                break
+            time.sleep(0.05)
+        self.assertEqual(status, 'COMPLETED')
+        self.assertIsNotNone(QRRenderJobService.get(job['id']))
+
+        other = User.objects.create_user(email='other@example.com', password='testpass123', role='RESTAURANT')
+        self.client.force_authenticate(user=other)
+        self.assertNotEqual(self.client.get(job['url']).status_code, 200)
+
+    @override_settings(TABLE_BULK_SYNC_QR_MAX=2)
+    def test_stale_job_restarted_by_poll(self):
+        # The job never runs, as if its worker process died
+        with mock.patch.object(QRRenderJobService, '_launch'):
+            response = self.client.post('/api/restaurants/tables/bulk/', {'names': ['A', 'B', 'C']}, format='json')
+        job = response.data['qr_job']
+        self.assertEqual(self.client.get(job['url']).data['status'], 'PENDING')  # Not stale yet
+        with override_settings(QR_JOB_STALE_SECONDS=0):
+            self.client.get(job['url'])
+
+        for _ in range(200):
+            status = self.client.get(job['url']).data['status']
+            if status in ('COMPLETED', 'FAILED'):
+                break
+            time.sleep(0.05)
+        self.assertEqual(status, 'COMPLETED')
+        self.assertEqual(QRRenderJobService.get(job['id'])['attempts'], 2)
+
+
+class LoadDataTest(TestCase):
+    def test_generates_history(self):
+        call_command(
+            'generate_load_data', restaurants=2, tables=3, menu_items=6, days=3, orders_per_day=20,
+            seed=7, batch_size=25, stdout=StringIO()
+        )
+        restaurants = Restaurant.objects.filter(owner__email__startswith='load-7-')
+        self.assertEqual(restaurants.count(), 2)
+        self.assertEqual(Table.objects.filter(restaurant__in=restaurants).count(), 6)
+
+        orders = Order.objects.filter(restaurant__in=restaurants)
+        self.assertGreater(orders.count(), 40)
+        oldest = orders.order_by('created_at').first().created_at
+        self.assertLess(oldest.date(), now().date())  # Timestamps are historic, not insert time
+
+        order = orders.first()
+        line_total = OrderItem.objects.filter(order=order).aggregate(
+            total=Sum(F('price_at_time') * F('quantity'))
+        )['total']
+        self.assertEqual(line_total, order.total_amount)
+
+        with self.assertRaises(CommandError):
+            call_command('generate_load_data', restaurants=1, seed=7, stdout=StringIO())
+
+    def test_deterministic_from_seed(self):
+        def plan(seed):
+            generator = LoadDataGenerator(seed=seed)
+            return [generator.uuid() for _ in range(3)], generator.rng.random()
+
+        self.assertEqual(plan(3), plan(3))
+        self.assertNotEqual(plan(3), plan(4))
@@ -3,20 +3,26 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils.timezone import now, timedelta
 from django.db.models import Q
-import qrcode
-from io import BytesIO
-import base64
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
 import uuid
 
 from restaurants.models import Plan, Restaurant, RestaurantSubscription, Table
 from restaurants.serializers import (
     PlanSerializer, RestaurantSerializer, RestaurantCreateSerializer,
-    RestaurantSubscriptionSerializer, TableSerializer
+    RestaurantSubscriptionSerializer, TableSerializer, TableBulkCreateSerializer
 )
 from restaurants.permissions import IsRestaurantOwner, IsRestaurantUser, IsRestaurantTableOwner
 from restaurants.plan_service import PlanEnforcementService
+from restaurants.qr_service import QRCodeService, QRRenderJobService
+from restaurants.stats_service import DashboardStatsService
+from restaurants.table_service import TableProvisioningService
+from restaurants.tenant import current_restaurant
+from restaurants.eager_loading import EagerLoadingViewSetMixin
 
 
 class PlanViewSet(viewsets.ReadOnlyModelViewSet):
@@ -27,7 +33,7 @@ class PlanViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     """Restaurant management"""
     serializer_class = RestaurantSerializer
     permission_classes = (IsAuthenticated, IsRestaurantUser)
@@ -39,7 +45,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """Get current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if restaurant:
             return Response(RestaurantSerializer(restaurant).data)
         return Response(
@@ -51,7 +57,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     def create_restaurant(self, request):
         """Create a restaurant for current user"""
         # Check if user already has a restaurant
-        if Restaurant.objects.filter(owner=request.user).exists():
+        if current_restaurant(request) is not None:
             return Response(
                 {'error': 'User already has a restaurant'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -77,7 +83,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['put', 'patch'], permission_classes=[IsAuthenticated])
     def update_me(self, request):
         """Update current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
@@ -97,7 +103,7 @@ class RestaurantSubscriptionViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def my_subscription(self, request):
         """Get current subscription"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
@@ -111,13 +117,15 @@ class RestaurantSubscriptionViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def subscription_history(self, request):
         """Get all subscriptions history"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        subscriptions = restaurant.subscriptions.all().order_by('-created_at')
+        subscriptions = RestaurantSubscriptionSerializer.setup_eager_loading(
+            restaurant.subscriptions.all()
+        ).order_by('-created_at')
         serializer = RestaurantSubscriptionSerializer(subscriptions, many=True)
         return Response(serializer.data)
 
@@ -132,7 +140,7 @@ class RestaurantSubscriptionViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
@@ -159,21 +167,21 @@ class RestaurantSubscriptionViewSet(viewsets.ViewSet):
         )
 
 
-class TableViewSet(viewsets.ModelViewSet):
+class TableViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     """Table management"""
     serializer_class = TableSerializer
     permission_classes = (IsAuthenticated, IsRestaurantUser)
 
     def get_queryset(self):
         """Get tables for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if restaurant:
             return Table.objects.filter(restaurant=restaurant)
         return Table.objects.none()
 
     def perform_create(self, serializer):
         """Create table for current user's restaurant"""
-        restaurant = Restaurant.objects.filter(owner=self.request.user).first()
+        restaurant = current_restaurant(self.request)
         if not restaurant:
             raise ValueError('Restaurant not found')
         
@@ -183,11 +191,8 @@ class TableViewSet(viewsets.ModelViewSet):
             from rest_framework.exceptions import ValidationError
             raise ValidationError(error_msg)
         
+        # The QR image is rendered lazily on its first fetch
         serializer.save(restaurant=restaurant)
-        
-        # Generate and store QR code
-        instance = serializer.instance
-        self._generate_qr_code(instance)
 
     def perform_update(self, serializer):
         """Update table"""
@@ -196,54 +201,94 @@ class TableViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def qr_code(self, request, pk=None):
         """Get QR code for table"""
-        table = get_object_or_404(Table, pk=pk, restaurant__owner=request.user)
+        table = get_object_or_404(Table.objects.select_related('restaurant'), pk=pk, restaurant__owner=request.user)
         return Response({
             'table_id': table.id,
             'table_name': table.name,
-            'qr_url': self._get_qr_code_url(table),
-            'public_url': f'https://app.seatserve.local/order/{table.restaurant.public_id}/{table.token}'
+            'qr_url': request.build_absolute_uri(QRCodeService.image_path(table)),
+            'public_url': QRCodeService.order_url(table.restaurant.public_id, table.token)
         })
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many tables at once
+
+        Body: {"names": [...]} or {"prefix": "T", "start": 1, "count": 60},
+        plus an optional capacity. Large batches render their QR codes in the
+        background and return a job to poll at qr_jobs/<id>/.
+        """
+        restaurant = current_restaurant(request)
+        if not restaurant:
+            return Response(
+                {'detail': 'Restaurant not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = TableBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tables = TableProvisioningService.bulk_create(
+                restaurant, serializer.validated_data['names'], serializer.validated_data['capacity']
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        qr_job = TableProvisioningService.render_qr_codes(restaurant, tables)
+        if qr_job:
+            qr_job = self._job_response(request, qr_job)
+        return Response({
+            'created': len(tables),
+            'tables': TableSerializer(tables, many=True, context=self.get_serializer_context()).data,
+            'qr_job': qr_job,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path=r'qr_jobs/(?P<job_id>[0-9a-f]+)')
+    def qr_job(self, request, job_id=None):
+        """Progress of a bulk QR rendering job"""
+        restaurant = current_restaurant(request)
+        job = QRRenderJobService.poll(job_id)
+        if not restaurant or not job or job['restaurant_id'] != restaurant.pk:
+            return Response({'detail': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self._job_response(request, job))
+
+    def _job_response(self, request, job):
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'total': job['total'],
+            'done': job['done'],
+            'error': job['error'],
+            'url': request.build_absolute_uri(reverse('table-qr-job', kwargs={'job_id': job['id']})),
+        }
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get table statistics"""
-        restaurant = Restaurant.objects.filter(owner=request.user).first()
+        restaurant = current_restaurant(request)
         if not restaurant:
             return Response(
                 {'detail': 'Restaurant not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        tables = Table.objects.filter(restaurant=restaurant)
-        plan_info = PlanEnforcementService.get_plan_info(restaurant)
-        
         return Response({
-            'total_tables': tables.count(),
-            'active_tables': tables.filter(is_active=True).count(),
-            'inactive_tables': tables.filter(is_active=False).count(),
-            'plan': plan_info,
+            **DashboardStatsService.table_stats(restaurant),
+            'plan': PlanEnforcementService.get_plan_info(restaurant),
         })
 
-    def _generate_qr_code(self, table):
-        """Generate QR code for a table"""
-        url = f'https://app.seatserve.local/order/{table.restaurant.public_id}/{table.token}'
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(url)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color='black', back_color='white')
-        
-        # Save to BytesIO and convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        # Store as data URL or file URL (here we'll just store the URL for now)
-        # In production, save to S3 or file storage
-        table.qr_code_url = f'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
-        table.save()
-
-    def _get_qr_code_url(self, table):
-        """Get QR code for a table"""
-        if not table.qr_code_url:
-            self._generate_qr_code(table)
-        return table.qr_code_url
+
+def table_qr_image(request, token, digest):
+    """
+    Serve a table's QR PNG, rendering and storing it on first request
+
+    URLs carry the content hash, so responses are cached as immutable.
+    """
+    table = get_object_or_404(Table.objects.select_related('restaurant'), token=token)
+    if digest != QRCodeService.content_hash(table.restaurant.public_id, table.token):
+        raise Http404('QR code not found')
+
+    path = QRCodeService.ensure_image(table.restaurant.public_id, table.token)
+    response = FileResponse(default_storage.open(path), content_type='image/png')
+    response['Cache-Control'] = f'public, max-age={settings.QR_IMAGE_MAX_AGE}, immutable'
+    return response